@@ -115,6 +115,44 @@ contract NFTDiarias is ERC721URIStorage, AccessControl {
         uint64 endDate,
         string memory tokenURI_
     ) external onlyOwnerOrOperator(imovelId) returns (uint256) {
+        return _mintReservation(imovelId, guest, startDate, endDate, tokenURI_);
+    }
+
+    // Várias reservas numa transação (calendário de diárias). Arrays paralelos: o item i
+    // usa imovelIds[i], guests[i], startDates[i], endDates[i] e tokenURIs[i]. Tudo ou nada:
+    // um item sem permissão/indisponível reverte o lote. Itens do mesmo lote também não
+    // podem se sobrepor (cada mint entra no índice antes do próximo isAvailable).
+    function mintReservationBatch(
+        uint256[] memory imovelIds,
+        address[] memory guests,
+        uint64[] memory startDates,
+        uint64[] memory endDates,
+        string[] memory tokenURIs
+    ) external returns (uint256[] memory tokenIds) {
+        uint256 n = imovelIds.length;
+        require(
+            guests.length == n && startDates.length == n && endDates.length == n && tokenURIs.length == n,
+            "Length mismatch"
+        );
+        tokenIds = new uint256[](n);
+        for (uint256 i = 0; i < n; i++) {
+            require(
+                hasRole(ADMIN_ROLE, msg.sender) ||
+                msg.sender == propertyOwner[imovelIds[i]] ||
+                propertyOperator[imovelIds[i]][msg.sender],
+                "Not authorized"
+            );
+            tokenIds[i] = _mintReservation(imovelIds[i], guests[i], startDates[i], endDates[i], tokenURIs[i]);
+        }
+    }
+
+    function _mintReservation(
+        uint256 imovelId,
+        address guest,
+        uint64 startDate,
+        uint64 endDate,
+        string memory tokenURI_
+    ) internal returns (uint256) {
         require(guest != address(0), "Guest zero");
         require(startDate < endDate, "Invalid range");
         require(isAvailable(imovelId, startDate, endDate), "Not available");
@@ -1,8 +1,10 @@
-# apps/backend_ia/orquestrador/agents/__init__.py
+# apps/backend_ia/orquestrador/__init__.py
 
-# Corrige os caminhos de importação para referenciar os módulos no mesmo diretório
-from .agents.contrato import executar as contrato
-from .agents.tutor import executar as tutor
-from .agents.mkt import executar as mkt
-from .agents.imagem import executar as imagem
-from .agents.nft import executar as nft
\ No newline at end of file
+# Agentes são carregados sob demanda pelo registro (agents/registro.py).
+# Mantém `from orquestrador import contrato` funcionando sem importar tudo no boot.
+def __getattr__(nome):
+    from .agents import registro
+
+    if registro.obter(nome):
+        return registro.carregar(nome)
+    raise AttributeError(f"module 'orquestrador' has no attribute '{nome}'")
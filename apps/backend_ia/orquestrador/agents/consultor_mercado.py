@@ -1,10 +1,18 @@
 # apps/backend_ia/orquestrador/agents/consultor_mercado.py
+import copy
+import os
+import threading
+import time
 from datetime import datetime
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
+
+from .sources import conectores, serie_historica
 
 """
 Agente de benchmarking & estratégia para NFTDiárias.
-- Coleta/integra dados de mercado (placeholders para conectar a datasets/APIs).
+- Coleta/integra dados de mercado via conectores (sources/conectores.py): InsideAirbnb
+  com cache materializado por versão do dataset; relatórios e plataformas Web2/Web3
+  por resumos JSON configuráveis (vazios enquanto não houver URL).
 - Compara Airbnb/Booking/Vrbo/Dtravel/Staynex vs. NFTDiárias.
 - Gera sugestões, contratos (texto) e um esboço de smart contract (Solidity).
 - Retorna JSON padronizado consumível pelo frontend ou por outros agentes.
@@ -26,42 +34,33 @@ LGPD, CDC e Lei do Inquilinato. Proponha usos de IA (precificação dinâmica, r
 fraude, gestão de ocupação). Retorne um JSON compatível com a estrutura solicitada.
 """
 
-# ---------- Stubs de coleta de dados (substitua por conectores reais) ----------
+# Respostas completas memorizadas por (cidades, regioes, moeda, flags) durante TTL segundos
+MEMO_TTL_SEC = int(os.getenv("EIAH_CONSULTOR_TTL", "300"))
+MEMO_MAX = 128
+
+# ---------- Coleta de dados (conectores em sources/conectores.py) ----------
 def fetch_inside_airbnb(cidades: List[str]) -> List[Dict[str, Any]]:
     """
-    TODO: Conectar a datasets InsideAirbnb (CSV/Parquet por cidade).
-    Retorne objetos com campos coerentes: ticket_medio, ocupacao_media, sazonalidade etc.
+    Métricas InsideAirbnb por cidade (ticket_medio, ocupacao_media, sazonalidade etc.).
+    Vêm do store materializado de sources/inside_airbnb: o CSV só é reprocessado
+    quando o dataset da cidade muda.
     """
-    # Exemplo de shape vazio (preparado para receber dados reais)
-    return [{"fonte":"InsideAirbnb","cidade":c,"ticket_medio":None,"ocupacao_media":None,
-             "sazonalidade":[],"tipos_imovel":[],"duracao_media":None} for c in cidades]
+    return conectores.obter("inside_airbnb").coletar(cidades)
 
 def fetch_airbnb_overview(regioes: List[str]) -> List[Dict[str, Any]]:
-    """
-    TODO: Integrar a relatórios públicos/análises de mercado (ex.: AirDNA se licenciado).
-    """
-    return [{"fonte":"Airbnb-reports","regiao":r,"ticket_medio":None,"ocupacao_media":None,
-             "sazonalidade":[],"tipos_imovel":[],"duracao_media":None} for r in regioes]
+    """Relatórios públicos / análises de mercado por região (EIAH_FONTE_AIRBNB_OVERVIEW)."""
+    return conectores.obter("airbnb_overview").coletar(regioes)
 
 def fetch_web2_platforms_summary() -> List[Dict[str, Any]]:
     """
-    TODO: Booking/Vrbo/Expedia – usar relatórios anuais/trimestrais, blogs de dados,
-    ou provedores de inteligência de mercado. Evitar scraping direto.
+    Booking/Vrbo/Expedia – resumo JSON de relatórios anuais/trimestrais ou provedor de
+    inteligência de mercado (EIAH_FONTE_WEB2). Evitar scraping direto.
     """
-    return [
-        {"plataforma":"Booking","ticket_medio":None,"ocupacao_media":None},
-        {"plataforma":"Vrbo","ticket_medio":None,"ocupacao_media":None},
-        {"plataforma":"Expedia","ticket_medio":None,"ocupacao_media":None},
-    ]
+    return conectores.obter("web2").coletar()
 
 def fetch_web3_platforms_summary() -> List[Dict[str, Any]]:
-    """
-    TODO: Dtravel/Staynex – checar docs, whitepapers e relatórios da comunidade.
-    """
-    return [
-        {"plataforma":"Dtravel","modelo":"Web3","ticket_medio":None,"ocupacao_media":None},
-        {"plataforma":"Staynex","modelo":"Web3","ticket_medio":None,"ocupacao_media":None},
-    ]
+    """Dtravel/Staynex – docs, whitepapers e relatórios da comunidade (EIAH_FONTE_WEB3)."""
+    return conectores.obter("web3").coletar()
 
 
 # ---------- Utilidades de composição ----------
@@ -219,6 +218,73 @@ def plano_de_acao() -> List[Dict[str, Any]]:
     ]
 
 
+def _registrar_serie(inside: List[Dict[str, Any]]):
+    """Snapshot das cidades consultadas na série histórica (falha aqui não derruba o agente)."""
+    try:
+        serie_historica.registrar({i["cidade"]: i for i in inside if i.get("cidade")}, "consultor_mercado")
+    except Exception as e:
+        print(f"[CONSULTOR] falha ao registrar série histórica: {e}")
+
+
+def consolidar_cidades(inside: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Linha "Airbnb" do comparativo a partir das cidades: médias simples dos números
+    disponíveis e os meses / tipos mais frequentes entre as cidades.
+    """
+    validas = [m for m in inside if "erro" not in m]
+
+    def _media(campo: str, casas: int):
+        vals = [m[campo] for m in validas if m.get(campo) is not None]
+        return round(sum(vals) / len(vals), casas) if vals else None
+
+    def _top(campo: str):
+        freq: Dict[str, int] = {}
+        for m in validas:
+            for v in m.get(campo) or []:
+                freq[v] = freq.get(v, 0) + 1
+        return [k for k, _ in sorted(freq.items(), key=lambda kv: -kv[1])[:3]]
+
+    return {
+        "ticket_medio": _media("ticket_medio", 2),
+        "ocupacao_media": _media("ocupacao_media", 4),
+        "sazonalidade": _top("sazonalidade"),
+        "tipos_imovel": _top("tipos_imovel"),
+        "duracao_media": _media("duracao_media", 2),
+    }
+
+
+# ---------- Seções estáticas (montadas uma vez no import) ----------
+SUGESTOES = sugerir_melhorias()
+CLAUSULAS_TEXTO = clausulas_contratuais_texto()
+CONTRATO_SOLIDITY = contrato_solidity_exemplo()
+PLANO_ACAO = plano_de_acao()
+
+# ---------- Memo de respostas ----------
+_memo: Dict[Tuple, Tuple[float, Dict[str, Any]]] = {}  # chave -> (criado_em, resposta)
+_memo_lock = threading.Lock()
+
+
+def _memo_obter(chave: Tuple) -> Optional[Dict[str, Any]]:
+    with _memo_lock:
+        item = _memo.get(chave)
+        if item and time.time() - item[0] < MEMO_TTL_SEC:
+            return item[1]
+        _memo.pop(chave, None)
+    return None
+
+
+def _memo_salvar(chave: Tuple, resposta: Dict[str, Any]):
+    with _memo_lock:
+        if len(_memo) >= MEMO_MAX:
+            _memo.pop(min(_memo, key=lambda k: _memo[k][0]))  # descarta a mais antiga
+        _memo[chave] = (time.time(), resposta)
+
+
+def limpar_memo():
+    with _memo_lock:
+        _memo.clear()
+
+
 # ---------- Entrada/saída principal do agente ----------
 def executar(dados: Dict[str, Any]) -> Dict[str, Any]:
     """
@@ -236,27 +302,25 @@ def executar(dados: Dict[str, Any]) -> Dict[str, Any]:
         incluir_contratos = bool(dados.get("incluir_contratos", True))
         incluir_solidity = bool(dados.get("incluir_solidity", True))
 
-        # 1) Coleta (stubs prontos para conectar)
+        chave = (tuple(cidades), tuple(regioes), moeda, incluir_contratos, incluir_solidity)
+        memo = _memo_obter(chave)
+        if memo is not None:
+            return copy.deepcopy(memo)  # quem chama pode mexer no dict
+
+        # 1) Coleta (conectores com cache local; fontes sem URL vêm vazias)
         inside = fetch_inside_airbnb(cidades)
         airbnb = fetch_airbnb_overview(regioes)
         web2 = fetch_web2_platforms_summary()
         web3 = fetch_web3_platforms_summary()
+        _registrar_serie(inside)
 
-        # 2) Montagem de um dict de comparação (placeholder -> None onde não há dado)
+        # 2) Montagem do dict de comparação (None onde ainda não há fonte)
         comp = {
-            "airbnb": {"ticket_medio": None, "ocupacao_media": None, "sazonalidade": [], "tipos_imovel": [], "duracao_media": None},
-            "booking": {"ticket_medio": None, "ocupacao_media": None},
-            "vrbo": {"ticket_medio": None, "ocupacao_media": None},
-            "dtravel": {"ticket_medio": None, "ocupacao_media": None},
-            "staynex": {"ticket_medio": None, "ocupacao_media": None},
+            "airbnb": consolidar_cidades(inside),
+            **{p["plataforma"].lower(): p for p in web2 + web3},
             "nftdiarias": {"ticket_medio": None, "ocupacao_media": None, "sazonalidade": [], "tipos_imovel": [], "duracao_media": None},
         }
-
-        tabela = montar_tabela_comparativa(comp)
-        melhorias = sugerir_melhorias()
-
-        contratos_txt = clausulas_contratuais_texto() if incluir_contratos else ""
-        solidity_src = contrato_solidity_exemplo() if incluir_solidity else ""
+        tem_dados = comp["airbnb"]["ticket_medio"] is not None
 
         resposta = {
             "sucesso": True,
@@ -264,17 +328,24 @@ def executar(dados: Dict[str, Any]) -> Dict[str, Any]:
                 "agente": "consultor_mercado",
                 "timestamp": datetime.utcnow().isoformat(),
                 "moeda": moeda,
-                "comparativo_markdown": tabela,
-                "sugestoes": melhorias,
-                "contratos_texto": contratos_txt,
-                "contrato_solidity": solidity_src,
-                "plano_acao": plano_de_acao(),
+                "comparativo_markdown": montar_tabela_comparativa(comp),
+                "metricas_cidades": inside,
+                "relatorios_regioes": airbnb,
+                "sugestoes": SUGESTOES,
+                "contratos_texto": CLAUSULAS_TEXTO if incluir_contratos else "",
+                "contrato_solidity": CONTRATO_SOLIDITY if incluir_solidity else "",
+                "plano_acao": PLANO_ACAO,
                 "insights_pendentes": {
-                    "tem_dados_reais?": False,
-                    "mensagem": "Conecte os stubs às fontes (InsideAirbnb/AirDNA/relatórios) para preencher medidas reais."
+                    "tem_dados_reais?": tem_dados,
+                    "mensagem": ("Airbnb preenchido com InsideAirbnb; demais plataformas dependem de EIAH_FONTE_*."
+                                 if tem_dados else
+                                 "Conecte os stubs às fontes (InsideAirbnb/AirDNA/relatórios) para preencher medidas reais.")
                 }
             }
         }
-        return resposta
+        # falha de cidade (download etc.) não fica memorizada
+        if not any("erro" in m for m in inside):
+            _memo_salvar(chave, resposta)
+        return copy.deepcopy(resposta)
     except Exception as e:
         return {"sucesso": False, "erro": str(e)}
@@ -1,61 +1,334 @@
-from ..utils.ipfs import upload_to_ipfs
-from ..utils.blockchain import mint_nft
-from ..utils.pdf import gerar_pdf_prova
-from orquestrador.schemas.nft_schema import NFTRequest
+from ..utils.ipfs import adicionar_imagem, upload_to_ipfs, upload_lote_ipfs
+from ..utils.blockchain import MAX_MINTS_POR_TX, mint_nft, mint_lote
+from ..utils.chain import ResultadoIncerto
+from ..utils.pdf import gerar_pdf_prova, gerar_pdfs_prova
+from ..services import agenda, idempotencia
+from ..services.agenda import PeriodoIndisponivel
+from ..services.idempotencia import ConflitoIdempotencia, EmAndamento, chave_conteudo
+from orquestrador.schemas.nft_schema import NFTRequest, validar_lote
 from datetime import datetime
+from typing import Any, Dict, List
 import uuid
 
-def executar(dados: dict):
+MAX_LOTE = 1000  # itens por chamada de executar_lote
+CAMPOS_EMISSAO = ("tokenURI", "ipfsHash", "txHash", "idNFT", "provaVerificacaoNFT")
+
+
+def _metadata(entrada: NFTRequest) -> dict:
+    return {
+        "name": entrada.nomeNFT,
+        "description": entrada.descricao,
+        "image": adicionar_imagem(entrada.imagemUrl),  # data: URI vira bloco deduplicado
+        "attributes": [
+            {"trait_type": "Data de Início", "value": entrada.dataInicio.isoformat()},
+            {"trait_type": "Data de Fim", "value": entrada.dataFim.isoformat()},
+            {"trait_type": "Valor da Diária", "value": str(entrada.valorDiaria)},
+            {"trait_type": "Moeda", "value": entrada.moeda},
+            {"trait_type": "Regras", "value": entrada.regras},
+        ]
+    }
+
+
+def _dados_prova(entrada: NFTRequest, nft_id: str, token_uri: str, tx_hash: str) -> dict:
+    return {
+        "nftId": nft_id,
+        "nome": entrada.nomeProprietario,
+        "descricao": entrada.descricao,
+        "wallet": entrada.wallet,
+        "tokenURI": token_uri,
+        "txHash": tx_hash,
+    }
+
+
+def _emitir(entrada: NFTRequest) -> dict:
+    # 2. ✅ Gerar metadata
+    metadata = _metadata(entrada)
+
+    # 3. ✅ Upload IPFS
+    ipfs_result = upload_to_ipfs(metadata)
+    token_uri = ipfs_result["tokenURI"]
+    ipfs_hash = ipfs_result["ipfsHash"]
+
+    # 4. ✅ Mint na blockchain
     try:
-        # 1. ✅ Validar dados recebidos
-        entrada = NFTRequest(**dados)
-
-        # 2. ✅ Gerar metadata
-        metadata = {
-            "name": entrada.nomeNFT,
-            "description": entrada.descricao,
-            "image": entrada.imagemUrl or "",
-            "attributes": [
-                {"trait_type": "Data de Início", "value": entrada.dataInicio},
-                {"trait_type": "Data de Fim", "value": entrada.dataFim},
-                {"trait_type": "Valor da Diária", "value": entrada.valorDiaria},
-                {"trait_type": "Moeda", "value": entrada.moeda},
-                {"trait_type": "Regras", "value": entrada.regras},
-            ]
-        }
+        mint_result = mint_nft(entrada.wallet, token_uri, entrada.idPropriedade,
+                               entrada.dataInicio.isoformat(), entrada.dataFim.isoformat())
+    except ResultadoIncerto as e:
+        # a transação pode minerar depois: a emissão fica gravada como pendente (repetição
+        # não minta de novo) e o período segue reservado na agenda
+        print(f"[NFT] Mint sem confirmação: {e}")
+        return _pendente(token_uri, ipfs_hash, e.tx_hashes[0] if e.tx_hashes else None, str(e))
+    tx_hash = mint_result["txHash"]
+    nft_id = mint_result["nftId"]
+
+    # 5. ✅ (Opcional) Geração de Prova PDF (o NFT já existe; falha aqui não desfaz a emissão)
+    try:
+        pdf_url = gerar_pdf_prova(_dados_prova(entrada, nft_id, token_uri, tx_hash))
+    except Exception as e:
+        print(f"[NFT] Prova PDF falhou para o token {nft_id}: {e}")
+        pdf_url = None
+    return _resultado(token_uri, ipfs_hash, tx_hash, nft_id, pdf_url)
+
+
+def _pendente(token_uri: str, ipfs_hash: str, tx_hash, erro: str) -> dict:
+    return {
+        "agente": "nft",
+        "status": "pendente",
+        "mensagem": "Transação do mint sem confirmação; conferir o txHash antes de emitir de novo.",
+        "tokenURI": token_uri,
+        "ipfsHash": ipfs_hash,
+        "txHash": tx_hash,
+        "idNFT": None,
+        "provaVerificacaoNFT": None,
+        "erro": erro,
+        "timestamp": datetime.utcnow().isoformat(),
+    }
+
 
-        # 3. ✅ Upload IPFS
-        ipfs_result = upload_to_ipfs(metadata)
-        token_uri = ipfs_result["tokenURI"]
-        ipfs_hash = ipfs_result["ipfsHash"]
-
-        # 4. ✅ Mint na blockchain
-        mint_result = mint_nft(entrada.wallet, token_uri)
-        tx_hash = mint_result["txHash"]
-        nft_id = mint_result["nftId"]
-
-        # 5. ✅ (Opcional) Geração de Prova PDF
-        pdf_url = gerar_pdf_prova({
-            "nftId": nft_id,
-            "nome": entrada.nomeProprietario,
-            "descricao": entrada.descricao,
-            "wallet": entrada.wallet,
-            "tokenURI": token_uri,
-            "txHash": tx_hash,
-        })
+def _resultado(token_uri: str, ipfs_hash: str, tx_hash: str, nft_id: str, pdf_url) -> dict:
+    return {
+        "agente": "nft",
+        "status": "ativo",
+        "mensagem": "NFT da diária criada com sucesso na blockchain.",
+        "tokenURI": token_uri,
+        "ipfsHash": ipfs_hash,
+        "txHash": tx_hash,
+        "idNFT": nft_id,
+        "provaVerificacaoNFT": pdf_url,
+        "timestamp": datetime.utcnow().isoformat(),
+    }
+
+
+def _emitir_na_agenda(entrada: NFTRequest, chave: str) -> dict:
+    """Reserva o período do imóvel antes do upload/mint; falha da emissão devolve o período."""
+    store = agenda.get_store()
+    conflitos = store.reservar(entrada.idPropriedade, entrada.dataInicio, entrada.dataFim, chave)
+    if conflitos:
+        raise PeriodoIndisponivel(entrada.idPropriedade, conflitos)
+    try:
+        return _emitir(entrada)
+    except BaseException:
+        store.liberar(entrada.idPropriedade, entrada.dataInicio, entrada.dataFim, chave)
+        raise
+
+
+def executar(dados: Any):
+    try:
+        # 1. ✅ Validar dados recebidos (as rotas já entregam o NFTRequest validado)
+        entrada = dados if isinstance(dados, NFTRequest) else NFTRequest.model_validate(dados)
+
+        # 2-5. ✅ Uma única emissão por pedido: repetição (retry, duplo clique) devolve
+        # o tokenURI/txHash/idNFT já gravados; duplicatas simultâneas esperam a primeira.
+        # Período já emitido para o imóvel (outro pedido) é recusado antes de qualquer I/O.
+        conteudo = chave_conteudo(entrada.model_dump(mode="json"))
+        chave = entrada.idempotencyKey or conteudo
+        resultado, reutilizado = idempotencia.executar_uma_vez(
+            "nft", chave, lambda: _emitir_na_agenda(entrada, chave), hash_entrada=conteudo)
 
         # 6. ✅ Resposta estruturada
         return {
-            "sucesso": True,
+            "sucesso": resultado.get("status") != "pendente",
+            "pendente": resultado.get("status") == "pendente",
+            "resultado": {**resultado, "idempotencia": {"chave": chave, "reutilizado": reutilizado}},
+        }
+
+    except ConflitoIdempotencia as e:
+        return {
+            "sucesso": False,
+            "erro": str(e),
+            "conflito": True,
+            "mensagem": "Idempotency-Key reutilizada com outro NFT."
+        }
+    except EmAndamento as e:
+        return {
+            "sucesso": False,
+            "erro": str(e),
+            "emAndamento": True,
+            "mensagem": "Emissão idêntica em andamento; repita mais tarde."
+        }
+    except PeriodoIndisponivel as e:
+        return {
+            "sucesso": False,
+            "erro": str(e),
+            "indisponivel": True,
+            "conflitos": e.conflitos,
+            "mensagem": "Período indisponível para o imóvel."
+        }
+    except Exception as e:
+        return {
+            "sucesso": False,
+            "erro": str(e),
+            "mensagem": "Falha ao executar agente NFT."
+        }
+
+
+def _emitir_lote(validos: List[int], entradas: Dict[int, NFTRequest], status: List[Dict[str, Any]]) -> list:
+    """Passos 2-4 do lote (IPFS, mint agrupado, provas); preenche `status` e devolve as transações."""
+    # 2. ✅ Upload IPFS em lote
+    uris: Dict[int, dict] = {}
+    if validos:
+        try:
+            resultados = upload_lote_ipfs([_metadata(entradas[i]) for i in validos])
+            uris = dict(zip(validos, resultados))
+        except Exception as e:
+            print(f"[NFT][LOTE] Upload IPFS falhou: {e}")
+            for i in validos:
+                status[i].update({"status": "erro", "etapa": "ipfs", "erro": str(e)})
+            validos = []
+
+    # 3. ✅ Mint agrupado: poucas transações em vez de uma por diária
+    transacoes = []
+    mintados: List[int] = []
+    for ini in range(0, len(validos), MAX_MINTS_POR_TX):
+        grupo = validos[ini:ini + MAX_MINTS_POR_TX]
+        try:
+            r = mint_lote([(entradas[i].wallet, uris[i]["tokenURI"], entradas[i].idPropriedade,
+                            entradas[i].dataInicio.isoformat(), entradas[i].dataFim.isoformat()) for i in grupo])
+        except Exception as e:
+            print(f"[NFT][LOTE] Mint de {len(grupo)} item(ns) falhou: {e}")
+            for i in grupo:
+                status[i].update({"status": "erro", "etapa": "mint", "erro": str(e)})
+            transacoes.append({"txHash": None, "itens": grupo, "erro": str(e)})
+            continue
+        # o grupo pode ter virado mais de uma transação (divisão pelo gas estimado), cada
+        # uma com o próprio desfecho: só os itens do bloco que falhou saem com erro
+        blocos = r.get("blocos") or [{"itens": list(range(len(grupo))), "txHash": r["txHash"], "status": "minerado"}]
+        for bloco in blocos:
+            transacoes.append({"txHash": bloco["txHash"], "itens": [grupo[k] for k in bloco["itens"]],
+                               "status": bloco["status"], **({"erro": bloco["erro"]} if bloco.get("erro") else {})})
+            for k in bloco["itens"]:
+                i = grupo[k]
+                if bloco["status"] == "minerado":
+                    status[i].update({
+                        "status": "emitido",
+                        "tokenURI": uris[i]["tokenURI"],
+                        "ipfsHash": uris[i]["ipfsHash"],
+                        "txHash": bloco["txHash"],
+                        "idNFT": r["nftIds"][k],
+                    })
+                    mintados.append(i)
+                elif bloco["status"] == "pendente":  # pode ter mintado: segura chave e período
+                    status[i].update({"status": "pendente", "etapa": "mint", "tokenURI": uris[i]["tokenURI"],
+                                      "ipfsHash": uris[i]["ipfsHash"], "txHash": bloco["txHash"],
+                                      "erro": bloco.get("erro")})
+                else:
+                    status[i].update({"status": "erro", "etapa": "mint", "txHash": bloco["txHash"],
+                                      "erro": bloco.get("erro")})
+
+    # 4. ✅ Provas PDF (o NFT já existe; falha aqui não desfaz a emissão)
+    if mintados:
+        try:
+            provas = gerar_pdfs_prova([
+                _dados_prova(entradas[i], status[i]["idNFT"], status[i]["tokenURI"], status[i]["txHash"])
+                for i in mintados
+            ])
+            for i, url in zip(mintados, provas):
+                status[i]["provaVerificacaoNFT"] = url
+        except Exception as e:
+            print(f"[NFT][LOTE] Provas PDF falharam: {e}")
+            for i in mintados:
+                status[i]["provaVerificacaoNFT"] = None
+    return transacoes
+
+
+def executar_lote(dados: Any):
+    """
+    Emissão em lote (ex.: um calendário de diárias inteiro).
+
+    Entrada: {"itens": [NFTRequest, ...], "tudoOuNada": bool} (ou a lista direto).
+      1. valida todos os itens antes de qualquer I/O (tudoOuNada: um inválido cancela o lote);
+      2. sobe as metadatas num único upload IPFS;
+      3. minta em grupos de até MAX_MINTS_POR_TX por transação;
+      4. gera as provas PDF dos itens mintados.
+    Cada item sai com o próprio status ("emitido" | "invalido" | "indisponivel" | "erro" |
+    "pendente" | "cancelado"); falha de uma transação de mint só afeta os itens dela, e
+    "pendente" (mint sem confirmação) mantém a chave e o período reservados. Item idêntico
+    a uma emissão anterior (mesmo hash de conteúdo de /api/nft) sai "emitido" com
+    "reutilizado": True, sem novo upload nem mint. Item cujo período já está reservado
+    no imóvel (por outra emissão ou por item anterior do próprio lote) sai "indisponivel"
+    com os "conflitos" (tudoOuNada: cancela o lote).
+    """
+    try:
+        itens = dados if isinstance(dados, list) else (dados or {}).get("itens")
+        tudo_ou_nada = bool(isinstance(dados, dict) and dados.get("tudoOuNada"))
+        if not isinstance(itens, list) or not itens:
+            raise ValueError("Informe 'itens' com ao menos um NFT.")
+        if len(itens) > MAX_LOTE:
+            raise ValueError(f"Lote com {len(itens)} itens; máximo {MAX_LOTE}.")
+
+        lote_id = str(uuid.uuid4())
+        status: List[Dict[str, Any]] = [{"indice": i} for i in range(len(itens))]
+
+        # 1. ✅ Validação antecipada de todos os itens (lista inteira num TypeAdapter)
+        entradas, invalidos = validar_lote(itens)
+        for i, erros in invalidos.items():
+            status[i].update({"status": "invalido", "erros": erros})
+        validos: List[int] = sorted(entradas)
+        if tudo_ou_nada and len(validos) < len(itens):
+            for i in validos:
+                status[i]["status"] = "cancelado"
+            validos = []
+
+        # 1b. ✅ Idempotência por item: conteúdo já emitido é reaproveitado (sem novo mint)
+        store = idempotencia.get_store()
+        chaves: Dict[int, str] = {}
+        for i in validos:
+            chave = chave_conteudo(entradas[i].model_dump(mode="json"))
+            estado, anterior = store.reservar("nft", chave, chave)
+            if estado == "concluido":
+                status[i].update({"status": "pendente" if anterior.get("status") == "pendente" else "emitido",
+                                  "reutilizado": True, **{k: anterior.get(k) for k in CAMPOS_EMISSAO}})
+            elif estado == "executando":  # idêntico a outro item do lote ou a outra requisição em curso
+                status[i].update({"status": "erro", "etapa": "idempotencia", "erro": "Emissão idêntica em andamento."})
+            else:
+                chaves[i] = chave
+
+        transacoes = []
+        reservados: List[int] = []
+        agenda_store = agenda.get_store()
+        try:
+            # 1c. ✅ Agenda do imóvel: períodos já reservados não vão para o mint
+            for i in list(chaves):
+                e = entradas[i]
+                conflitos = agenda_store.reservar(e.idPropriedade, e.dataInicio, e.dataFim, chaves[i])
+                if conflitos:
+                    status[i].update({"status": "indisponivel", "conflitos": conflitos})
+                else:
+                    reservados.append(i)
+            if tudo_ou_nada and len(reservados) < len(chaves):
+                for i in reservados:
+                    status[i]["status"] = "cancelado"
+                reservados = []
+            transacoes = _emitir_lote(reservados, entradas, status)
+        finally:
+            for i, chave in chaves.items():
+                st = status[i]
+                if st.get("status") == "emitido":
+                    store.concluir("nft", chave, _resultado(st["tokenURI"], st["ipfsHash"], st["txHash"],
+                                                            st["idNFT"], st.get("provaVerificacaoNFT")))
+                    continue
+                if st.get("status") == "pendente":
+                    store.concluir("nft", chave, _pendente(st["tokenURI"], st["ipfsHash"], st["txHash"], st["erro"]))
+                    continue
+                store.liberar("nft", chave)
+                if st.get("status") != "indisponivel":
+                    e = entradas[i]
+                    agenda_store.liberar(e.idPropriedade, e.dataInicio, e.dataFim, chave)
+
+        contagem: Dict[str, int] = {}
+        for s in status:
+            contagem[s["status"]] = contagem.get(s["status"], 0) + 1
+        emitidos = contagem.get("emitido", 0)
+        return {
+            "sucesso": emitidos == len(itens),
+            "parcial": 0 < emitidos < len(itens),
             "resultado": {
                 "agente": "nft",
-                "status": "ativo",
-                "mensagem": "NFT da diária criada com sucesso na blockchain.",
-                "tokenURI": token_uri,
-                "ipfsHash": ipfs_hash,
-                "txHash": tx_hash,
-                "idNFT": nft_id,
-                "provaVerificacaoNFT": pdf_url,
+                "lote": lote_id,
+                "total": len(itens),
+                "contagem": contagem,
+                "transacoes": transacoes,
+                "itens": status,
                 "timestamp": datetime.utcnow().isoformat(),
             }
         }
@@ -64,5 +337,5 @@ def executar(dados: dict):
         return {
             "sucesso": False,
             "erro": str(e),
-            "mensagem": "Falha ao executar agente NFT."
+            "mensagem": "Falha ao executar lote do agente NFT."
         }
@@ -0,0 +1,78 @@
+# apps/backend_ia/orquestrador/agents/registro.py
+"""
+Registro declarativo dos agentes.
+
+O registro é montado uma única vez (import do módulo) e guarda, para cada agente,
+onde está a função (`modulo:funcao`), quais tipos de entrada ele aceita ("str"
+via GET, "json" via POST) e o perfil de execução. O módulo do agente só é
+importado na primeira chamada: health check e cold start não pagam por gTTS,
+pandas etc.
+"""
+import importlib
+import threading
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, FrozenSet, List, Optional
+
+from ..services.execucao import Perfil, executar_agente
+
+
+@dataclass(frozen=True)
+class AgenteSpec:
+    nome: str
+    alvo: str                     # "modulo:funcao", relativo a orquestrador.agents
+    entradas: FrozenSet[str]      # {"str"} / {"json"} / ambos
+    perfil: Perfil = Perfil()
+
+
+def _spec(nome: str, alvo: str, entradas: str, perfil: Perfil) -> AgenteSpec:
+    return AgenteSpec(nome, alvo, frozenset(entradas.split(",")), perfil)
+
+
+REGISTRO: Dict[str, AgenteSpec] = {
+    s.nome: s
+    for s in (
+        _spec("contrato", "contrato:executar", "str", Perfil("leve")),
+        _spec("imagem", "imagem:executar", "str", Perfil("leve")),
+        _spec("tutor", "tutor:executar", "str", Perfil("io", limite=4)),          # gTTS faz chamada de rede
+        _spec("mkt", "mkt:executar", "str,json", Perfil("leve")),                 # shim aceita string
+        _spec("nft", "nft:executar", "json", Perfil("io", limite=8)),             # IPFS + blockchain
+        _spec("nft_lote", "nft:executar_lote", "json", Perfil("io", limite=2)),   # lote: poucas tx grandes
+        # I/O no cache de métricas; o parse pesado já vai para o pool de processos do
+        # inside_airbnb, e o memo de respostas precisa morar neste processo
+        _spec("consultor_mercado", "consultor_mercado:executar", "json", Perfil("io", limite=4)),
+    )
+}
+
+_funcoes: Dict[str, Callable[[Any], Any]] = {}
+_lock = threading.Lock()
+
+
+def obter(nome: str) -> Optional[AgenteSpec]:
+    return REGISTRO.get(nome)
+
+
+def aceitam(tipo: str) -> List[str]:
+    """Nomes dos agentes que aceitam o tipo de entrada ("str" ou "json")."""
+    return [n for n, s in REGISTRO.items() if tipo in s.entradas]
+
+
+def carregar(nome: str) -> Callable[[Any], Any]:
+    """Importa (na 1ª vez) e devolve a função do agente."""
+    funcao = _funcoes.get(nome)
+    if funcao is not None:
+        return funcao
+    spec = REGISTRO.get(nome)
+    if spec is None:
+        raise KeyError(f"Agente '{nome}' não registrado")
+    with _lock:
+        if nome not in _funcoes:
+            modulo, attr = spec.alvo.split(":")
+            mod = importlib.import_module(f"{__package__}.{modulo}")
+            _funcoes[nome] = getattr(mod, attr)
+            print(f"[REGISTRO] Agente '{nome}' carregado ({spec.alvo})")
+        return _funcoes[nome]
+
+
+async def executar(nome: str, entrada: Any) -> Any:
+    """Executa o agente pela camada de execução, conforme o perfil registrado."""
+    return await executar_agente(nome, carregar(nome), entrada)
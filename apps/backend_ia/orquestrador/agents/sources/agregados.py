@@ -0,0 +1,82 @@
+# apps/backend_ia/orquestrador/agents/sources/agregados.py
+"""
+Agregados incrementais das métricas InsideAirbnb.
+
+O CSV é lido em pedaços; cada pedaço (RecordBatch já tipado) atualiza somas,
+contagens e frequências com kernels do pyarrow.compute – uma passada por coluna,
+sem converter para pandas. No fim, `para_dict()` vira um JSON pequeno guardado no manifesto e as
+métricas da cidade saem dele sem tocar de novo nos dados.
+"""
+from typing import Any, Dict
+
+import pyarrow as pa
+import pyarrow.compute as pc
+
+MESES = {1: "jan", 2: "fev", 3: "mar", 4: "abr", 5: "mai", 6: "jun",
+         7: "jul", 8: "ago", 9: "set", 10: "out", 11: "nov", 12: "dez"}
+
+CAMPOS_MEDIA = ("price", "availability_365", "minimum_nights")
+
+
+class Agregador:
+    def __init__(self):
+        self.somas: Dict[str, float] = {c: 0.0 for c in CAMPOS_MEDIA}
+        self.contagens: Dict[str, int] = {c: 0 for c in CAMPOS_MEDIA}
+        self.meses: Dict[int, int] = {}       # mês do last_review -> nº de anúncios
+        self.room_types: Dict[str, int] = {}  # room_type -> nº de anúncios (ordem de 1ª aparição)
+        self.colunas = set()
+
+    def atualizar(self, lote: pa.RecordBatch):
+        """Acumula um pedaço já tipado (colunas canônicas de cache_colunar.COLUNAS)."""
+        nomes = lote.schema.names
+        self.colunas.update(nomes)
+        for c in CAMPOS_MEDIA:
+            if c in nomes:
+                col = lote.column(c)
+                self.somas[c] += pc.sum(col).as_py() or 0.0
+                self.contagens[c] += pc.count(col).as_py()
+        if "last_review" in nomes:
+            _somar(self.meses, pc.month(lote.column("last_review")))
+        if "room_type" in nomes:
+            _somar(self.room_types, lote.column("room_type"))
+
+    def para_dict(self) -> Dict[str, Any]:
+        return {
+            "colunas": sorted(self.colunas),
+            "somas": self.somas,
+            "contagens": self.contagens,
+            "meses": {str(m): n for m, n in self.meses.items()},
+            "room_types": self.room_types,
+        }
+
+
+def _somar(freq: Dict[Any, int], col: pa.Array):
+    for par in pc.value_counts(col).to_pylist():  # ordem de 1ª aparição
+        if par["values"] is not None:
+            freq[par["values"]] = freq.get(par["values"], 0) + par["counts"]
+
+
+def _media(agg: Dict[str, Any], campo: str):
+    if campo not in agg["colunas"] or not agg["contagens"].get(campo):
+        return None
+    return agg["somas"][campo] / agg["contagens"][campo]
+
+
+def _top(freq: Dict[Any, int], n: int = 3):
+    # estável: empates mantêm a ordem de 1ª aparição (como value_counts)
+    return [k for k, _ in sorted(freq.items(), key=lambda kv: -kv[1])[:n]]
+
+
+def metricas(agg: Dict[str, Any]) -> Dict[str, Any]:
+    """ticket_medio, ocupacao_media, sazonalidade, tipos_imovel e duracao_media a partir dos agregados."""
+    ticket_medio = _media(agg, "price")
+    avail = _media(agg, "availability_365")
+    ocupacao_media = 1.0 - (avail / 365.0) if avail is not None else None
+    duracao_media = _media(agg, "minimum_nights")
+    return {
+        "ticket_medio": round(ticket_medio, 2) if ticket_medio is not None else None,
+        "ocupacao_media": round(ocupacao_media, 4) if ocupacao_media is not None else None,
+        "sazonalidade": [MESES.get(int(m), str(m)) for m in _top(agg.get("meses", {}))],
+        "tipos_imovel": _top(agg.get("room_types", {})),
+        "duracao_media": round(duracao_media, 2) if duracao_media is not None else None,
+    }
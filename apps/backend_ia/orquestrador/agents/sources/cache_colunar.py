@@ -0,0 +1,379 @@
+# apps/backend_ia/orquestrador/agents/sources/cache_colunar.py
+"""
+Cache processado dos datasets InsideAirbnb.
+
+O CSV bruto (csv / csv.gz / zip) é baixado em streaming, pedaço a pedaço, para RAW_DIR
+exatamente como veio (sha256 calculado no caminho). Na primeira leitura ele é
+parseado uma única vez pelo leitor CSV do pyarrow, em blocos de BLOCO_BYTES com
+descompressão on the fly: cada bloco é podado para as colunas usadas nas métricas,
+tipado com kernels vetorizados do pyarrow.compute (um por coluna, dtypes
+explícitos), anexado ao Arrow IPC (Feather v2, sem compressão) em PROCESSED_DIR e
+somado aos agregados (agregados.py). O DataFrame inteiro nunca é materializado. Leituras seguintes fazem
+memory-map do arquivo e leem só as colunas pedidas.
+
+Um manifesto (PROCESSED_DIR/inside_manifest.json), por hash da URL, guarda ETag /
+Last-Modified, data do download, sha256 do bruto, o schema do processado e os
+agregados das métricas. Com o cache vencido, o download é condicional
+(If-None-Match / If-Modified-Since): 304 renova o prazo sem reprocessar nada.
+"""
+import csv
+import gzip
+import hashlib
+import io
+import os
+import threading
+import time
+import zipfile
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pacsv
+import pyarrow.feather as feather
+
+try:
+    import fcntl  # trava entre processos (indisponível no Windows)
+except ImportError:  # pragma: no cover
+    fcntl = None
+
+from .agregados import Agregador
+from ...utils import http
+from ...utils.arquivos import escrever_json, ler_json
+from ...utils.http import condicional
+from ...utils.paths import PROCESSED_DIR, RAW_DIR
+
+MANIFESTO = PROCESSED_DIR / "inside_manifest.json"
+VERSAO_SCHEMA = 4  # incremente ao mudar COLUNAS, a tipagem ou os agregados
+MAX_AGE_SEC = 86400  # idade máxima do bruto antes do GET condicional
+BLOCO_BYTES = int(os.getenv("EIAH_INSIDE_BLOCO", str(4 << 20)))  # bytes de CSV por bloco no parse
+CHUNK_BYTES = 1 << 20  # bytes por leitura no download
+
+# coluna canônica -> candidatas no CSV (a primeira presente vence) e tipo no Arrow
+COLUNAS: Dict[str, tuple] = {
+    "price": ("price", "median_price", "avg_price"),
+    "availability_365": ("availability_365",),
+    "minimum_nights": ("minimum_nights",),
+    "last_review": ("last_review",),
+    "room_type": ("room_type", "property_type", "room_type_category"),
+    # índice espacial (indice_espacial.py)
+    "id": ("id", "listing_id"),
+    "latitude": ("latitude", "lat"),
+    "longitude": ("longitude", "lng", "lon"),
+}
+TIPOS = {
+    "price": pa.float64(),
+    "availability_365": pa.float64(),
+    "minimum_nights": pa.float64(),
+    "last_review": pa.timestamp("ns"),
+    "room_type": pa.string(),
+    "id": pa.string(),
+    "latitude": pa.float64(),
+    "longitude": pa.float64(),
+}
+
+_lock = threading.Lock()
+_travas_url: Dict[str, threading.RLock] = {}
+_local = threading.local()
+
+
+def url_hash(url: str) -> str:
+    return hashlib.sha256(url.encode("utf-8")).hexdigest()[:16]
+
+
+def _ext(url: str) -> str:
+    if url.endswith(".gz"):
+        return ".csv.gz"
+    if url.endswith(".zip"):
+        return ".zip"
+    return ".csv"
+
+
+def caminho_bruto(url: str) -> Path:
+    return RAW_DIR / f"inside_{url_hash(url)}{_ext(url)}"
+
+
+def caminho_processado(url: str) -> Path:
+    return PROCESSED_DIR / f"inside_{url_hash(url)}.arrow"
+
+
+# ---------------- manifesto ----------------
+
+def ler_manifesto() -> Dict[str, Any]:
+    return ler_json(MANIFESTO, {}) or {}
+
+
+def _atualizar_manifesto(chave: str, entrada: Dict[str, Any]):
+    # read-modify-write travado também entre processos (pool de cálculo por cidade)
+    with _lock, open(MANIFESTO.with_suffix(".lock"), "a") as trava:
+        if fcntl:
+            fcntl.flock(trava, fcntl.LOCK_EX)
+        man = ler_manifesto()
+        man[chave] = {**man.get(chave, {}), **entrada}
+        escrever_json(MANIFESTO, man)
+
+
+@contextmanager
+def _trava_url(url: str):
+    """
+    Serializa download/processamento de uma url entre threads e processos: cidades que
+    compartilham a fonte esperam o primeiro download em vez de baixar de novo.
+    """
+    h = url_hash(url)
+    with _lock:
+        rl = _travas_url.setdefault(h, threading.RLock())
+    with rl:
+        profundidade = getattr(_local, h, 0)
+        setattr(_local, h, profundidade + 1)
+        trava = None
+        try:
+            if profundidade == 0 and fcntl:  # flock só no nível mais externo
+                trava = open(PROCESSED_DIR / f".inside_{h}.lock", "a")
+                fcntl.flock(trava, fcntl.LOCK_EX)
+            yield
+        finally:
+            setattr(_local, h, profundidade)
+            if trava:
+                trava.close()
+
+
+def _sha256_arquivo(path: Path) -> str:
+    sha = hashlib.sha256()
+    with open(path, "rb") as f:
+        for bloco in iter(lambda: f.read(CHUNK_BYTES), b""):
+            sha.update(bloco)
+    return sha.hexdigest()
+
+
+# ---------------- download ----------------
+
+def _baixar(url: str, entrada: Dict[str, Any], sha256: Optional[str] = None) -> bool:
+    """
+    Baixa o bruto para RAW_DIR. Se há cópia local, faz GET condicional.
+    Com `sha256` (versão fixada no catálogo) o download só substitui a cópia local se
+    o hash conferir. Retorna True se baixou conteúdo, False em 304.
+    """
+    path = caminho_bruto(url)
+    headers = condicional(entrada.get("etag"), entrada.get("last_modified")) if path.exists() else {}
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    sha, total = hashlib.sha256(), 0
+    try:
+        # cliente compartilhado: pool keep-alive, retries com backoff, limite por host
+        with http.cliente().abrir(url, headers) as resp:
+            if resp.status == 304:
+                _atualizar_manifesto(url_hash(url), {"baixado_em": time.time()})
+                return False
+            etag, last_mod = resp.etag, resp.last_modified
+            with open(tmp, "wb") as out:
+                # streaming: nunca mais que CHUNK_BYTES do corpo em memória
+                while True:
+                    bloco = resp.corpo.read(CHUNK_BYTES)
+                    if not bloco:
+                        break
+                    sha.update(bloco)
+                    out.write(bloco)
+                    total += len(bloco)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+
+    if sha256 and sha.hexdigest() != sha256:
+        tmp.unlink(missing_ok=True)
+        raise RuntimeError(f"Checksum não confere para {url}: esperado {sha256}, recebido {sha.hexdigest()}")
+    os.replace(tmp, path)
+    _atualizar_manifesto(url_hash(url), {
+        "url": url,
+        "etag": etag,
+        "last_modified": last_mod,
+        "baixado_em": time.time(),
+        "sha256": sha.hexdigest(),
+        "bytes": total,
+    })
+    return True
+
+
+# ---------------- parse + tipagem ----------------
+
+# número decimal "limpo" (depois de tirar símbolo de moeda / separador de milhar)
+_RE_NUMERO = r"^[-+]?(\d+\.?\d*|\.\d+)([eE][-+]?\d+)?$"
+_NULO = pa.scalar(None, pa.string())
+
+
+def _para_float(arr: pa.Array) -> pa.Array:
+    """string -> float64 num só kernel; o que não é número vira null (como errors="coerce")."""
+    arr = pc.utf8_trim_whitespace(arr)
+    return pc.cast(pc.if_else(pc.match_substring_regex(arr, _RE_NUMERO), arr, _NULO), pa.float64())
+
+
+def _normalize_price(arr: pa.Array) -> pa.Array:
+    # formato BR: "R$ 1.234,56" -> 1234.56 (pontos são milhar, vírgula é decimal)
+    s = pc.replace_substring_regex(arr, r"[^\d,]", "")
+    return _para_float(pc.replace_substring(s, ",", "."))
+
+
+def _abrir_csv(path: Path):
+    """Stream binário já descomprimido (csv / csv.gz / primeiro .csv do zip)."""
+    if path.suffix == ".zip":
+        zf = zipfile.ZipFile(path)
+        name = next((n for n in zf.namelist() if n.lower().endswith(".csv")), None)
+        if not name:
+            raise RuntimeError("ZIP sem CSV.")
+        return zf.open(name)
+    if path.name.endswith(".gz"):
+        return gzip.open(path, "rb")
+    return open(path, "rb")
+
+
+def _fontes(path: Path) -> Dict[str, Optional[str]]:
+    """Para cada coluna canônica, qual coluna do CSV a alimenta (só o cabeçalho é lido)."""
+    with _abrir_csv(path) as f:
+        header = next(csv.reader(io.TextIOWrapper(f, encoding="utf-8-sig", newline="")), [])
+    return {can: next((c for c in cands if c in header), None) for can, cands in COLUNAS.items()}
+
+
+def _tipar(lote: pa.RecordBatch, fontes: Dict[str, Optional[str]], schema: pa.Schema) -> pa.RecordBatch:
+    """Bloco bruto (tudo string) -> colunas canônicas tipadas; cada coluna passa por um único kernel."""
+    colunas = []
+    for can in schema.names:
+        bruto = lote.column(fontes[can])
+        if can == "price":
+            colunas.append(_normalize_price(bruto))
+        elif can == "last_review":
+            colunas.append(pc.strptime(bruto, "%Y-%m-%d", "ns", error_is_null=True))
+        elif can in ("room_type", "id"):
+            colunas.append(bruto)
+        else:
+            colunas.append(_para_float(bruto))
+    return pa.RecordBatch.from_arrays(colunas, schema=schema)
+
+
+def _blocos(path: Path, fontes: Dict[str, Optional[str]], schema: pa.Schema) -> Iterator[pa.RecordBatch]:
+    """Lê o CSV em blocos de BLOCO_BYTES (parser multi-thread do pyarrow) e entrega cada um tipado."""
+    entrada = [fontes[c] for c in schema.names]
+    with _abrir_csv(path) as f:
+        leitor = pacsv.open_csv(
+            f,
+            read_options=pacsv.ReadOptions(block_size=BLOCO_BYTES),
+            # dtype explícito: tudo string, a conversão é feita por _tipar
+            convert_options=pacsv.ConvertOptions(
+                include_columns=entrada,
+                column_types={c: pa.string() for c in entrada},
+                strings_can_be_null=True,
+            ),
+        )
+        for lote in leitor:
+            yield _tipar(lote, fontes, schema)
+
+
+def _processar(url: str) -> Dict[str, Any]:
+    """Parse em blocos: cada bloco vai para o Arrow e para os agregados; nada fica inteiro em memória."""
+    path = caminho_bruto(url)
+    fontes = _fontes(path)
+    presentes = [can for can, col in fontes.items() if col]
+    schema = pa.schema([(can, TIPOS[can]) for can in presentes])
+    agg = Agregador()
+    linhas = 0
+
+    destino = caminho_processado(url)
+    tmp = destino.with_name(f".{destino.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        # sem compressão -> mmap direto na leitura
+        with pa.OSFile(str(tmp), "wb") as sink, pa.ipc.new_file(sink, schema) as writer:
+            for lote in _blocos(path, fontes, schema):
+                agg.atualizar(lote)
+                writer.write_batch(lote)
+                linhas += lote.num_rows
+        sha_arrow = _sha256_arquivo(tmp)
+        os.replace(tmp, destino)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+
+    info = {"schema": VERSAO_SCHEMA, "colunas": presentes, "linhas": linhas, "processado_em": time.time(),
+            "sha256_processado": ler_manifesto().get(url_hash(url), {}).get("sha256"),
+            "sha256_arrow": sha_arrow,
+            "agregados": agg.para_dict()}
+    _atualizar_manifesto(url_hash(url), info)
+    return info
+
+
+# ---------------- API ----------------
+
+def atualizar_bruto(url: str, max_age_sec: Optional[int] = None, sha256: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Só I/O: baixa o bruto se não existe ou venceu (GET condicional). Devolve a entrada do
+    manifesto; `sha256` dela já identifica a versão do dataset (ver versao_dataset).
+    Com `sha256` fixado e a cópia local nessa versão, não há nem revalidação.
+    """
+    max_age_sec = MAX_AGE_SEC if max_age_sec is None else max_age_sec
+    chave = url_hash(url)
+    with _trava_url(url):
+        entrada = ler_manifesto().get(chave, {})
+        existe = caminho_bruto(url).exists()
+        if sha256 and existe and entrada.get("sha256") == sha256:
+            return entrada
+        vencido = time.time() - entrada.get("baixado_em", 0) >= max_age_sec
+        outra_versao = bool(sha256) and entrada.get("sha256") != sha256
+        if not existe or vencido or outra_versao:
+            # cópia local em outra versão: GET completo (um 304 não traria a fixada)
+            _baixar(url, {} if outra_versao else entrada, sha256)
+            entrada = ler_manifesto().get(chave, {})
+        return entrada
+
+
+def garantir(url: str, max_age_sec: Optional[int] = None, sha256: Optional[str] = None) -> Dict[str, Any]:
+    """Bruto atualizado e processado no schema atual (reprocessa só se o bruto mudou)."""
+    with _trava_url(url):
+        entrada = atualizar_bruto(url, max_age_sec, sha256)
+        valido = (
+            caminho_processado(url).exists()
+            and entrada.get("schema") == VERSAO_SCHEMA
+            and entrada.get("sha256_processado") == entrada.get("sha256")
+        )
+        if not valido:
+            _processar(url)
+            entrada = ler_manifesto().get(url_hash(url), {})
+        return entrada
+
+
+def verificar(url: str) -> Dict[str, Any]:
+    """
+    Integridade do cache sem reparsear nada: re-hash do bruto e do Arrow contra o
+    manifesto. Retorna {"bruto": ok|divergente|ausente, "processado": ...}.
+    """
+    entrada = ler_manifesto().get(url_hash(url), {})
+
+    def _estado(path: Path, esperado: Optional[str]) -> str:
+        if not path.exists() or not esperado:
+            return "ausente"
+        return "ok" if _sha256_arquivo(path) == esperado else "divergente"
+
+    with _trava_url(url):
+        return {
+            "bruto": _estado(caminho_bruto(url), entrada.get("sha256")),
+            "processado": _estado(caminho_processado(url), entrada.get("sha256_arrow")),
+            "sha256": entrada.get("sha256"),
+        }
+
+
+def versao_dataset(entrada: Dict[str, Any]) -> str:
+    return f"{entrada.get('sha256')}:{VERSAO_SCHEMA}"
+
+
+def carregar_tabela(url: str, max_age_sec: Optional[int] = None, colunas: Optional[List[str]] = None) -> pd.DataFrame:
+    """
+    DataFrame tipado (colunas canônicas de COLUNAS) do dataset em `url`.
+    Cache quente: memory-map do Arrow, lendo só `colunas` (None = todas as disponíveis).
+    """
+    return ler_arrow(url, max_age_sec, colunas).to_pandas()
+
+
+def ler_arrow(url: str, max_age_sec: Optional[int] = None, colunas: Optional[List[str]] = None,
+              sha256: Optional[str] = None) -> pa.Table:
+    """Como carregar_tabela, mas devolve a pa.Table (memory-mapped) sem converter para pandas."""
+    entrada = garantir(url, max_age_sec, sha256)
+    disponiveis = entrada.get("colunas", [])
+    pedidas = [c for c in (colunas or disponiveis) if c in disponiveis]
+    return feather.read_table(caminho_processado(url), columns=pedidas, memory_map=True)
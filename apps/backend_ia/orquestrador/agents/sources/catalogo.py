@@ -0,0 +1,104 @@
+# apps/backend_ia/orquestrador/agents/sources/catalogo.py
+"""
+Catálogo de datasets InsideAirbnb por cidade.
+
+Arquivo JSON (padrão: catalogo_cidades.json ao lado deste módulo; EIAH_CATALOGO
+aponta para outro) com, por cidade:
+
+  url          link do listings.csv(.gz/.zip)
+  snapshot     data do dump no InsideAirbnb (informativo, ex.: "2025-06-27")
+  sha256       fixa a versão: o bruto baixado precisa ter esse hash e, com a cópia
+               local íntegra, nem há revalidação
+  proxy        cidade cujo dataset é usado quando esta não tem url
+  max_age_sec  idade máxima do bruto antes do GET condicional (senão vale "padrao")
+
+O arquivo é relido quando muda (mtime/tamanho): adicionar cidade não exige deploy.
+Cidades que compartilham a mesma url dividem o mesmo download e o mesmo cache
+processado (cache_colunar é indexado pela url).
+"""
+import os
+import threading
+from dataclasses import asdict, dataclass, replace
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from ...utils.arquivos import ler_json
+
+ARQUIVO = Path(os.getenv("EIAH_CATALOGO", Path(__file__).with_name("catalogo_cidades.json")))
+
+_lock = threading.Lock()
+_cache: Dict[str, Any] = {"assinatura": None, "dados": {}}
+
+
+@dataclass(frozen=True)
+class Dataset:
+    cidade: str
+    url: Optional[str]
+    snapshot: Optional[str] = None
+    sha256: Optional[str] = None
+    max_age_sec: Optional[int] = None
+    proxy_de: Optional[str] = None  # cidade dona do dataset quando veio por proxy
+
+    def para_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+def _dados() -> Dict[str, Any]:
+    try:
+        st = ARQUIVO.stat()
+        assinatura = (str(ARQUIVO), st.st_mtime_ns, st.st_size)
+    except FileNotFoundError:
+        assinatura = (str(ARQUIVO), None, None)
+    with _lock:
+        if _cache["assinatura"] != assinatura:
+            dados = ler_json(ARQUIVO, {}) or {}
+            _cache["dados"], _cache["assinatura"] = dados, assinatura
+            print(f"[CATALOGO] {len(dados.get('cidades', {}))} cidade(s) carregadas de {ARQUIVO}")
+        return _cache["dados"]
+
+
+def recarregar():
+    with _lock:
+        _cache["assinatura"] = None
+
+
+def cidades() -> List[str]:
+    return list(_dados().get("cidades", {}))
+
+
+def resolver(cidade: str) -> Optional[Dataset]:
+    """
+    Dataset da cidade (seguindo `proxy` quando ela não tem url). None se a cidade
+    não está no catálogo; Dataset com url None se não há dataset nem proxy.
+    """
+    dados = _dados()
+    entradas = dados.get("cidades", {})
+    padrao = dados.get("padrao", {})
+    visitadas = []
+    atual = cidade
+    while atual in entradas and atual not in visitadas:
+        visitadas.append(atual)
+        e = entradas[atual] or {}
+        if e.get("url"):
+            ds = Dataset(
+                cidade=cidade,
+                url=e["url"],
+                snapshot=e.get("snapshot"),
+                sha256=(e.get("sha256") or None),
+                max_age_sec=e.get("max_age_sec", padrao.get("max_age_sec")),
+            )
+            return replace(ds, proxy_de=atual) if atual != cidade else ds
+        if not e.get("proxy"):
+            break
+        atual = e["proxy"]
+    return Dataset(cidade, None) if visitadas else None
+
+
+def com_dataset() -> List[Dataset]:
+    """Cidades cuja url (própria ou via proxy) é baixável – alvo do prefetch."""
+    saida = []
+    for c in cidades():
+        ds = resolver(c)
+        if ds and ds.url and ds.url.startswith(("http://", "https://")):
+            saida.append(ds)
+    return saida
@@ -0,0 +1,161 @@
+# apps/backend_ia/orquestrador/agents/sources/conectores.py
+"""
+Conectores de dados de mercado usados pelo consultor_mercado.
+
+Todo conector devolve registros no mesmo formato: `fonte`, o campo de identidade
+(`cidade`, `regiao` ou `plataforma`) e os campos de CAMPOS_METRICAS (None / [] quando
+a fonte não traz o número). O I/O passa pelo cliente compartilhado de utils/http.py
+(pool, retries, GET condicional, limite por host) e `prefetch` aquece o cache local
+fora do caminho da requisição (ver services/prefetch.py).
+
+Fontes de resumo (relatórios Airbnb, plataformas Web2/Web3) são JSON configurados por
+variável de ambiente EIAH_FONTE_<NOME> (ex.: EIAH_FONTE_WEB2); sem URL, o conector
+devolve os registros vazios de sempre.
+"""
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Optional
+
+from . import catalogo, indice_espacial, inside_airbnb, precificacao
+from ...utils import http
+from ...utils.arquivos import escrever_json, ler_json
+from ...utils.http import condicional
+from ...utils.paths import PROCESSED_DIR
+
+DIR = PROCESSED_DIR / "fontes"
+MAX_AGE_SEC = int(os.getenv("EIAH_FONTE_MAX_AGE", "21600"))  # idade máxima do resumo antes de revalidar
+
+CAMPOS_METRICAS = {
+    "ticket_medio": None,
+    "ocupacao_media": None,
+    "sazonalidade": [],
+    "tipos_imovel": [],
+    "duracao_media": None,
+}
+
+
+def registro_vazio(fonte: Optional[str], campo: str, chave: str, **extras) -> Dict[str, Any]:
+    base = {"fonte": fonte} if fonte else {}
+    return {**base, campo: chave, **extras, **{k: (list(v) if isinstance(v, list) else v)
+                                                for k, v in CAMPOS_METRICAS.items()}}
+
+
+class Conector(ABC):
+    """Interface comum. `campo` é o nome do campo de identidade dos registros."""
+    nome = ""
+    campo = ""
+
+    def chaves_configuradas(self) -> List[str]:
+        """Chaves que o prefetcher deve manter aquecidas."""
+        return []
+
+    @abstractmethod
+    def coletar(self, chaves: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """Registros das `chaves` (todas as configuradas se None), no formato de registro_vazio."""
+
+    def prefetch(self, chaves: Optional[List[str]] = None) -> Dict[str, Any]:
+        self.coletar(chaves or self.chaves_configuradas())
+        return {"status": "ok"}
+
+
+class InsideAirbnbConector(Conector):
+    nome = "inside_airbnb"
+    campo = "cidade"
+
+    def chaves_configuradas(self) -> List[str]:
+        return [ds.cidade for ds in catalogo.com_dataset()]
+
+    def coletar(self, chaves: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        metricas = inside_airbnb.get_city_metrics(chaves or self.chaves_configuradas())
+        return [{"fonte": "InsideAirbnb", **m, "cidade": c} for c, m in metricas.items()]
+
+    def prefetch(self, chaves: Optional[List[str]] = None) -> Dict[str, Any]:
+        # downloads em paralelo + parse no pool de processos; só recalcula o que mudou
+        chaves = chaves or self.chaves_configuradas()
+        _, relatorio = inside_airbnb.calcular_cidades(chaves)
+        # tabelas de preço e índice espacial saem do mesmo cache (sem novo download)
+        precos = precificacao.aquecer(chaves)
+        espacial = indice_espacial.aquecer(chaves)
+        erros = [c for c, r in relatorio.items() if r.get("status") == "erro"]
+        return {"status": "erro" if erros else "ok", "cidades": relatorio, "precos": precos,
+                "espacial": espacial}
+
+
+class ResumoJSONConector(Conector):
+    """
+    Fonte de resumo em JSON: lista de registros (ou {"itens": [...]}) com o campo de
+    identidade e os campos de métricas. Guardado em DIR/<nome>.json com ETag /
+    Last-Modified; vencido, revalida por GET condicional; sem rede, serve a última cópia.
+    """
+
+    def __init__(self, nome: str, fonte: Optional[str], campo: str, padroes: List[str],
+                 extras: Optional[Dict[str, Any]] = None, url: Optional[str] = None):
+        self.nome = nome
+        self.fonte = fonte
+        self.campo = campo
+        self.padroes = padroes
+        self.extras = extras or {}
+        self.url = url
+        self._lock = threading.Lock()
+
+    def _url(self) -> Optional[str]:
+        return self.url or os.getenv(f"EIAH_FONTE_{self.nome.upper()}")
+
+    def _arquivo(self):
+        return DIR / f"{self.nome}.json"
+
+    def chaves_configuradas(self) -> List[str]:
+        return list(self.padroes) if self._url() else []
+
+    def _atualizar(self, max_age_sec: Optional[int] = None) -> Dict[str, Any]:
+        max_age_sec = MAX_AGE_SEC if max_age_sec is None else max_age_sec
+        url = self._url()
+        with self._lock:
+            cache = ler_json(self._arquivo(), {}) or {}
+            if not url or (cache.get("url") == url and time.time() - cache.get("baixado_em", 0) < max_age_sec):
+                return cache
+            mesma = cache.get("url") == url
+            try:
+                r = http.cliente().get_json(url, condicional(cache.get("etag"), cache.get("last_modified"))
+                                            if mesma else {})
+            except Exception as e:
+                print(f"[CONECTOR] {self.nome}: falha ao atualizar ({e}); usando cópia local")
+                return cache if mesma else {}
+            if r.status != 304:
+                itens = r.corpo.get("itens", []) if isinstance(r.corpo, dict) else (r.corpo or [])
+                cache = {"url": url, "etag": r.etag, "last_modified": r.last_modified, "itens": itens}
+            cache["baixado_em"] = time.time()
+            DIR.mkdir(parents=True, exist_ok=True)
+            escrever_json(self._arquivo(), cache)
+            return cache
+
+    def coletar(self, chaves: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        por_chave = {i.get(self.campo): i for i in self._atualizar().get("itens", []) if isinstance(i, dict)}
+        saida = []
+        for chave in chaves or self.padroes:
+            reg = registro_vazio(self.fonte, self.campo, chave, **self.extras)
+            dado = por_chave.get(chave) or {}
+            reg.update({k: dado[k] for k in CAMPOS_METRICAS if dado.get(k) is not None})
+            saida.append(reg)
+        return saida
+
+    def prefetch(self, chaves: Optional[List[str]] = None) -> Dict[str, Any]:
+        cache = self._atualizar()
+        return {"status": "ok" if cache.get("itens") is not None else "sem_dados"}
+
+
+CONECTORES: Dict[str, Conector] = {
+    c.nome: c
+    for c in (
+        InsideAirbnbConector(),
+        ResumoJSONConector("airbnb_overview", "Airbnb-reports", "regiao", ["Brasil"]),
+        ResumoJSONConector("web2", None, "plataforma", ["Booking", "Vrbo", "Expedia"]),
+        ResumoJSONConector("web3", None, "plataforma", ["Dtravel", "Staynex"], extras={"modelo": "Web3"}),
+    )
+}
+
+
+def obter(nome: str) -> Conector:
+    return CONECTORES[nome]
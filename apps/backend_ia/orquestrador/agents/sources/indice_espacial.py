@@ -0,0 +1,249 @@
+# apps/backend_ia/orquestrador/agents/sources/indice_espacial.py
+"""
+Índice espacial dos listings para busca de anúncios comparáveis.
+
+Grade regular de células de CELULA_KM (buckets estilo geohash, só NumPy): as
+coordenadas são projetadas em km (equiretangular em torno do centro da cidade, erro
+desprezível na escala de uma cidade), os pontos são ordenados pela chave da célula
+e guardamos só o início de cada célula. Uma consulta de raio visita as linhas de
+células que cobrem o círculo (searchsorted por linha) e filtra por distância exata
+(haversine); k-vizinhos amplia o raio até achar k pontos dentro dele.
+
+O índice é salvo em PROCESSED_DIR/inside_<hash>.espacial.npz, ao lado do Arrow, com
+a versão do dataset; é reconstruído só quando o dataset muda.
+"""
+import math
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pyarrow.compute as pc
+
+from . import cache_colunar, catalogo
+
+CELULA_KM = 0.5
+RAIO_MAX_KM = 50.0
+R_TERRA_KM = 6371.0088
+
+_lock = threading.Lock()
+_memoria: Dict[str, "IndiceEspacial"] = {}  # url -> índice carregado
+
+
+def _haversine(lat0: float, lon0: float, lat: np.ndarray, lon: np.ndarray) -> np.ndarray:
+    p0, p = math.radians(lat0), np.radians(lat)
+    dlat = p - p0
+    dlon = np.radians(lon) - math.radians(lon0)
+    a = np.sin(dlat / 2) ** 2 + math.cos(p0) * np.cos(p) * np.sin(dlon / 2) ** 2
+    return 2 * R_TERRA_KM * np.arcsin(np.sqrt(a))
+
+
+class IndiceEspacial:
+    def __init__(self, dados: Dict[str, np.ndarray]):
+        self.d = dados
+        self.lat0 = float(dados["origem"][0])
+        self.lon0 = float(dados["origem"][1])
+        self.kx = R_TERRA_KM * math.cos(math.radians(self.lat0)) * math.pi / 180  # km por grau de longitude
+        self.ky = R_TERRA_KM * math.pi / 180                                      # km por grau de latitude
+        self.cx0, self.cy0, self.ncols = (int(v) for v in dados["grade"])
+        self.tipos: List[str] = list(dados["tipos_nomes"])
+        self.versao = str(dados["versao"])
+
+    # ---------------- construção / persistência ----------------
+
+    @classmethod
+    def construir(cls, ids, lat, lon, preco, tipos, versao: str = "") -> "IndiceEspacial":
+        lat, lon = np.asarray(lat, dtype="float64"), np.asarray(lon, dtype="float64")
+        ok = np.isfinite(lat) & np.isfinite(lon) & (np.abs(lat) <= 90) & (np.abs(lon) <= 180)
+        lat, lon = lat[ok], lon[ok]
+        ids = np.asarray(ids, dtype=object)[ok].astype(str)
+        preco = np.asarray(preco, dtype="float64")[ok]
+        tipos_arr = np.asarray(tipos, dtype=object)[ok]
+        nomes, codigos = np.unique(tipos_arr.astype(str), return_inverse=True)
+
+        lat0 = float(np.median(lat)) if len(lat) else 0.0
+        lon0 = float(np.median(lon)) if len(lon) else 0.0
+        kx = R_TERRA_KM * math.cos(math.radians(lat0)) * math.pi / 180
+        ky = R_TERRA_KM * math.pi / 180
+        cx = np.floor((lon - lon0) * kx / CELULA_KM).astype("int64")
+        cy = np.floor((lat - lat0) * ky / CELULA_KM).astype("int64")
+        cx0 = int(cx.min()) if len(cx) else 0
+        cy0 = int(cy.min()) if len(cy) else 0
+        ncols = int(cx.max() - cx0 + 1) if len(cx) else 1
+        chave = (cy - cy0) * ncols + (cx - cx0)
+
+        ordem = np.argsort(chave, kind="stable")
+        chave = chave[ordem]
+        celulas, inicios = np.unique(chave, return_index=True)
+        return cls({
+            "origem": np.array([lat0, lon0]),
+            "grade": np.array([cx0, cy0, ncols], dtype="int64"),
+            "celulas": celulas,
+            "inicios": np.append(inicios, len(chave)).astype("int64"),
+            "lat": lat[ordem],
+            "lon": lon[ordem],
+            "preco": preco[ordem],
+            "tipo": codigos[ordem].astype("int32"),
+            "ids": ids[ordem],
+            "tipos_nomes": nomes.astype(str),
+            "versao": np.array(versao),
+        })
+
+    def salvar(self, path: Path):
+        tmp = path.with_name(f".{path.name}.tmp.npz")
+        np.savez(tmp, **self.d)
+        tmp.replace(path)
+
+    @classmethod
+    def carregar(cls, path: Path) -> "IndiceEspacial":
+        with np.load(path, allow_pickle=False) as z:
+            return cls({k: z[k] for k in z.files})
+
+    def __len__(self):
+        return len(self.d["lat"])
+
+    # ---------------- consultas ----------------
+
+    def _candidatos(self, lat: float, lon: float, raio_km: float) -> np.ndarray:
+        x = (lon - self.lon0) * self.kx / CELULA_KM
+        y = (lat - self.lat0) * self.ky / CELULA_KM
+        r = raio_km * 1.01 / CELULA_KM  # folga para o erro da projeção longe do centro
+        cx_lo = max(int(math.floor(x - r)) - self.cx0, 0)
+        cx_hi = min(int(math.floor(x + r)) - self.cx0, self.ncols - 1)
+        if cx_lo > cx_hi:
+            return np.empty(0, dtype="int64")
+        celulas, inicios = self.d["celulas"], self.d["inicios"]
+        fatias = []
+        for row in range(int(math.floor(y - r)) - self.cy0, int(math.floor(y + r)) - self.cy0 + 1):
+            if row < 0:
+                continue
+            a = np.searchsorted(celulas, row * self.ncols + cx_lo, side="left")
+            b = np.searchsorted(celulas, row * self.ncols + cx_hi, side="right")
+            if a < b:  # células consecutivas da linha = pontos consecutivos
+                fatias.append(np.arange(inicios[a], inicios[b]))
+        return np.concatenate(fatias) if fatias else np.empty(0, dtype="int64")
+
+    def _filtrar_tipo(self, idx: np.ndarray, tipo: Optional[str]) -> np.ndarray:
+        if not tipo:
+            return idx
+        if tipo not in self.tipos:
+            return idx[:0]
+        return idx[self.d["tipo"][idx] == self.tipos.index(tipo)]
+
+    def _linhas(self, idx: np.ndarray, dist: np.ndarray) -> List[Dict[str, Any]]:
+        d = self.d
+        return [
+            {
+                "id": str(d["ids"][i]),
+                "latitude": float(d["lat"][i]),
+                "longitude": float(d["lon"][i]),
+                "preco": None if np.isnan(d["preco"][i]) else float(d["preco"][i]),
+                "room_type": self.tipos[d["tipo"][i]],
+                "distancia_km": round(float(km), 3),
+            }
+            for i, km in zip(idx, dist)
+        ]
+
+    def raio(self, lat: float, lon: float, raio_km: float, tipo: Optional[str] = None,
+             limite: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Anúncios a até `raio_km` do ponto, do mais perto ao mais longe."""
+        idx = self._filtrar_tipo(self._candidatos(lat, lon, raio_km), tipo)
+        dist = _haversine(lat, lon, self.d["lat"][idx], self.d["lon"][idx])
+        dentro = dist <= raio_km
+        idx, dist = idx[dentro], dist[dentro]
+        ordem = np.argsort(dist, kind="stable")[:limite]
+        return self._linhas(idx[ordem], dist[ordem])
+
+    def vizinhos(self, lat: float, lon: float, k: int, tipo: Optional[str] = None,
+                 raio_max_km: float = RAIO_MAX_KM) -> List[Dict[str, Any]]:
+        """k anúncios mais próximos (até `raio_max_km`)."""
+        r = CELULA_KM
+        while True:
+            achados = self.raio(lat, lon, r, tipo, limite=k)
+            # k achados dentro de r: nenhum ponto fora do círculo pode estar mais perto
+            if len(achados) >= k or r >= raio_max_km:
+                return achados
+            r = min(r * 2, raio_max_km)
+
+
+def _caminho(url: str) -> Path:
+    return cache_colunar.PROCESSED_DIR / f"inside_{cache_colunar.url_hash(url)}.espacial.npz"
+
+
+def _construir(ds: catalogo.Dataset, versao: str) -> IndiceEspacial:
+    colunas = ["id", "latitude", "longitude", "price", "room_type"]
+    tabela = cache_colunar.ler_arrow(ds.url, ds.max_age_sec, colunas, ds.sha256)
+    if not {"latitude", "longitude"} <= set(tabela.column_names):
+        raise RuntimeError("Dataset sem latitude/longitude.")
+    n = tabela.num_rows
+
+    def _col(nome, padrao):
+        if nome not in tabela.column_names:
+            return np.full(n, padrao, dtype=object)
+        return pc.fill_null(tabela[nome], padrao).to_numpy(zero_copy_only=False)
+
+    ids = _col("id", "") if "id" in tabela.column_names else np.arange(n).astype(str)
+    indice = IndiceEspacial.construir(
+        ids, _col("latitude", np.nan), _col("longitude", np.nan),
+        _col("price", np.nan), _col("room_type", ""), versao,
+    )
+    indice.salvar(_caminho(ds.url))
+    print(f"[ESPACIAL] índice de {ds.cidade}: {len(indice)} pontos")
+    return indice
+
+
+def obter(cidade: str) -> IndiceEspacial:
+    """Índice da cidade (memória -> .npz -> construção), sempre na versão atual do dataset."""
+    ds = catalogo.resolver(cidade)
+    if not ds or not ds.url:
+        raise LookupError(f"Sem dataset para '{cidade}' no catálogo.")
+    versao = cache_colunar.versao_dataset(cache_colunar.garantir(ds.url, ds.max_age_sec, ds.sha256))
+    with _lock:
+        indice = _memoria.get(ds.url)
+        if indice is None or indice.versao != versao:
+            path = _caminho(ds.url)
+            indice = IndiceEspacial.carregar(path) if path.exists() else None
+            if indice is None or indice.versao != versao:
+                indice = _construir(ds, versao)
+            _memoria[ds.url] = indice
+    return indice
+
+
+def aquecer(cidades: Optional[List[str]] = None) -> Dict[str, str]:
+    """Pré-constrói (ou valida) os índices das cidades fora do caminho da requisição."""
+    feitos: Dict[str, str] = {}
+    alvos = [catalogo.resolver(c) for c in cidades] if cidades else catalogo.com_dataset()
+    for ds in alvos:
+        if not ds or not ds.url or ds.url in feitos:
+            continue
+        try:
+            feitos[ds.url] = f"{len(obter(ds.cidade))} pontos"
+        except Exception as e:
+            print(f"[ESPACIAL] falha ao aquecer {ds.cidade}: {e}")
+            feitos[ds.url] = "erro"
+    return feitos
+
+
+def comparaveis(
+    cidade: str,
+    lat: float,
+    lon: float,
+    raio_km: Optional[float] = None,
+    k: int = 20,
+    tipo_imovel: Optional[str] = None,
+) -> Dict[str, Any]:
+    """k mais próximos (ou todos no raio, até k) com resumo de preços dos comparáveis."""
+    indice = obter(cidade)
+    if raio_km:
+        itens = indice.raio(lat, lon, raio_km, tipo_imovel, limite=k)
+    else:
+        itens = indice.vizinhos(lat, lon, k, tipo_imovel)
+    precos = np.array([i["preco"] for i in itens if i["preco"] is not None], dtype="float64")
+    return {
+        "cidade": cidade,
+        "total": len(itens),
+        "preco_mediano": round(float(np.median(precos)), 2) if len(precos) else None,
+        "preco_medio": round(float(precos.mean()), 2) if len(precos) else None,
+        "raio_km": raio_km or (itens[-1]["distancia_km"] if itens else None),
+        "itens": itens,
+    }
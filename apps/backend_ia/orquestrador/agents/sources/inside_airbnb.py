@@ -1,72 +1,18 @@
-import io, zipfile, urllib.request, os, hashlib, time
-import pandas as pd
-from datetime import datetime
-from typing import Dict, Any, List, Optional
+import os, threading, time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, Any, List, Optional, Callable, Tuple
 
-# === Config ===
-CACHE_DIR = os.path.join(os.path.expanduser("~"), ".eiah_cache")
-os.makedirs(CACHE_DIR, exist_ok=True)
-
-# Cole os links exatos de "listings.csv(.gz)" daqui: https://insideairbnb.com/get-the-data/
-CITY_DATASETS = {
-    "Florianopolis": "PUT_THE_REAL_URL_HERE_for_florianopolis_listings_csv_or_gz",
-    # Se não houver BC, use None (retorna métricas None) ou reaproveite Floripa como proxy:
-    "Balneario Camboriu": None,  # ou o mesmo link de Floripa, se quiser proxy
-}
-
-def _cache_path(url: str) -> str:
-    h = hashlib.sha256(url.encode("utf-8")).hexdigest()[:16]
-    ext = ".csv.gz" if url.endswith(".gz") else ".csv"
-    return os.path.join(CACHE_DIR, f"inside_{h}{ext}")
-
-def _download_or_cache_csv(url: str, max_age_sec: int = 86400) -> pd.DataFrame:
-    path = _cache_path(url)
-    if os.path.exists(path) and (time.time() - os.path.getmtime(path) < max_age_sec):
-        return pd.read_csv(path, compression="gzip" if path.endswith(".gz") else None, low_memory=False)
-
-    with urllib.request.urlopen(url) as resp:
-        raw = resp.read()
-
-    if url.endswith(".gz"):
-        open(path, "wb").write(raw)
-        return pd.read_csv(path, compression="gzip", low_memory=False)
+from . import agregados, cache_colunar, catalogo, metricas_store, serie_historica
+from ...services import execucao
 
-    if url.endswith(".zip"):
-        zf = zipfile.ZipFile(io.BytesIO(raw))
-        name = next((n for n in zf.namelist() if n.lower().endswith(".csv")), None)
-        if not name:
-            raise RuntimeError("ZIP sem CSV.")
-        with zf.open(name) as f:
-            df = pd.read_csv(f, low_memory=False)
-        df.to_csv(path, index=False)
-        return df
-
-    # CSV puro
-    open(path, "wb").write(raw)
-    return pd.read_csv(path, low_memory=False)
-
-def _normalize_price(series: pd.Series) -> pd.Series:
-    s = series.astype(str).str.replace(r"[^\d,\.]", "", regex=True)
-    s = s.str.replace(".", "", regex=False).str.replace(",", ".", regex=False)
-    return pd.to_numeric(s, errors="coerce")
-
-def _compute_seasonality(df: pd.DataFrame) -> List[str]:
-    if "last_review" not in df.columns: return []
-    dt = pd.to_datetime(df["last_review"], errors="coerce")
-    dt = dt.dropna()
-    if dt.empty: return []
-    counts = dt.dt.month.value_counts().sort_values(ascending=False)
-    nomes = {1:"jan",2:"fev",3:"mar",4:"abr",5:"mai",6:"jun",7:"jul",8:"ago",9:"set",10:"out",11:"nov",12:"dez"}
-    return [nomes.get(m, str(m)) for m in counts.index[:3]]
-
-def _compute_room_types(df: pd.DataFrame) -> List[str]:
-    for c in ["room_type", "property_type", "room_type_category"]:
-        if c in df.columns:
-            vc = df[c].astype(str).value_counts().head(3)
-            return vc.index.tolist()
-    return []
+# === Config ===
+# Bruto em data/raw e processado (Arrow) em data/processed – ver cache_colunar.py
+# Cidades -> datasets (url, snapshot, sha256, proxy, max_age_sec): catalogo_cidades.json,
+# ver catalogo.py
 
-def compute_metrics_for_city(city: str, url: Optional[str]) -> Dict[str, Any]:
+def compute_metrics_for_city(
+    city: str, url: Optional[str], max_age_sec: Optional[int] = None, sha256: Optional[str] = None,
+) -> Dict[str, Any]:
     if not url:
         return {
             "cidade": city, "ticket_medio": None, "ocupacao_media": None,
@@ -74,52 +20,119 @@ def compute_metrics_for_city(city: str, url: Optional[str]) -> Dict[str, Any]:
             "fonte": "InsideAirbnb (indisponível p/ cidade)"
         }
     try:
-        df = _download_or_cache_csv(url)
-
-        # Ticket médio
-        price_col = next((c for c in ["price","median_price","avg_price"] if c in df.columns), None)
-        ticket_medio = None
-        if price_col:
-            prices = _normalize_price(df[price_col])
-            if prices.notna().any():
-                ticket_medio = float(prices.mean())
-
-        # Ocupação (aprox) via availability_365
-        ocupacao_media = None
-        if "availability_365" in df.columns:
-            avail = pd.to_numeric(df["availability_365"], errors="coerce").dropna()
-            if not avail.empty:
-                ocupacao_media = float(1.0 - (avail.mean()/365.0))
-
-        sazonalidade = _compute_seasonality(df)
-        tipos = _compute_room_types(df)
+        # agregados (somas, contagens, frequências) calculados em blocos na ingestão –
+        # ver cache_colunar._processar / agregados.py; o CSV não é carregado inteiro
+        entrada = cache_colunar.garantir(url, max_age_sec, sha256)
+        return {"cidade": city, **agregados.metricas(entrada["agregados"]), "fonte": "InsideAirbnb"}
+    except Exception as e:
+        return _metricas_erro(city, e)
+
+def _metricas_erro(city: str, e: Exception) -> Dict[str, Any]:
+    return {
+        "cidade": city, "erro": str(e),
+        "ticket_medio": None, "ocupacao_media": None,
+        "sazonalidade": [], "tipos_imovel": [], "duracao_media": None,
+        "fonte": "InsideAirbnb (falha de leitura)"
+    }
+
+def _ms(t0: float) -> float:
+    return round((time.perf_counter() - t0) * 1000, 2)
+
+def _metricas_cidade(city: str, pool_cpu) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """Uma cidade: memória -> revalidação/download (I/O, nesta thread) -> cálculo (pool de processos)."""
+    t0 = time.perf_counter()
+    rel = {"origem": None, "download_ms": 0.0, "calculo_ms": 0.0}
+    ds = catalogo.resolver(city)
+    url = ds.url if ds else None
+    if not url:
+        rel["origem"] = "sem_dataset"
+        return compute_metrics_for_city(city, url), rel
+    if ds.proxy_de:
+        rel["proxy_de"] = ds.proxy_de
 
-        duracao_media = None
-        if "minimum_nights" in df.columns:
-            mn = pd.to_numeric(df["minimum_nights"], errors="coerce").dropna()
-            if not mn.empty:
-                duracao_media = float(mn.mean())
+    metricas = metricas_store.em_memoria(city, url)
+    if metricas is not None:
+        rel["origem"] = "memoria"
+        return metricas, rel
 
-        return {
-            "cidade": city,
-            "ticket_medio": round(ticket_medio, 2) if ticket_medio is not None else None,
-            "ocupacao_media": round(ocupacao_media, 4) if ocupacao_media is not None else None,
-            "sazonalidade": sazonalidade,
-            "tipos_imovel": tipos,
-            "duracao_media": round(duracao_media, 2) if duracao_media is not None else None,
-            "fonte": "InsideAirbnb"
-        }
+    try:
+        metricas, versao = metricas_store.validar(city, url, ds.max_age_sec, ds.sha256)
     except Exception as e:
-        return {
-            "cidade": city, "erro": str(e),
-            "ticket_medio": None, "ocupacao_media": None,
-            "sazonalidade": [], "tipos_imovel": [], "duracao_media": None,
-            "fonte": "InsideAirbnb (falha de leitura)"
-        }
+        rel["download_ms"] = _ms(t0)
+        metricas = metricas_store.anterior(city, url)
+        rel["origem"] = "anterior" if metricas is not None else "erro"
+        return (metricas if metricas is not None else _metricas_erro(city, e)), rel
+    rel["download_ms"] = _ms(t0)
+    if metricas is not None:
+        rel["origem"] = "store"
+        return metricas, rel
+
+    t1 = time.perf_counter()
+    if pool_cpu is not None:
+        metricas = pool_cpu.submit(compute_metrics_for_city, city, url, ds.max_age_sec, ds.sha256).result()
+    else:
+        metricas = compute_metrics_for_city(city, url, ds.max_age_sec, ds.sha256)
+    if ds.proxy_de and "erro" not in metricas:
+        metricas["fonte"] = f"InsideAirbnb (proxy: {ds.proxy_de})"
+    rel["calculo_ms"] = _ms(t1)
+    rel["origem"] = "calculo"
+    rel["versao"] = versao
+    metricas_store.salvar(city, url, versao, metricas)
+    return metricas, rel
+
+def calcular_cidades(
+    cities: List[str],
+    workers: Optional[int] = None,
+    progresso: Optional[Callable[[str, int, int, Dict[str, Any]], None]] = None,
+) -> Tuple[Dict[str, Any], Dict[str, Dict[str, Any]]]:
+    """
+    Métricas de várias cidades em paralelo: downloads concorrentes em `workers` threads
+    (EIAH_CIDADES_WORKERS, padrão 4) e parse/agregação no pool de processos compartilhado.
+    Falha de uma cidade não afeta as outras. `progresso(cidade, concluidas, total, relatorio)`
+    é chamado a cada cidade concluída. Retorna (métricas, relatório por cidade com tempos).
+    """
+    workers = workers or int(os.getenv("EIAH_CIDADES_WORKERS", "4"))
+    pool_cpu = execucao.pool_cpu()
+    resultados: Dict[str, Any] = {}
+    relatorio: Dict[str, Dict[str, Any]] = {}
+    lock = threading.Lock()
+
+    def _rodar(city: str):
+        t0 = time.perf_counter()
+        try:
+            metricas, rel = _metricas_cidade(city, pool_cpu)
+        except Exception as e:
+            metricas, rel = _metricas_erro(city, e), {"origem": "erro"}
+        rel["status"] = "erro" if "erro" in metricas else "ok"
+        rel["total_ms"] = _ms(t0)
+        with lock:
+            resultados[city], relatorio[city] = metricas, rel
+            feitas = len(resultados)
+        print(f"[INSIDE] {city}: {rel['status']} ({rel['origem']}) em {rel['total_ms']} ms [{feitas}/{len(cities)}]")
+        if progresso:
+            progresso(city, feitas, len(cities), rel)
+
+    unicas = list(dict.fromkeys(cities))
+    if len(unicas) == 1:
+        _rodar(unicas[0])
+    else:
+        with ThreadPoolExecutor(max_workers=min(workers, len(unicas)) or 1, thread_name_prefix="inside") as tp:
+            for f in as_completed([tp.submit(_rodar, c) for c in unicas]):
+                f.result()
+    ordem = {c: resultados[c] for c in unicas}
+    _registrar_serie(ordem, relatorio)
+    return ordem, {c: relatorio[c] for c in unicas}
+
+def _registrar_serie(metricas: Dict[str, Any], relatorio: Dict[str, Dict[str, Any]]):
+    """Guarda na série histórica só o que foi recalculado agora (hits de cache já estão lá)."""
+    novas = {c: m for c, m in metricas.items() if relatorio[c].get("origem") == "calculo"}
+    if not novas:
+        return
+    try:
+        serie_historica.registrar(novas, "inside_airbnb", {c: relatorio[c].get("versao") for c in novas})
+    except Exception as e:
+        print(f"[INSIDE] falha ao registrar série histórica: {e}")
 
 def get_city_metrics(cities: List[str]) -> Dict[str, Any]:
-    out = {}
-    for c in cities:
-        url = CITY_DATASETS.get(c)
-        out[c] = compute_metrics_for_city(c, url)
-    return out
+    """Métricas por cidade servidas do store materializado (recalcula só se o dataset mudou)."""
+    return calcular_cidades(cities)[0]
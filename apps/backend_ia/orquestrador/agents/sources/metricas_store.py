@@ -0,0 +1,127 @@
+# apps/backend_ia/orquestrador/agents/sources/metricas_store.py
+"""
+Métricas materializadas por cidade.
+
+Cada cidade guarda as métricas calculadas para uma versão do dataset (sha256 do
+bruto + schema do processado). Dentro do TTL a resposta sai direto da memória;
+vencido o TTL, o dataset é revalidado (GET condicional via cache_colunar) e as
+métricas só são recalculadas se a versão mudou. O store é persistido em
+PROCESSED_DIR/inside_metricas.json para sobreviver a restarts.
+
+Toda escrita relê o arquivo sob flock (inside_metricas.json.lock), aplica a mudança
+e regrava: workers do uvicorn e o pool de processos do prefetch não sobrescrevem
+as cidades uns dos outros.
+
+Variáveis de ambiente:
+  EIAH_METRICAS_TTL  segundos até revalidar o dataset de uma cidade (padrão 3600)
+"""
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from . import cache_colunar
+from ...utils.arquivos import escrever_json, ler_json
+
+try:
+    import fcntl  # trava entre processos (indisponível no Windows)
+except ImportError:  # pragma: no cover
+    fcntl = None
+
+TTL_SEC = int(os.getenv("EIAH_METRICAS_TTL", "3600"))
+
+_lock = threading.RLock()
+_mem: Optional[Dict[str, Dict[str, Any]]] = None  # cidade -> {url, versao, verificado_em, metricas}
+
+
+def _arquivo():
+    return cache_colunar.PROCESSED_DIR / "inside_metricas.json"
+
+
+def _registros() -> Dict[str, Dict[str, Any]]:
+    global _mem
+    if _mem is None:
+        with _lock:
+            if _mem is None:
+                _mem = ler_json(_arquivo(), {}) or {}
+    return _mem
+
+
+@contextmanager
+def _trava_arquivo():
+    arquivo = _arquivo()
+    arquivo.parent.mkdir(parents=True, exist_ok=True)
+    # arquivo de trava à parte: o json é trocado por os.replace a cada escrita
+    with open(arquivo.with_name(arquivo.name + ".lock"), "a") as f:
+        if fcntl:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def _atualizar(mudar: Callable[[Dict[str, Dict[str, Any]]], Any]):
+    """
+    Relê o arquivo (escritas de outros processos), aplica `mudar` e regrava – sob o lock
+    da thread e a trava do arquivo (`mudar` devolvendo False: nada a gravar). A memória
+    passa a ser o resultado (troca de referência: leituras em curso seguem com o dict anterior).
+    """
+    global _mem
+    with _lock, _trava_arquivo():
+        regs = ler_json(_arquivo(), {}) or {}
+        if mudar(regs) is not False:
+            escrever_json(_arquivo(), regs)
+        _mem = regs
+
+
+def em_memoria(cidade: str, url: str, ttl_sec: Optional[int] = None) -> Optional[Dict[str, Any]]:
+    """Caminho rápido: métricas ainda dentro do TTL (nenhum I/O)."""
+    ttl = TTL_SEC if ttl_sec is None else ttl_sec
+    reg = _registros().get(cidade)
+    if reg and reg.get("url") == url and time.time() - reg.get("verificado_em", 0) < ttl:
+        return reg["metricas"]
+    return None
+
+
+def validar(
+    cidade: str, url: str, max_age_sec: Optional[int] = None, sha256: Optional[str] = None,
+) -> Tuple[Optional[Dict[str, Any]], str]:
+    """
+    Revalida o dataset (só I/O: GET condicional do bruto) e devolve (métricas, versão).
+    Métricas vêm None quando precisam ser recalculadas para a versão atual.
+    """
+    versao = cache_colunar.versao_dataset(cache_colunar.atualizar_bruto(url, max_age_sec, sha256))
+    vigente: Dict[str, Any] = {}
+
+    def marcar(regs):
+        # o arquivo pode ter a versão atual calculada por outro worker
+        reg = regs.get(cidade)
+        if not (reg and reg.get("url") == url and reg.get("versao") == versao):
+            return False
+        reg["verificado_em"] = time.time()
+        vigente["metricas"] = reg["metricas"]
+
+    _atualizar(marcar)
+    return vigente.get("metricas"), versao
+
+
+def anterior(cidade: str, url: str) -> Optional[Dict[str, Any]]:
+    """Último valor materializado (mesmo vencido) – usado quando a revalidação falha."""
+    reg = _registros().get(cidade)
+    return reg["metricas"] if reg and reg.get("url") == url else None
+
+
+def salvar(cidade: str, url: str, versao: str, metricas: Dict[str, Any]):
+    if "erro" in metricas:  # falhas não são materializadas
+        return
+    agora = time.time()
+    reg = {"url": url, "versao": versao, "verificado_em": agora, "calculado_em": agora, "metricas": metricas}
+    _atualizar(lambda regs: regs.__setitem__(cidade, reg))
+
+
+def invalidar(cidade: Optional[str] = None):
+    """Remove a cidade (ou tudo) do store; o próximo acesso recalcula."""
+    _atualizar(lambda regs: regs.clear() if cidade is None else regs.pop(cidade, None))
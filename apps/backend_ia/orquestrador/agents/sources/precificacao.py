@@ -0,0 +1,194 @@
+# apps/backend_ia/orquestrador/agents/sources/precificacao.py
+"""
+Precificação dinâmica a partir dos listings InsideAirbnb.
+
+Para cada dataset (url do catálogo) é pré-calculada uma tabela com:
+  - quantis de preço (QUANTIS) por room_type e geral ("*");
+  - curva sazonal: fator por mês derivado da demanda (nº de reviews por mês do
+    last_review, já agregado na ingestão), limitado a [FATOR_MIN, FATOR_MAX].
+
+As tabelas ficam em memória e em PROCESSED_DIR/inside_precos.json, indexadas pela
+url e marcadas com a versão do dataset. `sugerir()` é só lookup + interpolação
+(sub-milissegundo); a tabela só é montada no caminho da requisição na primeira vez.
+`aquecer()` (chamado pelo prefetch) revalida o dataset e remonta o que mudou.
+"""
+import bisect
+import os
+import threading
+import time
+from datetime import date
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pyarrow.compute as pc
+
+from . import cache_colunar, catalogo
+from ...utils.arquivos import escrever_json, ler_json
+
+QUANTIS = [0.05, 0.1, 0.25, 0.5, 0.75, 0.9, 0.95]
+MIN_AMOSTRAS = 5        # room_type com menos anúncios cai na distribuição geral
+ALFA_SAZONAL = float(os.getenv("EIAH_PRECO_ALFA", "0.3"))  # peso da demanda no fator do mês
+FATOR_MIN, FATOR_MAX = 0.8, 1.25
+
+_lock = threading.Lock()
+_tabelas: Optional[Dict[str, Dict[str, Any]]] = None  # url -> tabela
+
+
+def _arquivo():
+    return cache_colunar.PROCESSED_DIR / "inside_precos.json"
+
+
+def _todas() -> Dict[str, Dict[str, Any]]:
+    global _tabelas
+    if _tabelas is None:
+        with _lock:
+            if _tabelas is None:
+                _tabelas = ler_json(_arquivo(), {}) or {}
+    return _tabelas
+
+
+def _curva_sazonal(meses: Dict[str, int]) -> Dict[str, float]:
+    contagens = {int(m): n for m, n in (meses or {}).items()}
+    if not contagens:
+        return {str(m): 1.0 for m in range(1, 13)}
+    media = sum(contagens.values()) / 12.0
+    curva = {}
+    for m in range(1, 13):
+        fator = 1.0 + ALFA_SAZONAL * (contagens.get(m, 0) / media - 1.0)
+        curva[str(m)] = round(min(FATOR_MAX, max(FATOR_MIN, fator)), 4)
+    return curva
+
+
+def construir(url: str, max_age_sec: Optional[int] = None, sha256: Optional[str] = None) -> Dict[str, Any]:
+    """Tabela de quantis + curva sazonal do dataset (lê só price/room_type do Arrow, via mmap)."""
+    tabela = cache_colunar.ler_arrow(url, max_age_sec, ["price", "room_type"], sha256)
+    entrada = cache_colunar.ler_manifesto().get(cache_colunar.url_hash(url), {})
+    if "price" not in tabela.column_names:
+        raise RuntimeError("Dataset sem coluna de preço.")
+
+    validos = pc.and_(pc.is_valid(tabela["price"]), pc.greater(tabela["price"], 0))
+    tabela = tabela.filter(validos)
+    precos = tabela["price"].to_numpy()
+    tipos: Dict[str, Dict[str, Any]] = {}
+    if len(precos):
+        tipos["*"] = {"q": np.quantile(precos, QUANTIS).round(2).tolist(), "n": int(len(precos))}
+    if "room_type" in tabela.column_names:
+        rts = tabela["room_type"].to_numpy(zero_copy_only=False)
+        for rt in pc.unique(tabela["room_type"]).to_pylist():
+            if rt is None:
+                continue
+            grupo = precos[rts == rt]
+            if len(grupo) >= MIN_AMOSTRAS:
+                tipos[rt] = {"q": np.quantile(grupo, QUANTIS).round(2).tolist(), "n": int(len(grupo))}
+
+    return {
+        "versao": cache_colunar.versao_dataset(entrada),
+        "quantis": QUANTIS,
+        "tipos": tipos,
+        "sazonal": _curva_sazonal(entrada.get("agregados", {}).get("meses", {})),
+        "construida_em": time.time(),
+    }
+
+
+def _salvar(url: str, tabela: Dict[str, Any]):
+    with _lock:
+        _todas()[url] = tabela
+        escrever_json(_arquivo(), dict(_todas()))
+
+
+def _tabela(ds: catalogo.Dataset) -> Dict[str, Any]:
+    tabela = _todas().get(ds.url)
+    if tabela is None:  # 1ª vez: monta no caminho da requisição
+        tabela = construir(ds.url, ds.max_age_sec, ds.sha256)
+        _salvar(ds.url, tabela)
+    return tabela
+
+
+def aquecer(cidades: Optional[List[str]] = None) -> Dict[str, str]:
+    """Revalida os datasets das cidades e remonta as tabelas cuja versão mudou."""
+    feitos: Dict[str, str] = {}
+    alvos = [catalogo.resolver(c) for c in cidades] if cidades else catalogo.com_dataset()
+    for ds in alvos:
+        if not ds or not ds.url or ds.url in feitos:
+            continue
+        try:
+            versao = cache_colunar.versao_dataset(cache_colunar.atualizar_bruto(ds.url, ds.max_age_sec, ds.sha256))
+            atual = _todas().get(ds.url)
+            if atual and atual.get("versao") == versao:
+                feitos[ds.url] = "ok"
+                continue
+            _salvar(ds.url, construir(ds.url, ds.max_age_sec, ds.sha256))
+            feitos[ds.url] = "reconstruida"
+        except Exception as e:
+            print(f"[PRECO] falha ao aquecer {ds.cidade}: {e}")
+            feitos[ds.url] = "erro"
+    return feitos
+
+
+def _interpolar(percentil: float, quantis: List[float], valores: List[float]) -> float:
+    p = min(max(percentil, quantis[0]), quantis[-1])
+    i = bisect.bisect_left(quantis, p)
+    if quantis[i] == p:
+        return valores[i]
+    q0, q1, v0, v1 = quantis[i - 1], quantis[i], valores[i - 1], valores[i]
+    return v0 + (v1 - v0) * (p - q0) / (q1 - q0)
+
+
+def _fator_estadia(sazonal: Dict[str, float], inicio: Optional[date], fim: Optional[date]) -> float:
+    """Média do fator mensal ponderada pelas noites da estadia em cada mês."""
+    if not inicio:
+        return 1.0
+    if not fim or fim <= inicio:
+        return sazonal.get(str(inicio.month), 1.0)
+    total, soma, d = 0, 0.0, inicio
+    while d < fim:
+        # pula mês a mês (no máximo ~13 iterações por ano de estadia)
+        prox = date(d.year + (d.month == 12), d.month % 12 + 1, 1)
+        noites = (min(prox, fim) - d).days
+        soma += sazonal.get(str(d.month), 1.0) * noites
+        total += noites
+        d = prox
+    return soma / total
+
+
+def _data(valor) -> Optional[date]:
+    if not valor:
+        return None
+    if isinstance(valor, date):
+        return valor
+    return date.fromisoformat(str(valor)[:10])
+
+
+def sugerir(
+    cidade: str,
+    tipo_imovel: Optional[str] = None,
+    data_inicio=None,
+    data_fim=None,
+    percentil: float = 0.5,
+) -> Dict[str, Any]:
+    """
+    Diária sugerida: quantil `percentil` da distribuição de preços (room_type, se houver
+    amostras suficientes, senão geral) × fator sazonal médio das noites da estadia.
+    """
+    ds = catalogo.resolver(cidade)
+    if not ds or not ds.url:
+        raise LookupError(f"Sem dataset para '{cidade}' no catálogo.")
+    tabela = _tabela(ds)
+    grupo_nome = tipo_imovel if tipo_imovel in tabela["tipos"] else "*"
+    grupo = tabela["tipos"].get(grupo_nome)
+    if not grupo:
+        raise LookupError(f"Dataset de '{cidade}' sem preços válidos.")
+
+    base = _interpolar(percentil, tabela["quantis"], grupo["q"])
+    fator = _fator_estadia(tabela["sazonal"], _data(data_inicio), _data(data_fim))
+    return {
+        "valorDiaria": round(base * fator, 2),
+        "base": round(base, 2),
+        "fatorSazonal": round(fator, 4),
+        "percentil": percentil,
+        "tipoImovel": grupo_nome,
+        "amostras": grupo["n"],
+        "cidade": cidade,
+        "proxy_de": ds.proxy_de,
+        "versao": tabela["versao"],
+    }
@@ -0,0 +1,215 @@
+# apps/backend_ia/orquestrador/agents/sources/serie_historica.py
+"""
+Série histórica das métricas de mercado por cidade.
+
+Cada snapshot calculado (inside_airbnb.calcular_cidades, consultor_mercado.executar)
+é anexado, nunca sobrescrito, em Parquet particionado no estilo hive:
+
+    PROCESSED_DIR/serie/cidade=<cidade>/mes=<AAAA-MM>/parte-*.parquet
+
+Cada gravação vira um arquivo pequeno (tmp + rename, então leitores nunca veem
+arquivo pela metade). Quando uma partição passa de COMPACTAR_APOS partes, elas são
+fundidas num único Parquet ordenado por ts. Consultas por intervalo usam
+pyarrow.dataset com poda por partição (cidade / mês) e filtro em ts, sem reler os
+dumps do InsideAirbnb.
+"""
+import os
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+from urllib.parse import quote
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+try:
+    import fcntl  # trava entre processos (indisponível no Windows)
+except ImportError:  # pragma: no cover
+    fcntl = None
+
+from ...utils.paths import PROCESSED_DIR
+
+DIR = PROCESSED_DIR / "serie"
+COMPACTAR_APOS = 32  # partes por partição antes de fundir
+
+CAMPOS = ("ticket_medio", "ocupacao_media", "duracao_media")
+SCHEMA = pa.schema([
+    ("ts", pa.timestamp("ms", tz="UTC")),
+    ("fonte", pa.string()),
+    ("versao", pa.string()),
+    ("ticket_medio", pa.float64()),
+    ("ocupacao_media", pa.float64()),
+    ("duracao_media", pa.float64()),
+    ("sazonalidade", pa.list_(pa.string())),
+    ("tipos_imovel", pa.list_(pa.string())),
+])
+PARTICOES = pa.schema([("cidade", pa.string()), ("mes", pa.string())])
+
+_lock = threading.RLock()
+
+
+class _Trava:
+    """RLock no processo + flock no diretório (compartilhada p/ leitura, exclusiva p/ escrita)."""
+
+    def __init__(self, exclusiva: bool):
+        self.modo = (fcntl.LOCK_EX if exclusiva else fcntl.LOCK_SH) if fcntl else None
+        self.arquivo = None
+
+    def __enter__(self):
+        _lock.acquire()
+        DIR.mkdir(parents=True, exist_ok=True)
+        self.arquivo = open(DIR / ".lock", "a")
+        if fcntl:
+            fcntl.flock(self.arquivo, self.modo)
+        return self
+
+    def __exit__(self, *exc):
+        self.arquivo.close()
+        _lock.release()
+
+
+def _mes(ts: datetime) -> str:
+    return ts.strftime("%Y-%m")
+
+
+def _particao(cidade: str, mes: str) -> Path:
+    # hive: o pyarrow decodifica %xx ao ler (cidades com espaço / acento)
+    return DIR / f"cidade={quote(cidade, safe='')}" / f"mes={mes}"
+
+
+def _tem_dado(m: Dict[str, Any]) -> bool:
+    return "erro" not in m and (any(m.get(c) is not None for c in CAMPOS)
+                                or bool(m.get("sazonalidade")) or bool(m.get("tipos_imovel")))
+
+
+def registrar(
+    metricas: Dict[str, Dict[str, Any]],
+    fonte: str,
+    versoes: Optional[Dict[str, str]] = None,
+    ts: Optional[datetime] = None,
+) -> int:
+    """
+    Anexa um snapshot {cidade: métricas}. Cidades com erro ou sem nenhum número são
+    ignoradas. Retorna quantas linhas foram gravadas.
+    """
+    ts = (ts or datetime.now(timezone.utc)).astimezone(timezone.utc)
+    versoes = versoes or {}
+    linhas = [
+        {
+            "ts": ts, "fonte": fonte, "versao": versoes.get(cidade),
+            **{c: m.get(c) for c in CAMPOS},
+            "sazonalidade": list(m.get("sazonalidade") or []),
+            "tipos_imovel": list(m.get("tipos_imovel") or []),
+            "_cidade": cidade,
+        }
+        for cidade, m in metricas.items() if _tem_dado(m)
+    ]
+    if not linhas:
+        return 0
+
+    cheias = []
+    with _Trava(exclusiva=True):
+        for cidade in dict.fromkeys(l["_cidade"] for l in linhas):
+            tabela = pa.Table.from_pylist([l for l in linhas if l["_cidade"] == cidade], schema=SCHEMA)
+            destino = _particao(cidade, _mes(ts))
+            destino.mkdir(parents=True, exist_ok=True)
+            nome = f"parte-{int(time.time() * 1000):013d}-{uuid.uuid4().hex[:8]}.parquet"
+            tmp = destino / f".{nome}.tmp"  # ocultos (".") são ignorados pelo pyarrow.dataset
+            pq.write_table(tabela, tmp)
+            os.replace(tmp, destino / nome)
+            if len(list(destino.glob("parte-*.parquet"))) > COMPACTAR_APOS:
+                cheias.append(destino)
+        for destino in cheias:
+            _compactar_particao(destino)
+    print(f"[SERIE] {len(linhas)} snapshot(s) de '{fonte}' registrados")
+    return len(linhas)
+
+
+def _compactar_particao(destino: Path):
+    partes = sorted(destino.glob("*.parquet"))
+    if len(partes) <= 1:
+        return
+    tabela = pa.concat_tables([pq.read_table(p, schema=SCHEMA) for p in partes])
+    tabela = tabela.sort_by("ts")
+    nome = f"compacto-{int(time.time() * 1000):013d}.parquet"
+    tmp = destino / f".{nome}.tmp"
+    pq.write_table(tabela, tmp, compression="zstd")
+    os.replace(tmp, destino / nome)
+    for p in partes:
+        p.unlink(missing_ok=True)
+
+
+def compactar(cidade: Optional[str] = None):
+    """Funde as partes de todas as partições (ou só das de `cidade`)."""
+    padrao = f"cidade={quote(cidade, safe='')}/mes=*" if cidade else "cidade=*/mes=*"
+    with _Trava(exclusiva=True):
+        for destino in DIR.glob(padrao):
+            _compactar_particao(destino)
+
+
+def consultar(
+    cidade: Optional[str] = None,
+    inicio: Optional[datetime] = None,
+    fim: Optional[datetime] = None,
+    fonte: Optional[str] = None,
+) -> pd.DataFrame:
+    """Snapshots no intervalo [inicio, fim) ordenados por ts (colunas de SCHEMA + cidade)."""
+    if not DIR.exists() or not any(DIR.glob("cidade=*")):
+        return SCHEMA.empty_table().append_column("cidade", pa.array([], pa.string())).to_pandas()
+
+    filtro = None
+
+    def _e(expr):
+        nonlocal filtro
+        filtro = expr if filtro is None else filtro & expr
+
+    if cidade:
+        _e(ds.field("cidade") == cidade)
+    if inicio:
+        inicio = inicio.astimezone(timezone.utc) if inicio.tzinfo else inicio.replace(tzinfo=timezone.utc)
+        _e(ds.field("mes") >= _mes(inicio))  # poda de partição
+        _e(ds.field("ts") >= pa.scalar(inicio, pa.timestamp("ms", tz="UTC")))
+    if fim:
+        fim = fim.astimezone(timezone.utc) if fim.tzinfo else fim.replace(tzinfo=timezone.utc)
+        _e(ds.field("mes") <= _mes(fim))
+        _e(ds.field("ts") < pa.scalar(fim, pa.timestamp("ms", tz="UTC")))
+    if fonte:
+        _e(ds.field("fonte") == fonte)
+
+    with _Trava(exclusiva=False):
+        dataset = ds.dataset(DIR, schema=pa.unify_schemas([SCHEMA, PARTICOES]), format="parquet",
+                             partitioning=ds.partitioning(PARTICOES, flavor="hive"))
+        tabela = dataset.to_table(filter=filtro, columns=[*SCHEMA.names, "cidade"])
+    return tabela.sort_by([("cidade", "ascending"), ("ts", "ascending")]).to_pandas()
+
+
+def tendencia(
+    cidade: str,
+    inicio: Optional[datetime] = None,
+    fim: Optional[datetime] = None,
+    fonte: Optional[str] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Resumo mensal para gráficos: médias de ticket / ocupação / duração, meses de pico
+    mais citados e nº de snapshots por mês.
+    """
+    df = consultar(cidade, inicio, fim, fonte)
+    if df.empty:
+        return []
+    df["mes"] = df["ts"].dt.strftime("%Y-%m")
+    saida = []
+    for mes, grupo in df.groupby("mes", sort=True):
+        picos = pd.Series([m for lista in grupo["sazonalidade"] for m in lista], dtype=object)
+        saida.append({
+            "mes": mes,
+            "snapshots": int(len(grupo)),
+            **{c: (round(float(grupo[c].mean()), 4) if grupo[c].notna().any() else None) for c in CAMPOS},
+            "sazonalidade": picos.value_counts().head(3).index.tolist(),
+        })
+    return saida
+
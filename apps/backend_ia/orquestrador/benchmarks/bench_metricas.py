@@ -0,0 +1,111 @@
+# apps/backend_ia/orquestrador/benchmarks/bench_metricas.py
+"""
+Benchmark do cálculo de métricas InsideAirbnb sobre um listings sintético.
+
+Compara o caminho antigo (pandas: read_csv inteiro + _normalize_price com três
+regex/replace + to_numeric/to_datetime separados) com o kernel atual do
+cache_colunar (leitor CSV do pyarrow em blocos + tipagem e agregação vetorizadas
+numa passada). Rodar de apps/backend_ia:
+
+    python -m orquestrador.benchmarks.bench_metricas --linhas 500000
+"""
+import argparse
+import gzip
+import random
+import tempfile
+import time
+from pathlib import Path
+
+import pandas as pd
+
+from ..agents.sources import agregados, cache_colunar
+
+TIPOS = ["Entire home/apt", "Private room", "Shared room", "Hotel room"]
+
+
+def gerar_csv(path: Path, linhas: int, seed: int = 42):
+    rnd = random.Random(seed)
+    abrir = gzip.open if path.name.endswith(".gz") else open
+    with abrir(path, "wt", encoding="utf-8", newline="") as f:
+        f.write("id,name,host_id,room_type,price,availability_365,minimum_nights,number_of_reviews,"
+                "last_review,latitude,longitude\n")
+        for i in range(linhas):
+            # formato BR, como o _normalize_price espera: "R$ 1.234,00"
+            valor = f"{rnd.randint(80, 3000):,}".replace(",", ".")
+            preco = f'"R$ {valor},00"' if rnd.random() > 0.05 else ""
+            review = f"2024-{rnd.randint(1, 12):02d}-{rnd.randint(1, 28):02d}" if rnd.random() > 0.2 else ""
+            f.write(f'{i},"Anúncio {i}, centro",{rnd.randint(1, 50000)},{rnd.choice(TIPOS)},{preco},'
+                    f"{rnd.randint(0, 365)},{rnd.randint(1, 30)},{rnd.randint(0, 400)},{review},"
+                    f"{-27.6 + rnd.random() / 10:.5f},{-48.5 + rnd.random() / 10:.5f}\n")
+
+
+# ---------------- caminho antigo (referência) ----------------
+
+def _normalize_price_pandas(series: pd.Series) -> pd.Series:
+    s = series.astype(str).str.replace(r"[^\d,\.]", "", regex=True)
+    s = s.str.replace(".", "", regex=False).str.replace(",", ".", regex=False)
+    return pd.to_numeric(s, errors="coerce")
+
+
+def metricas_pandas(path: Path):
+    df = pd.read_csv(path, low_memory=False)
+    prices = _normalize_price_pandas(df["price"])
+    avail = pd.to_numeric(df["availability_365"], errors="coerce").dropna()
+    mn = pd.to_numeric(df["minimum_nights"], errors="coerce").dropna()
+    dt = pd.to_datetime(df["last_review"], errors="coerce").dropna()
+    meses = dt.dt.month.value_counts().sort_values(ascending=False)
+    return {
+        "ticket_medio": round(float(prices.mean()), 2),
+        "ocupacao_media": round(float(1.0 - avail.mean() / 365.0), 4),
+        "sazonalidade": [agregados.MESES[m] for m in meses.index[:3]],
+        "tipos_imovel": df["room_type"].astype(str).value_counts().head(3).index.tolist(),
+        "duracao_media": round(float(mn.mean()), 2),
+    }
+
+
+# ---------------- kernel atual ----------------
+
+def metricas_kernel(path: Path):
+    fontes = cache_colunar._fontes(path)
+    schema = cache_colunar.pa.schema(
+        [(can, cache_colunar.TIPOS[can]) for can, col in fontes.items() if col])
+    agg = agregados.Agregador()
+    for lote in cache_colunar._blocos(path, fontes, schema):
+        agg.atualizar(lote)
+    return agregados.metricas(agg.para_dict())
+
+
+def _cronometrar(func, path: Path, repeticoes: int):
+    melhor, resultado = float("inf"), None
+    for _ in range(repeticoes):
+        t0 = time.perf_counter()
+        resultado = func(path)
+        melhor = min(melhor, time.perf_counter() - t0)
+    return melhor, resultado
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--linhas", type=int, default=500_000)
+    ap.add_argument("--repeticoes", type=int, default=3)
+    ap.add_argument("--gz", action="store_true", help="usa listings.csv.gz")
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / ("listings.csv.gz" if args.gz else "listings.csv")
+        t0 = time.perf_counter()
+        gerar_csv(path, args.linhas)
+        print(f"[BENCH] {args.linhas} linhas, {path.stat().st_size / 1e6:.1f} MB "
+              f"(gerado em {time.perf_counter() - t0:.1f}s)")
+
+        t_pd, m_pd = _cronometrar(metricas_pandas, path, args.repeticoes)
+        t_k, m_k = _cronometrar(metricas_kernel, path, args.repeticoes)
+        print(f"[BENCH] pandas (antigo): {t_pd * 1000:8.1f} ms  {args.linhas / t_pd:12,.0f} linhas/s")
+        print(f"[BENCH] kernel (atual):  {t_k * 1000:8.1f} ms  {args.linhas / t_k:12,.0f} linhas/s")
+        print(f"[BENCH] ganho: {t_pd / t_k:.1f}x")
+        if m_pd != m_k:
+            print(f"[BENCH] ATENÇÃO: resultados diferentes\n  pandas: {m_pd}\n  kernel: {m_k}")
+
+
+if __name__ == "__main__":
+    main()
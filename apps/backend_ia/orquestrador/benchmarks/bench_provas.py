@@ -0,0 +1,77 @@
+# apps/backend_ia/orquestrador/benchmarks/bench_provas.py
+"""
+Benchmark das provas PDF de emissão (utils/pdf.py), em provas por segundo.
+
+Mede a renderização com o modelo pré-montado contra a montagem do modelo a cada
+prova (o custo que o cache evita) e o lote completo gravado no blockstore IPFS local
+e em disco. Rodar de apps/backend_ia:
+
+    python -m orquestrador.benchmarks.bench_provas --provas 20000
+"""
+import argparse
+import random
+import tempfile
+import time
+from pathlib import Path
+
+from ..utils import ipfs, pdf
+
+
+def gerar_dados(n: int, seed: int = 42):
+    rnd = random.Random(seed)
+    return [{
+        "nftId": str(i + 1),
+        "nome": f"Proprietário {rnd.randint(1, 5000)}",
+        "descricao": "Hospedagem à beira-mar com piscina e vista deslumbrante. " * rnd.randint(1, 6),
+        "wallet": "0x" + rnd.randbytes(20).hex(),
+        "tokenURI": "ipfs://bafkrei" + rnd.randbytes(26).hex()[:52],
+        "txHash": "0x" + rnd.randbytes(32).hex(),
+    } for i in range(n)]
+
+
+def _sem_cache(lista):
+    return [b"".join(pdf._Modelo().partes(d)) for d in lista]
+
+
+def _com_cache(lista):
+    return [pdf.renderizar(d) for d in lista]
+
+
+def _cronometrar(func, lista, repeticoes: int):
+    melhor = float("inf")
+    for _ in range(repeticoes):
+        t0 = time.perf_counter()
+        func(lista)
+        melhor = min(melhor, time.perf_counter() - t0)
+    return melhor
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--provas", type=int, default=20_000)
+    ap.add_argument("--repeticoes", type=int, default=3)
+    args = ap.parse_args()
+
+    lista = gerar_dados(args.provas)
+    pdf.modelo()  # montagem única, fora da medição (como num processo já aquecido)
+    tam = sum(map(len, _com_cache(lista[:100]))) / min(100, len(lista))
+    print(f"[BENCH] {args.provas} provas, ~{tam / 1024:.1f} KB cada")
+
+    t_sem = _cronometrar(_sem_cache, lista, args.repeticoes)
+    t_com = _cronometrar(_com_cache, lista, args.repeticoes)
+    print(f"[BENCH] render, modelo por prova: {t_sem * 1000:8.1f} ms  {args.provas / t_sem:10,.0f} provas/s")
+    print(f"[BENCH] render, modelo em cache:  {t_com * 1000:8.1f} ms  {args.provas / t_com:10,.0f} provas/s")
+    print(f"[BENCH] ganho do cache: {t_sem / t_com:.1f}x")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        ipfs.DIR = Path(tmp) / "ipfs"
+        pdf.PROVAS_DIR = Path(tmp) / "provas"
+        for destino in ("ipfs", "disco"):
+            t0 = time.perf_counter()
+            pdf.gerar_pdfs_prova(lista, destino=destino)
+            t = time.perf_counter() - t0
+            print(f"[BENCH] lote -> {destino:5s}:          {t * 1000:8.1f} ms  {args.provas / t:10,.0f} provas/s")
+
+
+if __name__ == "__main__":
+    main()
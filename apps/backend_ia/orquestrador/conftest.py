@@ -0,0 +1,32 @@
+# apps/backend_ia/orquestrador/conftest.py
+import os, sys, pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from orquestrador.services import agenda, idempotencia, jobs
+from orquestrador.utils import ipfs
+
+
+@pytest.fixture(autouse=True)
+def _dados_isolados(tmp_path, monkeypatch):
+    """Stores persistentes de cada teste em tmp_path (nada de DATA_DIR real nem estado entre testes)."""
+    monkeypatch.setattr(idempotencia, "ARQUIVO", tmp_path / "idempotencia.sqlite3")
+    monkeypatch.setattr(agenda, "ARQUIVO", tmp_path / "agenda.json")
+    monkeypatch.setattr(jobs, "ARQUIVO", tmp_path / "jobs.sqlite3")
+    monkeypatch.setattr(ipfs, "DIR", tmp_path / "ipfs")
+
+
+def _payload_nft(dia: int = 1):
+    return {
+        "nomeProprietario": "Carlos NFT",
+        "documento": "123456789",
+        "wallet": "0xabc123",
+        "idPropriedade": "prop123",
+        "nomeNFT": "Casa dos Sonhos - Outubro 2025",
+        "descricao": "Hospedagem à beira-mar.",
+        "dataInicio": f"2025-10-{dia:02d}",
+        "dataFim": f"2025-10-{dia + 1:02d}",
+        "valorDiaria": "1.5",
+        "moeda": "ETH",
+        "regras": "Check-in após 14h.",
+        "politicaCancelamento": "flexivel",
+    }
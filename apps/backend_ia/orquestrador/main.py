@@ -1,14 +1,40 @@
 # main.py
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from orquestrador.routes import router as api_router
 from orquestrador.routers import mkt_bridge
 from orquestrador.routers import imagem_bridge  
+from orquestrador.services import agenda, execucao, jobs, prefetch
+from orquestrador.utils import chain, http, ipfs
+import os
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # aquece cidades/fontes configuradas fora do caminho das requisições
+    intervalo = float(os.getenv("EIAH_PREFETCH_SEC", "21600"))
+    if intervalo > 0:
+        prefetch.iniciar(intervalo)
+    # workers da fila de jobs (emissões assíncronas); 0 desliga neste processo
+    jobs.iniciar(int(os.getenv("EIAH_JOBS_WORKERS", "2")))
+    # pinagem em lote dos blocos IPFS locais (só com EIAH_IPFS_API)
+    ipfs.iniciar(float(os.getenv("EIAH_IPFS_PIN_SEC", "5")))
+    # agenda dos imóveis carregada na subida, não na primeira emissão
+    agenda.get_store()
+    yield
+    await jobs.parar()
+    ipfs.parar()
+    chain.encerrar()
+    prefetch.parar()
+    # libera os pools de threads/processos dos agentes e as conexões HTTP
+    execucao.encerrar()
+    http.encerrar()
 
 app = FastAPI(
     title="EIAH Orquestrador de Agentes NFTDiárias",
     description="API para orquestrar agentes IA como contrato, tutor, imagem, mkt, nft",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
 )
 
 app.add_middleware(
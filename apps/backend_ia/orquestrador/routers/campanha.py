@@ -1,8 +1,10 @@
 # apps/backend_ia/orquestrador/routers/campanha.py
-from fastapi import APIRouter, HTTPException
-from typing import Literal, List, Dict, Any
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+from typing import Literal, List, Dict, Any, Optional
 from pathlib import Path
-import json
+import base64
+
+from orquestrador.services.campanha_store import get_store
 
 Status = Literal["Planejado", "Em produção", "Aprovado", "Publicado"]
 
@@ -12,35 +14,87 @@ BASE_DIR = Path.cwd()                   # diretório onde você roda o uvicorn
 DATA_DIR = BASE_DIR / "data"
 FILE = DATA_DIR / "campanha.json"
 
-def _ensure_store():
-    DATA_DIR.mkdir(parents=True, exist_ok=True)
-    if not FILE.exists():
-        FILE.write_text("[]", encoding="utf-8")
+# chave do /stats -> valor de Status
+STATS_CHAVES = {
+    "planejado": "Planejado",
+    "emProducao": "Em produção",
+    "aprovado": "Aprovado",
+    "publicado": "Publicado",
+}
+
+_stats_cache: Dict[str, Any] = {"ultimo": (None, None)}  # (arquivo, versão) -> stats
+
+def _store():
+    # índice em memória + log append-only (ver services/campanha_store.py)
+    return get_store(FILE)
+
+def _etag(versao: str) -> str:
+    return f'W/"{versao}"'
+
+def _nao_modificado(request: Request, etag: str) -> bool:
+    inm = request.headers.get("if-none-match")
+    return bool(inm) and (inm.strip() == "*" or etag in [t.strip() for t in inm.split(",")])
 
-def _read_all() -> List[Dict[str, Any]]:
-    _ensure_store()
-    raw = FILE.read_text(encoding="utf-8") or "[]"
-    return json.loads(raw)
+def _cursor_codificar(pos: int) -> str:
+    return base64.urlsafe_b64encode(f"p:{pos}".encode()).decode().rstrip("=")
 
-def _write_all(items: List[Dict[str, Any]]):
-    _ensure_store()
-    FILE.write_text(json.dumps(items, ensure_ascii=False, indent=2), encoding="utf-8")
+def _cursor_decodificar(cursor: str) -> int:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        prefixo, pos = raw.split(":", 1)
+        if prefixo != "p":
+            raise ValueError
+        return int(pos)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Cursor inválido")
 
 @router.get("", response_model=List[Dict[str, Any]])
-def listagem():
-    """Retorna a lista completa no formato esperado pelo frontend (mantém 'Responsável' com acento)."""
-    return _read_all()
+def listagem(
+    request: Request,
+    response: Response,
+    status: Optional[Status] = Query(None, alias="Status", description="Filtra por Status"),
+    responsavel: Optional[str] = Query(None, alias="Responsável", description="Filtra por Responsável"),
+    limit: Optional[int] = Query(None, ge=1, le=500, description="Tamanho da página (sem limit = tudo)"),
+    cursor: Optional[str] = Query(None, description="Valor de X-Next-Cursor da página anterior"),
+):
+    """
+    Retorna a lista no formato esperado pelo frontend (mantém 'Responsável' com acento).
+    Sem parâmetros devolve tudo, como antes. Paginação: X-Next-Cursor / Link rel="next";
+    X-Total-Count traz o total filtrado. Suporta ETag / If-None-Match (304).
+    """
+    store = _store()
+    etag = _etag(store.versao())
+    if _nao_modificado(request, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+
+    apos = _cursor_decodificar(cursor) if cursor else None
+    itens, proximo, total = store.pagina({"Status": status, "Responsável": responsavel}, apos, limit)
+
+    response.headers["ETag"] = etag
+    response.headers["X-Total-Count"] = str(total)
+    if proximo is not None:
+        prox = _cursor_codificar(proximo)
+        response.headers["X-Next-Cursor"] = prox
+        url = request.url.include_query_params(cursor=prox)
+        response.headers["Link"] = f'<{url}>; rel="next"'
+    return itens
 
 @router.get("/stats")
-def stats():
-    items = _read_all()
-    return {
-        "total": len(items),
-        "planejado": sum(1 for i in items if i.get("Status") == "Planejado"),
-        "emProducao": sum(1 for i in items if i.get("Status") == "Em produção"),
-        "aprovado": sum(1 for i in items if i.get("Status") == "Aprovado"),
-        "publicado": sum(1 for i in items if i.get("Status") == "Publicado"),
-    }
+def stats(request: Request, response: Response):
+    store = _store()
+    versao = store.versao()
+    etag = _etag(versao)
+    if _nao_modificado(request, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+
+    # contagens vêm dos índices do store; o dict só é remontado quando a versão muda
+    chave = (str(FILE), versao)
+    ultima, resultado = _stats_cache["ultimo"]
+    if ultima != chave:
+        resultado = {"total": store.total(), **{k: store.contagem(v) for k, v in STATS_CHAVES.items()}}
+        _stats_cache["ultimo"] = (chave, resultado)
+    response.headers["ETag"] = etag
+    return resultado
 
 @router.put("/{id}")
 def update_status(id: str, body: Dict[str, Any]):
@@ -49,14 +103,10 @@ def update_status(id: str, body: Dict[str, Any]):
     Body: { "Status": "Planejado|Em produção|Aprovado|Publicado" }
     """
     status = body.get("Status")
-    if status not in ("Planejado", "Em produção", "Aprovado", "Publicado"):
+    if status not in STATS_CHAVES.values():
         raise HTTPException(status_code=422, detail="Status inválido")
 
-    items = _read_all()
-    for it in items:
-        if str(it.get("id")) == str(id):
-            it["Status"] = status
-            _write_all(items)
-            return {"success": True}
+    if _store().atualizar_status(id, status):
+        return {"success": True}
 
     raise HTTPException(status_code=404, detail="Item não encontrado")
@@ -0,0 +1,84 @@
+# apps/backend_ia/orquestrador/routers/jobs.py
+from fastapi import APIRouter, Body, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
+from typing import Any, Dict, Literal, Optional
+
+from orquestrador.services import jobs
+
+Status = Literal["pendente", "executando", "concluido", "erro", "cancelado"]
+
+router = APIRouter(prefix="/api/jobs", tags=["jobs"])
+
+
+def links(id: str) -> Dict[str, str]:
+    base = f"/api/jobs/{id}"
+    return {"status": base, "resultado": f"{base}/resultado", "eventos": f"{base}/eventos",
+            "cancelar": f"{base}/cancelar"}
+
+
+def _job(id: str) -> Dict[str, Any]:
+    job = jobs.obter(id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job '{id}' não encontrado")
+    return job
+
+
+@router.post("", status_code=202)
+def enviar(
+    tipo: str = Body(..., description="emitir_nft | nft_lote"),
+    entrada: Any = Body(...),
+    prioridade: int = Body(0),
+):
+    """Enfileira um job e devolve o id imediatamente."""
+    try:
+        job = jobs.enviar(tipo, entrada, prioridade)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"sucesso": True, "job": job["id"], "status": job["status"], "links": links(job["id"])}
+
+
+@router.get("")
+def listar(
+    status: Optional[Status] = Query(None),
+    limite: int = Query(50, ge=1, le=500),
+):
+    return {"sucesso": True, "jobs": jobs.listar(status, limite)}
+
+
+@router.get("/{id}")
+def status(id: str):
+    """Status e progresso por etapa (sem a entrada e o resultado)."""
+    job = _job(id)
+    return {k: v for k, v in job.items() if k not in ("entrada", "resultado", "dono", "lease_ate")}
+
+
+@router.get("/{id}/resultado")
+def resultado(id: str, response: Response):
+    """202 enquanto o job não termina; depois o resultado (ou o erro)."""
+    job = _job(id)
+    if job["status"] not in jobs.TERMINAIS:
+        response.status_code = 202
+        return {"sucesso": False, "status": job["status"], "links": links(id)}
+    return {"sucesso": job["status"] == "concluido", "status": job["status"],
+            "resultado": job["resultado"], "erro": job["erro"]}
+
+
+@router.post("/{id}/cancelar")
+def cancelar(id: str):
+    status = jobs.cancelar(id)
+    if status is None:
+        raise HTTPException(status_code=404, detail=f"Job '{id}' não encontrado")
+    if status in ("concluido", "erro"):
+        raise HTTPException(status_code=409, detail=f"Job já finalizado ({status})")
+    if status == "executando":
+        # upload e mint rodam em threads que não são interrompidas: cancelar aqui não impediria o mint
+        raise HTTPException(status_code=409, detail="Job em execução não pode ser cancelado; aguarde o resultado")
+    return {"sucesso": True, "status": status}
+
+
+@router.get("/{id}/eventos")
+def eventos(id: str):
+    """Progresso via Server-Sent Events (um evento por mudança, até o job terminar)."""
+    _job(id)
+    return StreamingResponse(jobs.eventos(id), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
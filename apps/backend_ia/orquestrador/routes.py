@@ -1,22 +1,26 @@
 # apps/backend_ia/orquestrador/routes.py
-from fastapi import Request, APIRouter, HTTPException, Query, Body
-from typing import Any, Dict
+from fastapi import Request, Response, APIRouter, HTTPException, Query, Body, Header
+from typing import Any, Dict, Optional
+from datetime import date, datetime
 
-# importa o subrouter da campanha (/api/campanha)
+# importa os subrouters da campanha (/api/campanha) e dos jobs (/api/jobs)
 from orquestrador.routers import campanha
+from orquestrador.routers import jobs as jobs_router
 
-# Agentes (imports relativos, mais robustos)
-from .agents.contrato import executar as contrato
-from .agents.mkt import executar as mkt
-from .agents.imagem import executar as imagem
-from .agents.tutor import executar as tutor
-from .agents.nft import executar as nft
-from .agents.consultor_mercado import executar as consultor_mercado  # novo
+# Agentes: registro declarativo com import sob demanda (ver agents/registro.py)
+from .agents import registro
+from .services import agenda, emissao, idempotencia, jobs
+from .schemas.nft_schema import NFTRequest
 
 router = APIRouter()
 
+# calculados uma vez (o registro não muda em runtime)
+AGENTES_STR = registro.aceitam("str")
+AGENTES_SO_JSON = [n for n in registro.aceitam("json") if n not in AGENTES_STR]
+
 # 🔗 Anexa o router de Campanha (endpoints: /api/campanha, /api/campanha/stats, PUT /api/campanha/{id})
 router.include_router(campanha.router)
+router.include_router(jobs_router.router)
 
 # === GET: agentes que aceitam string ==========================
 @router.get("/executar/{agente}", tags=["Agentes"])
@@ -24,25 +28,18 @@ def executar_agente_get(
     agente: str,
     entrada: str = Query(..., description="Entrada de texto enviada ao agente"),
 ):
-    # mkt agora aceita string também (via shim no mkt.py)
-    agentes_str = {
-        "contrato": contrato,
-        "imagem": imagem,
-        "tutor": tutor,
-        "mkt": mkt,
-        # ⚠️ não incluímos 'nft' aqui: ele exige JSON válido do NFTRequest
-    }
-    funcao_agente = agentes_str.get(agente)
-    if not funcao_agente:
+    # ⚠️ 'nft' não aceita string: ele exige JSON válido do NFTRequest
+    spec = registro.obter(agente)
+    if not spec or "str" not in spec.entradas:
         # Mantém rota/endpoint, mas evita quebrar passando string pra quem precisa JSON
         raise HTTPException(
             status_code=404,
-            detail=f"Agente '{agente}' não disponível via GET. Use POST para: ['nft','consultor_mercado']."
+            detail=f"Agente '{agente}' não disponível via GET. Use POST para: {AGENTES_SO_JSON}."
         )
 
     try:
         print(f"[ROUTER][GET] Executando agente '{agente}' com entrada: '{entrada}'")
-        resultado = funcao_agente(entrada)
+        resultado = registro.carregar(agente)(entrada)
         return {"sucesso": True, "resultado": resultado}
     except Exception as e:
         print(f"[ERRO][GET] Falha agente '{agente}': {e}")
@@ -51,21 +48,16 @@ def executar_agente_get(
 # === POST: agentes que aceitam JSON ===========================
 @router.post("/executar/{agente}", tags=["Agentes"])
 async def executar_agente_post(agente: str, payload: Dict[str, Any] = Body(...)):
-    agentes_json = {
-        "nft": nft,
-        "consultor_mercado": consultor_mercado,
-        "mkt": mkt,  # mkt também aceita JSON estruturado
-    }
-    funcao_agente = agentes_json.get(agente)
-    if not funcao_agente:
+    spec = registro.obter(agente)
+    if not spec or "json" not in spec.entradas:
         raise HTTPException(
             status_code=404,
-            detail=f"Agente '{agente}' não disponível via POST. Use GET para: ['contrato','imagem','tutor','mkt']."
+            detail=f"Agente '{agente}' não disponível via POST. Use GET para: {AGENTES_STR}."
         )
 
     try:
         print(f"[ROUTER][POST] Executando agente '{agente}' com payload:", payload)
-        resultado = funcao_agente(payload)
+        resultado = await registro.executar(agente, payload)
         return {"sucesso": True, "resultado": resultado}
     except Exception as e:
         print(f"[ERRO][POST] Falha agente '{agente}': {e}")
@@ -82,56 +74,192 @@ def registrar_progresso(data: dict = Body(...)):
 
 # === Orquestração completa (consultor -> nft -> imagem) =======
 @router.post("/api/orquestrador/emitir-nft", tags=["Orquestrador"])
-async def emitir_nft_orquestrado(request: Request):
+async def emitir_nft_orquestrado(
+    request: Request,
+    response: Response,
+    assincrono: bool = Query(False, description="Enfileira como job e devolve o id na hora (ver /api/jobs)"),
+    idempotency_key: Optional[str] = Header(None, description="Repetições devolvem a mesma emissão (ou o mesmo job)"),
+):
     dados = await request.json()
     print("[ORQ] Dados recebidos:", dados)
+    if idempotency_key:
+        # o agente nft também deduplica pelo conteúdo; a chave cobre a resposta inteira
+        dados["nft"] = {**(dados.get("nft") or {}), "idempotencyKey": idempotency_key}
+    assincrono = assincrono or bool(dados.get("assincrono"))
+
+    async def _executar():
+        if assincrono:
+            # INSERT na fila fora do event loop (thread do store de jobs)
+            return await jobs.get_store().fora_do_loop(jobs.enviar, "emitir_nft", dados)
+        # etapas e precificação em services/emissao.py (compartilhado com os jobs)
+        return await emissao.emitir(dados)
+
     try:
-        # 1) consultor de mercado (opcional no payload)
-        consult_in = dados.get("consultor") or {"cidades": ["Florianopolis"], "regioes": ["Brasil"], "moeda": "BRL"}
-        resultado_consultor = consultor_mercado(consult_in)
-
-        # 2) sugestoes opcionais -> nft
-        preco_sugerido = dados.get("precoSugerido")
-        politica_cancelamento = dados.get("politicaCancelamento") or "moderada"
-
-        payload_nft = {**(dados.get("nft") or {})}
-        if preco_sugerido is not None:
-            payload_nft["precoSugerido"] = preco_sugerido
-        if politica_cancelamento:
-            payload_nft["politicaCancelamento"] = politica_cancelamento
-
-        resultado_nft = nft(payload_nft)
-
-        # 3) imagem (thumb/banner)
-        resultado_img = imagem(dados.get("descricao") or "imagem do NFT de diárias")
-
-        return {
-            "sucesso": True,
-            "consultor": resultado_consultor,
-            "nft": resultado_nft,
-            "imagem": resultado_img
-        }
+        reutilizado = False
+        if idempotency_key:
+            # duplicata em andamento espera no máximo o tempo da etapa mais longa
+            resposta, reutilizado = await idempotencia.executar_uma_vez_async(
+                "emitir-nft:job" if assincrono else "emitir-nft", idempotency_key, _executar,
+                idempotencia.chave_conteudo(dados), sucesso=lambda r: assincrono or r.get("sucesso"),
+                espera_max=max(emissao.TIMEOUTS_ORQUESTRACAO.values()))
+        else:
+            resposta = await _executar()
+        if assincrono:
+            response.status_code = 202
+            return {"sucesso": True, "job": resposta["id"], "status": resposta["status"],
+                    "links": jobs_router.links(resposta["id"]), "idempotente": reutilizado}
+        return {**resposta, "idempotente": reutilizado}
+    except (idempotencia.ConflitoIdempotencia, idempotencia.EmAndamento) as e:
+        raise HTTPException(status_code=409, detail=str(e))
     except Exception as e:
         print("[ERRO] Falha na orquestração:", e)
-        raise HTTPException(status_code=500, detail=f"Erro na orquestração: {str(e)}")
+        detalhe = str(e) if isinstance(e, emissao.ErroOrquestracao) else f"Erro na orquestração: {str(e)}"
+        raise HTTPException(status_code=500, detail=detalhe)
 
 # === Rotas diretas mantidas ===================================
 @router.post("/api/nft", tags=["NFT"])
-async def executar_agente_nft(data: dict = Body(...)):
+async def executar_agente_nft(
+    response: Response,
+    data: NFTRequest = Body(...),
+    idempotency_key: Optional[str] = Header(None, description="Repetições devolvem o NFT já emitido"),
+):
+    # corpo já validado aqui (422 com o campo inválido); o agente recebe o modelo e não revalida
+    if idempotency_key:
+        data = data.model_copy(update={"idempotencyKey": idempotency_key})
     try:
-        resultado = nft(data)
-        return {"sucesso": True, "resultado": resultado}
+        resultado = await registro.executar("nft", data)
     except Exception as e:
         print("[ERRO] Execução do agente NFT-D falhou:", e)
         raise HTTPException(status_code=500, detail=str(e))
+    if resultado.get("conflito") or resultado.get("emAndamento"):
+        raise HTTPException(status_code=409, detail=resultado["erro"])
+    if resultado.get("indisponivel"):  # período já emitido para o imóvel
+        raise HTTPException(status_code=409, detail={"erro": resultado["erro"], "conflitos": resultado["conflitos"]})
+    if resultado.get("pendente"):  # mint enviado sem recibo: pode minerar depois, não reenviar
+        response.status_code = 202
+        return {"sucesso": False, "pendente": True, "resultado": resultado}
+    return {"sucesso": True, "resultado": resultado}
+
+@router.get("/api/nft/disponibilidade/{idPropriedade}", tags=["NFT"])
+def disponibilidade_nft(
+    idPropriedade: str,
+    de: date = Query(..., description="Início do intervalo consultado (inclusivo)"),
+    ate: date = Query(..., description="Fim do intervalo consultado (exclusivo, dia do check-out)"),
+    noites: int = Query(1, ge=1, le=366, description="Janelas livres com ao menos N noites"),
+):
+    """Períodos já emitidos do imóvel em [de, ate) e as janelas livres para novas diárias."""
+    if ate <= de:
+        raise HTTPException(status_code=400, detail="'ate' deve ser posterior a 'de'")
+    store = agenda.get_store()
+    reservas = store.conflitos(idPropriedade, de, ate)
+    return {
+        "idPropriedade": idPropriedade,
+        "de": de.isoformat(),
+        "ate": ate.isoformat(),
+        "livre": not reservas,
+        "reservas": reservas,
+        "janelas": store.janelas(idPropriedade, de, ate, noites),
+    }
+
+@router.post("/api/nft/lote", tags=["NFT"])
+async def executar_agente_nft_lote(
+    response: Response,
+    data: Any = Body(..., description='{"itens": [NFTRequest, ...], "tudoOuNada": false}'),
+    assincrono: bool = Query(False, description="Enfileira como job e devolve o id na hora (ver /api/jobs)"),
+):
+    """Emissão em lote: valida tudo antes, um upload IPFS, mints agrupados e status por item."""
+    if assincrono:
+        job = jobs.enviar("nft_lote", data)
+        response.status_code = 202
+        return {"sucesso": True, "job": job["id"], "status": job["status"], "links": jobs_router.links(job["id"])}
+    try:
+        resultado = await registro.executar("nft_lote", data)
+    except Exception as e:
+        print("[ERRO] Execução do lote NFT-D falhou:", e)
+        raise HTTPException(status_code=500, detail=str(e))
+    if "erro" in resultado:  # lote malformado (sem itens, acima do limite)
+        raise HTTPException(status_code=400, detail=resultado["erro"])
+    return resultado
 
 @router.post("/api/consultor-mercado", tags=["Consultor"])
 async def executar_consultor_mercado(data: dict = Body(...)):
     try:
-        resultado = consultor_mercado(data)
+        resultado = await registro.executar("consultor_mercado", data)
         return {"sucesso": True, "resultado": resultado}
     except Exception as e:
         print("[ERRO] Execução do consultor_mercado falhou:", e)
         raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/api/precificacao/sugestao", tags=["Precificação"])
+def sugestao_preco(
+    cidade: str = Query(..., description="Cidade do catálogo"),
+    tipoImovel: Optional[str] = Query(None, description="room_type do InsideAirbnb (ex.: Entire home/apt)"),
+    dataInicio: Optional[date] = Query(None),
+    dataFim: Optional[date] = Query(None),
+    percentil: float = Query(0.5, ge=0.0, le=1.0, description="Quantil da distribuição de preços"),
+):
+    """Diária sugerida (quantil por cidade/tipo × fator sazonal da estadia)."""
+    from .agents.sources import precificacao
+    try:
+        return {"sucesso": True, "resultado": precificacao.sugerir(cidade, tipoImovel, dataInicio, dataFim, percentil)}
+    except LookupError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        print("[ERRO] Precificação falhou:", e)
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/api/consultor-mercado/catalogo", tags=["Consultor"])
+def catalogo_consultor_mercado(
+    verificar: bool = Query(False, description="Re-hash do cache local (bruto e Arrow) contra o manifesto"),
+):
+    """Datasets por cidade (catalogo_cidades.json) e, opcionalmente, a integridade do cache."""
+    from .agents.sources import cache_colunar, catalogo
+    cidades = []
+    for nome in catalogo.cidades():
+        ds = catalogo.resolver(nome)
+        item = ds.para_dict()
+        if verificar and ds.url:
+            try:
+                item["cache"] = cache_colunar.verificar(ds.url)
+            except Exception as e:
+                item["cache"] = {"erro": str(e)}
+        cidades.append(item)
+    return {"sucesso": True, "resultado": {"arquivo": str(catalogo.ARQUIVO), "cidades": cidades}}
+
+@router.get("/api/consultor-mercado/comparaveis", tags=["Consultor"])
+def comparaveis_consultor_mercado(
+    cidade: str = Query(..., description="Cidade do catálogo"),
+    lat: float = Query(..., ge=-90, le=90),
+    lon: float = Query(..., ge=-180, le=180),
+    raioKm: Optional[float] = Query(None, gt=0, le=50, description="Sem raio: k mais próximos"),
+    k: int = Query(20, ge=1, le=500),
+    tipoImovel: Optional[str] = Query(None, description="room_type do InsideAirbnb"),
+):
+    """Anúncios comparáveis próximos ao imóvel (índice espacial por cidade)."""
+    from .agents.sources import indice_espacial
+    try:
+        return {"sucesso": True, "resultado": indice_espacial.comparaveis(cidade, lat, lon, raioKm, k, tipoImovel)}
+    except LookupError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        print("[ERRO] Busca de comparáveis falhou:", e)
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/api/consultor-mercado/historico", tags=["Consultor"])
+def historico_consultor_mercado(
+    cidade: str = Query(..., description="Cidade (como em get_city_metrics)"),
+    inicio: Optional[datetime] = Query(None, description="ISO 8601, inclusivo"),
+    fim: Optional[datetime] = Query(None, description="ISO 8601, exclusivo"),
+    fonte: Optional[str] = Query(None, description="inside_airbnb | consultor_mercado"),
+):
+    """Tendência mensal (ticket, ocupação, sazonalidade) a partir da série histórica de snapshots."""
+    # import tardio: pyarrow/pandas só quando o histórico é pedido
+    from .agents.sources import serie_historica
+    try:
+        pontos = serie_historica.tendencia(cidade, inicio, fim, fonte)
+    except Exception as e:
+        print("[ERRO] Consulta à série histórica falhou:", e)
+        raise HTTPException(status_code=500, detail=str(e))
+    return {"sucesso": True, "resultado": {"cidade": cidade, "tendencia": pontos}}
     
 
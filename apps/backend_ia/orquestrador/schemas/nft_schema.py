@@ -1,5 +1,7 @@
-from pydantic import BaseModel, Field
-from typing import Optional
+from pydantic import BaseModel, Field, TypeAdapter, ValidationError, ValidationInfo, field_validator
+from typing import Any, Dict, List, Optional, Tuple
+from datetime import date
+from decimal import Decimal
 
 class NFTRequest(BaseModel):
     nomeProprietario: str = Field(..., example="Carlos NFT")
@@ -8,10 +10,40 @@ class NFTRequest(BaseModel):
     idPropriedade: str = Field(..., example="prop123")
     nomeNFT: str = Field(..., example="Casa dos Sonhos - Outubro 2025")
     descricao: str = Field(..., example="Hospedagem à beira-mar com piscina e vista deslumbrante.")
-    dataInicio: str = Field(..., example="2025-10-01")
-    dataFim: str = Field(..., example="2025-10-10")
-    valorDiaria: str = Field(..., example="1.5")
+    dataInicio: date = Field(..., example="2025-10-01")
+    dataFim: date = Field(..., example="2025-10-10")
+    valorDiaria: Decimal = Field(..., gt=0, example="1.5")
     moeda: str = Field(..., example="ETH")
     regras: str = Field(..., example="Check-in após 14h. Proibido fumar.")
     politicaCancelamento: str = Field(..., example="flexivel")
     imagemUrl: Optional[str] = Field(default="", example="https://ipfs.io/ipfs/Qm.../imagem.png")
+    # header Idempotency-Key repassado pelas rotas; fora do model_dump (não entra no hash do conteúdo)
+    idempotencyKey: Optional[str] = Field(default=None, exclude=True)
+
+    @field_validator("dataFim")
+    @classmethod
+    def _periodo(cls, fim: date, info: ValidationInfo) -> date:
+        inicio = info.data.get("dataInicio")
+        if inicio is not None and fim <= inicio:
+            raise ValueError("dataFim deve ser posterior a dataInicio")
+        return fim
+
+
+# Lote inteiro validado numa chamada (núcleo do pydantic-core), sem o custo por item de NFTRequest(**item)
+LISTA_NFT = TypeAdapter(List[NFTRequest])
+
+
+def validar_lote(itens: List[Any]) -> Tuple[Dict[int, NFTRequest], Dict[int, List[Dict[str, Any]]]]:
+    """
+    Valida a lista de uma vez. Devolve (válidos por índice, erros por índice).
+    Só quando há item inválido os demais passam de novo pelo adapter (sem os inválidos).
+    """
+    try:
+        return dict(enumerate(LISTA_NFT.validate_python(itens))), {}
+    except ValidationError as e:
+        erros: Dict[int, List[Dict[str, Any]]] = {}
+        for err in e.errors():
+            erros.setdefault(err["loc"][0], []).append(
+                {"campo": ".".join(str(p) for p in err["loc"][1:]), "erro": err["msg"]})
+    restantes = [i for i in range(len(itens)) if i not in erros]
+    return dict(zip(restantes, LISTA_NFT.validate_python([itens[i] for i in restantes]))), erros
@@ -0,0 +1,269 @@
+# apps/backend_ia/orquestrador/services/agenda.py
+"""
+Agenda de diárias por imóvel (evita NFT de reserva em período já emitido).
+
+Cada imóvel (idPropriedade) tem seus períodos [inicio, fim) em arrays ordenados
+(inícios, fins e ref da emissão) – como os períodos de um imóvel não se sobrepõem,
+os fins também ficam ordenados e conflito / janelas livres saem por bisect em
+O(log n) (+ k períodos devolvidos). O check-out de um período pode ser o check-in
+do próximo, a mesma regra do isAvailable do contrato NFTDiarias.
+
+Persistência no mesmo formato do campanha_store: snapshot `agenda.json`
+({imovel: [[inicio, fim, ref], ...]} com datas em ordinal, já ordenado – a carga é
+um json.loads e listas prontas, sem reordenar) + log append-only `agenda.log.jsonl`
+(uma linha por reserva/liberação, append + fsync sob flock). Outros processos são
+detectados pelo tamanho do log / assinatura do snapshot e só o que mudou é aplicado.
+"""
+import json
+import os
+import threading
+from bisect import bisect_left, bisect_right
+from datetime import date
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+from ..utils.arquivos import escrever_atomico
+from ..utils.paths import DATA_DIR
+
+try:
+    import fcntl  # trava entre processos (indisponível no Windows)
+except ImportError:  # pragma: no cover
+    fcntl = None
+
+ARQUIVO = Path(os.getenv("EIAH_AGENDA_ARQUIVO", DATA_DIR / "agenda.json"))
+COMPACTAR_APOS = 5000  # linhas no log antes de reescrever o snapshot
+
+
+class PeriodoIndisponivel(Exception):
+    """Período já reservado (total ou parcialmente) por outra emissão do imóvel."""
+
+    def __init__(self, imovel: str, conflitos: List[Dict[str, Any]]):
+        super().__init__(f"Imóvel {imovel} já reservado em: "
+                         + ", ".join(f"{c['inicio']} a {c['fim']}" for c in conflitos))
+        self.conflitos = conflitos
+
+
+class _Periodos:
+    """Períodos de um imóvel, ordenados e sem sobreposição."""
+    __slots__ = ("inicios", "fins", "refs")
+
+    def __init__(self, inicios=None, fins=None, refs=None):
+        self.inicios: List[int] = inicios or []
+        self.fins: List[int] = fins or []
+        self.refs: List[str] = refs or []
+
+    def conflitos(self, ini: int, fim: int) -> range:
+        """Índices dos períodos que cruzam [ini, fim) – sempre uma faixa contígua."""
+        i = bisect_right(self.fins, ini)     # primeiro período que termina depois de ini
+        j = bisect_left(self.inicios, fim)   # primeiro período que começa em fim ou depois
+        return range(i, max(i, j))
+
+    def inserir(self, ini: int, fim: int, ref: str):
+        i = bisect_left(self.inicios, ini)
+        self.inicios.insert(i, ini)
+        self.fins.insert(i, fim)
+        self.refs.insert(i, ref)
+
+    def remover(self, ini: int, ref: str) -> bool:
+        i = bisect_left(self.inicios, ini)
+        if i < len(self.inicios) and self.inicios[i] == ini and self.refs[i] == ref:
+            del self.inicios[i], self.fins[i], self.refs[i]
+            return True
+        return False
+
+    def janelas(self, de: int, ate: int, noites: int) -> List[Tuple[int, int]]:
+        livres, cursor = [], de
+        for k in self.conflitos(de, ate):
+            if self.inicios[k] - cursor >= noites:
+                livres.append((cursor, self.inicios[k]))
+            cursor = max(cursor, self.fins[k])
+        if ate - cursor >= noites:
+            livres.append((cursor, ate))
+        return livres
+
+
+def _ord(d: Any) -> int:
+    return (d if isinstance(d, date) else date.fromisoformat(str(d)[:10])).toordinal()
+
+
+def _iso(n: int) -> str:
+    return date.fromordinal(n).isoformat()
+
+
+class AgendaStore:
+    def __init__(self, arquivo: Path):
+        self._lock = threading.RLock()
+        self.arquivo = Path(arquivo)
+        self.log = self.arquivo.with_name(self.arquivo.stem + ".log.jsonl")
+        self._imoveis: Dict[str, _Periodos] = {}
+        self._offset = 0
+        self._linhas_log = 0
+        self._snapshot_sig = None
+        self._carregar()
+
+    # ---- persistência (snapshot + log, como o JsonLogStore das campanhas) ----
+    def _sig(self):
+        try:
+            st = self.arquivo.stat()
+            return (st.st_mtime_ns, st.st_size)
+        except FileNotFoundError:
+            return None
+
+    def _carregar(self):
+        self.arquivo.parent.mkdir(parents=True, exist_ok=True)
+        if not self.arquivo.exists():
+            escrever_atomico(self.arquivo, "{}")
+        snapshot = json.loads(self.arquivo.read_text(encoding="utf-8") or "{}")
+        self._imoveis = {}
+        for imovel, periodos in snapshot.items():
+            if periodos:
+                inicios, fins, refs = map(list, zip(*periodos))
+                self._imoveis[imovel] = _Periodos(inicios, fins, refs)
+        self._snapshot_sig = self._sig()
+        self._offset = self._linhas_log = 0
+        self._replay()
+
+    def _replay(self):
+        if not self.log.exists():
+            return
+        with open(self.log, "rb") as f:
+            f.seek(self._offset)
+            for linha in f:
+                if not linha.endswith(b"\n"):
+                    break  # escrita em andamento em outro processo
+                self._offset += len(linha)
+                self._linhas_log += 1
+                self._aplicar(json.loads(linha))
+
+    def _aplicar(self, ev: Dict[str, Any]):
+        periodos = self._imoveis.setdefault(ev["imovel"], _Periodos())
+        if ev["op"] == "+":
+            periodos.inserir(ev["ini"], ev["fim"], ev["ref"])
+        else:
+            periodos.remover(ev["ini"], ev["ref"])
+
+    def _sincronizar(self):
+        if self._sig() != self._snapshot_sig:
+            self._carregar()  # snapshot trocado (compactação de outro processo)
+            return
+        try:
+            tamanho = self.log.stat().st_size
+        except FileNotFoundError:
+            tamanho = 0
+        if tamanho < self._offset:
+            self._carregar()
+        elif tamanho > self._offset:
+            self._replay()
+
+    def _escrever(self, decidir):
+        """
+        Trava o log, sincroniza, chama `decidir()` (que devolve o evento a gravar ou None)
+        e grava o evento – verificação e escrita atômicas entre processos.
+        """
+        with self._lock, open(self.log, "ab") as f:
+            if fcntl:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                self._sincronizar()
+                ev = decidir()
+                if ev is None:
+                    return None
+                linha = (json.dumps(ev, ensure_ascii=False) + "\n").encode("utf-8")
+                f.write(linha)
+                f.flush()
+                os.fsync(f.fileno())
+                self._offset += len(linha)
+                self._linhas_log += 1
+                self._aplicar(ev)
+                if self._linhas_log >= COMPACTAR_APOS:
+                    self._compactar()
+                return ev
+            finally:
+                if fcntl:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _compactar(self):
+        """Reescreve o snapshot com o estado atual e zera o log (chamado com o log travado)."""
+        snapshot = {imovel: [list(p) for p in zip(per.inicios, per.fins, per.refs)]
+                    for imovel, per in self._imoveis.items() if per.inicios}
+        escrever_atomico(self.arquivo, json.dumps(snapshot, ensure_ascii=False, separators=(",", ":")))
+        os.truncate(self.log, 0)
+        self._snapshot_sig = self._sig()
+        self._offset = self._linhas_log = 0
+
+    # ---- API ----
+    def _periodos(self, imovel: str, indices) -> List[Dict[str, Any]]:
+        per = self._imoveis[imovel]
+        # a ref (chave de idempotência de outra emissão) não sai da agenda
+        return [{"inicio": _iso(per.inicios[k]), "fim": _iso(per.fins[k])} for k in indices]
+
+    def reservar(self, imovel: str, inicio: Any, fim: Any, ref: str) -> List[Dict[str, Any]]:
+        """
+        Reserva [inicio, fim) para `ref`. Devolve os períodos em conflito ([] = reservado).
+        O mesmo período já reservado para a mesma ref é aceito (repetição idempotente).
+        """
+        imovel, ini, fim_ = str(imovel), _ord(inicio), _ord(fim)
+        if fim_ <= ini:
+            raise ValueError("fim deve ser posterior a inicio")
+        conflitos: List[Dict[str, Any]] = []
+
+        def decidir():
+            per = self._imoveis.get(imovel)
+            faixa = per.conflitos(ini, fim_) if per else range(0)
+            if len(faixa) == 1 and (per.inicios[faixa[0]], per.fins[faixa[0]], per.refs[faixa[0]]) == (ini, fim_, ref):
+                return None  # já reservado por esta mesma emissão
+            if faixa:
+                conflitos.extend(self._periodos(imovel, faixa))
+                return None
+            return {"op": "+", "imovel": imovel, "ini": ini, "fim": fim_, "ref": ref}
+
+        self._escrever(decidir)
+        return conflitos
+
+    def liberar(self, imovel: str, inicio: Any, fim: Any, ref: str) -> bool:
+        imovel, ini, fim_ = str(imovel), _ord(inicio), _ord(fim)
+
+        def decidir():
+            per = self._imoveis.get(imovel)
+            i = bisect_left(per.inicios, ini) if per else 0
+            if not per or i == len(per.inicios) or (per.inicios[i], per.refs[i]) != (ini, ref):
+                return None  # não reservado (ou de outra emissão)
+            return {"op": "-", "imovel": imovel, "ini": ini, "fim": fim_, "ref": ref}
+
+        return self._escrever(decidir) is not None
+
+    def conflitos(self, imovel: str, inicio: Any, fim: Any) -> List[Dict[str, Any]]:
+        imovel, ini, fim_ = str(imovel), _ord(inicio), _ord(fim)
+        with self._lock:
+            self._sincronizar()
+            per = self._imoveis.get(imovel)
+            return self._periodos(imovel, per.conflitos(ini, fim_)) if per else []
+
+    def livre(self, imovel: str, inicio: Any, fim: Any) -> bool:
+        return not self.conflitos(imovel, inicio, fim)
+
+    def janelas(self, imovel: str, de: Any, ate: Any, noites: int = 1) -> List[Dict[str, Any]]:
+        """Períodos livres de ao menos `noites` dentro de [de, ate)."""
+        ini, fim = _ord(de), _ord(ate)
+        with self._lock:
+            self._sincronizar()
+            per = self._imoveis.get(str(imovel)) or _Periodos()
+            return [{"inicio": _iso(a), "fim": _iso(b), "noites": b - a} for a, b in per.janelas(ini, fim, max(1, noites))]
+
+    def total(self) -> Dict[str, int]:
+        with self._lock:
+            self._sincronizar()
+            return {"imoveis": sum(1 for p in self._imoveis.values() if p.inicios),
+                    "periodos": sum(len(p.inicios) for p in self._imoveis.values())}
+
+
+_stores: Dict[str, AgendaStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_store() -> AgendaStore:
+    chave = str(Path(ARQUIVO).resolve())
+    with _stores_lock:
+        if chave not in _stores:
+            _stores[chave] = AgendaStore(ARQUIVO)
+        return _stores[chave]
@@ -0,0 +1,294 @@
+# apps/backend_ia/orquestrador/services/campanha_store.py
+"""
+Armazenamento das campanhas (/api/campanha).
+
+Os itens ficam em memória com índice por id e índices secundários por Status e
+Responsável (contagens e filtros), atualizados a cada escrita; leituras não
+re-parseiam arquivo. A listagem é paginada pela posição do item no arquivo.
+Dois backends:
+
+  - "json" (padrão): snapshot `campanha.json` + log append-only `campanha.log.jsonl`.
+    Cada PUT vira uma linha no log (append + fsync); o snapshot é reescrito de forma
+    atômica (tmp + os.replace) só na compactação.
+  - "sqlite": tabela em SQLite com journal WAL (o snapshot JSON é importado na criação).
+
+Outros processos (vários workers do uvicorn) são detectados pelo tamanho do log /
+`PRAGMA data_version` e o índice é sincronizado só com o que mudou.
+"""
+import json
+import os
+import threading
+from abc import ABC, abstractmethod
+from bisect import bisect_right
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from ..utils.arquivos import escrever_atomico
+from ..utils.sqlite import PorArquivo, conectar
+
+try:
+    import fcntl  # trava entre processos (indisponível no Windows)
+except ImportError:  # pragma: no cover
+    fcntl = None
+
+COMPACTAR_APOS = 500  # linhas no log antes de reescrever o snapshot
+
+
+# campos com índice secundário (filtros de /api/campanha)
+CAMPOS_INDEXADOS = ("Status", "Responsável")
+
+
+class CampanhaStore(ABC):
+    """Índice em memória comum aos backends."""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._itens: Dict[str, Dict[str, Any]] = {}   # id -> item
+        self._ordem: List[str] = []                   # ids na ordem do arquivo (posição = índice)
+        self._pos: Dict[str, int] = {}
+        self._idx: Dict[str, Dict[Any, Set[str]]] = {c: {} for c in CAMPOS_INDEXADOS}
+
+    # ---- índice ----
+    def _indexar(self, itens: List[Dict[str, Any]]):
+        self._itens = {str(it.get("id")): it for it in itens}
+        self._ordem = list(self._itens)
+        self._pos = {id: i for i, id in enumerate(self._ordem)}
+        self._idx = {c: {} for c in CAMPOS_INDEXADOS}
+        for id, it in self._itens.items():
+            for c in CAMPOS_INDEXADOS:
+                self._idx[c].setdefault(it.get(c), set()).add(id)
+
+    def _aplicar_status(self, id: str, status: str) -> bool:
+        it = self._itens.get(id)
+        if it is None:
+            return False
+        self._idx["Status"].get(it.get("Status"), set()).discard(id)
+        self._idx["Status"].setdefault(status, set()).add(id)
+        it["Status"] = status
+        return True
+
+    def _sincronizar(self):
+        """Traz para o índice mudanças feitas por outros processos."""
+
+    @abstractmethod
+    def _persistir_status(self, id: str, status: str):
+        """Grava a troca de status no backend (chamado com o lock, antes de aplicar no índice)."""
+
+    @abstractmethod
+    def _versao(self) -> str:
+        """Versão do estado persistido (ver versao())."""
+
+    # ---- API ----
+    def versao(self) -> str:
+        """Identifica o estado atual (muda a cada escrita, igual entre processos) – usado no ETag."""
+        with self._lock:
+            self._sincronizar()
+            return self._versao()
+
+    def listar(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            self._sincronizar()
+            return list(self._itens.values())
+
+    def pagina(self, filtros: Optional[Dict[str, Any]] = None, apos: Optional[int] = None,
+               limite: Optional[int] = None) -> Tuple[List[Dict[str, Any]], Optional[int], int]:
+        """
+        Itens que casam com `filtros` (campos de CAMPOS_INDEXADOS), a partir da posição `apos`.
+        Retorna (itens, posição para o próximo cursor ou None, total filtrado).
+        """
+        filtros = {c: v for c, v in (filtros or {}).items() if v is not None}
+        with self._lock:
+            self._sincronizar()
+            if filtros:
+                conjuntos = sorted((self._idx[c].get(v, set()) for c, v in filtros.items()), key=len)
+                ids = sorted(set.intersection(*conjuntos), key=self._pos.__getitem__)
+                posicoes = [self._pos[i] for i in ids]
+            else:
+                ids = self._ordem
+                posicoes = None  # posição == índice
+            inicio = 0
+            if apos is not None:
+                inicio = bisect_right(posicoes, apos) if posicoes is not None else apos + 1
+            fim = len(ids) if limite is None else min(len(ids), inicio + limite)
+            itens = [self._itens[i] for i in ids[inicio:fim]]
+            proximo = self._pos[ids[fim - 1]] if fim < len(ids) and itens else None
+            return itens, proximo, len(ids)
+
+    def obter(self, id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            self._sincronizar()
+            return self._itens.get(str(id))
+
+    def total(self) -> int:
+        with self._lock:
+            self._sincronizar()
+            return len(self._itens)
+
+    def contagem(self, status: str) -> int:
+        with self._lock:
+            self._sincronizar()
+            return len(self._idx["Status"].get(status, ()))
+
+    def atualizar_status(self, id: str, status: str) -> bool:
+        id = str(id)
+        with self._lock:
+            self._sincronizar()
+            if id not in self._itens:
+                return False
+            self._persistir_status(id, status)
+            return self._aplicar_status(id, status)
+
+
+class JsonLogStore(CampanhaStore):
+    def __init__(self, arquivo: Path):
+        super().__init__()
+        self.arquivo = Path(arquivo)
+        self.log = self.arquivo.with_name(self.arquivo.stem + ".log.jsonl")
+        self._offset = 0          # bytes do log já aplicados
+        self._linhas_log = 0
+        self._snapshot_sig = None
+        self._carregar()
+
+    def _sig(self):
+        try:
+            st = self.arquivo.stat()
+            return (st.st_mtime_ns, st.st_size)
+        except FileNotFoundError:
+            return None
+
+    def _carregar(self):
+        self.arquivo.parent.mkdir(parents=True, exist_ok=True)
+        if not self.arquivo.exists():
+            escrever_atomico(self.arquivo, "[]")
+        raw = self.arquivo.read_text(encoding="utf-8") or "[]"
+        self._indexar(json.loads(raw))
+        self._snapshot_sig = self._sig()
+        self._offset = self._linhas_log = 0
+        self._replay()
+
+    def _replay(self):
+        if not self.log.exists():
+            return
+        with open(self.log, "rb") as f:
+            f.seek(self._offset)
+            for linha in f:
+                if not linha.endswith(b"\n"):
+                    break  # escrita em andamento em outro processo
+                self._offset += len(linha)
+                self._linhas_log += 1
+                ev = json.loads(linha)
+                self._aplicar_status(str(ev["id"]), ev["Status"])
+
+    def _sincronizar(self):
+        if self._sig() != self._snapshot_sig:
+            self._carregar()  # snapshot trocado (compactação de outro processo ou edição manual)
+            return
+        try:
+            tamanho = self.log.stat().st_size
+        except FileNotFoundError:
+            tamanho = 0
+        if tamanho < self._offset:
+            self._carregar()
+        elif tamanho > self._offset:
+            self._replay()
+
+    def _versao(self) -> str:
+        mtime, tamanho = self._snapshot_sig or (0, 0)
+        return f"{mtime:x}.{tamanho:x}.{self._offset:x}"
+
+    def _persistir_status(self, id: str, status: str):
+        linha = (json.dumps({"id": id, "Status": status}, ensure_ascii=False) + "\n").encode("utf-8")
+        with open(self.log, "ab") as f:
+            if fcntl:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                self._sincronizar()  # aplica o que outros escreveram antes da nossa linha
+                f.write(linha)
+                f.flush()
+                os.fsync(f.fileno())
+                self._offset += len(linha)
+                self._linhas_log += 1
+                if self._linhas_log >= COMPACTAR_APOS:
+                    self._compactar(pendente=(id, status))
+            finally:
+                if fcntl:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _compactar(self, pendente=None):
+        """Reescreve o snapshot com o estado atual e zera o log (chamado com o log travado)."""
+        itens = {k: dict(v) for k, v in self._itens.items()}
+        if pendente and pendente[0] in itens:
+            itens[pendente[0]]["Status"] = pendente[1]
+        escrever_atomico(self.arquivo, json.dumps(list(itens.values()), ensure_ascii=False, indent=2))
+        os.truncate(self.log, 0)
+        self._snapshot_sig = self._sig()
+        self._offset = self._linhas_log = 0
+
+
+class SQLiteStore(CampanhaStore):
+    def __init__(self, arquivo: Path, snapshot: Optional[Path] = None):
+        super().__init__()
+        self.arquivo = Path(arquivo)
+        self._conn = conectar(self.arquivo)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS campanha ("
+            " id TEXT PRIMARY KEY, pos INTEGER NOT NULL, status TEXT, dados TEXT NOT NULL)"
+        )
+        self._conn.execute("CREATE TABLE IF NOT EXISTS meta (chave TEXT PRIMARY KEY, valor INTEGER NOT NULL)")
+        self._conn.execute("INSERT OR IGNORE INTO meta (chave, valor) VALUES ('versao', 0)")
+        vazio = self._conn.execute("SELECT COUNT(*) FROM campanha").fetchone()[0] == 0
+        if vazio and snapshot and Path(snapshot).exists():
+            itens = json.loads(Path(snapshot).read_text(encoding="utf-8") or "[]")
+            with self._conn:
+                self._conn.execute("BEGIN IMMEDIATE")
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO campanha (id, pos, status, dados) VALUES (?, ?, ?, ?)",
+                    [(str(it.get("id")), i, it.get("Status"), json.dumps(it, ensure_ascii=False))
+                     for i, it in enumerate(itens)],
+                )
+        self._data_version = None
+        self._versao_db = 0
+        self._carregar()
+
+    def _carregar(self):
+        rows = self._conn.execute("SELECT dados, status FROM campanha ORDER BY pos").fetchall()
+        itens = []
+        for dados, status in rows:
+            it = json.loads(dados)
+            it["Status"] = status
+            itens.append(it)
+        self._indexar(itens)
+        self._versao_db = self._conn.execute("SELECT valor FROM meta WHERE chave = 'versao'").fetchone()[0]
+        self._data_version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def _sincronizar(self):
+        # data_version muda quando outra conexão faz commit
+        if self._conn.execute("PRAGMA data_version").fetchone()[0] != self._data_version:
+            self._carregar()
+
+    def _versao(self) -> str:
+        return f"db.{self._versao_db:x}"
+
+    def _persistir_status(self, id: str, status: str):
+        with self._conn:
+            self._conn.execute("BEGIN IMMEDIATE")
+            self._conn.execute("UPDATE campanha SET status = ? WHERE id = ?", (status, id))
+            self._conn.execute("UPDATE meta SET valor = valor + 1 WHERE chave = 'versao'")
+        self._versao_db += 1
+
+
+_stores: "PorArquivo[CampanhaStore]" = PorArquivo()
+
+
+def get_store(arquivo: Path) -> CampanhaStore:
+    """
+    Store único por arquivo. Backend escolhido por CAMPANHA_STORE ("json" | "sqlite").
+    """
+    backend = os.getenv("CAMPANHA_STORE", "json").lower()
+
+    def criar() -> CampanhaStore:
+        if backend == "sqlite":
+            return SQLiteStore(Path(arquivo).with_suffix(".sqlite3"), snapshot=arquivo)
+        return JsonLogStore(arquivo)
+
+    return _stores.obter(arquivo, criar, backend)
@@ -0,0 +1,94 @@
+# apps/backend_ia/orquestrador/services/emissao.py
+"""
+Orquestração da emissão de NFT (consultor -> nft -> imagem).
+
+Usada de forma síncrona por POST /api/orquestrador/emitir-nft e, em segundo plano,
+pelos jobs (services/jobs.py, tipo "emitir_nft"), que recebem o progresso por etapa
+via `progresso(etapa, dados)`.
+"""
+import asyncio
+from functools import partial
+from typing import Any, Callable, Dict, Optional
+
+from ..agents import registro
+from .pipeline import Etapa, executar_etapas
+
+# Timeouts (s) por etapa da orquestração; o payload pode sobrescrever via "timeouts"
+TIMEOUTS_ORQUESTRACAO = {"consultor": 20.0, "nft": 60.0, "imagem": 30.0}
+
+
+class ErroOrquestracao(RuntimeError):
+    """Todas as etapas falharam (nada a devolver ao cliente)."""
+
+
+def _sugerir_preco(dados: Dict[str, Any], payload_nft: Dict[str, Any], consult_in: Dict[str, Any]) -> Dict[str, Any]:
+    """Diária sugerida para a emissão; falha vira {"erro": ...} (não derruba a orquestração)."""
+    from ..agents.sources import precificacao
+    cidade = dados.get("cidade") or payload_nft.get("cidade") or (consult_in.get("cidades") or [None])[0]
+    try:
+        return precificacao.sugerir(
+            cidade,
+            dados.get("tipoImovel") or payload_nft.get("tipoImovel"),
+            payload_nft.get("dataInicio"),
+            payload_nft.get("dataFim"),
+        )
+    except Exception as e:
+        print(f"[ORQ] Precificação indisponível para '{cidade}': {e}")
+        return {"erro": str(e), "cidade": cidade}
+
+
+async def emitir(dados: Dict[str, Any], progresso: Optional[Callable[[str, Dict[str, Any]], None]] = None) -> Dict[str, Any]:
+    """Executa a emissão completa; resultado parcial quando só parte das etapas falha."""
+    _progresso = progresso or (lambda etapa, info: None)
+
+    # consultor de mercado (opcional no payload)
+    consult_in = dados.get("consultor") or {"cidades": ["Florianopolis"], "regioes": ["Brasil"], "moeda": "BRL"}
+
+    # sugestoes opcionais -> nft
+    preco_sugerido = dados.get("precoSugerido")
+    politica_cancelamento = dados.get("politicaCancelamento") or "moderada"
+
+    payload_nft = {**(dados.get("nft") or {})}
+    precificacao = None
+    if preco_sugerido is None:
+        # sem preço do cliente: diária sugerida pelas tabelas de quantis (ver sources/precificacao.py)
+        precificacao = await asyncio.get_running_loop().run_in_executor(
+            None, _sugerir_preco, dados, payload_nft, consult_in)
+        if "valorDiaria" in precificacao:
+            preco_sugerido = precificacao["valorDiaria"]
+            payload_nft.setdefault("valorDiaria", str(preco_sugerido))
+        _progresso("precificacao", {"status": "erro" if "erro" in precificacao else "ok"})
+    if preco_sugerido is not None:
+        payload_nft["precoSugerido"] = preco_sugerido
+    if politica_cancelamento:
+        payload_nft["politicaCancelamento"] = politica_cancelamento
+
+    # consultor, nft e imagem são independentes -> rodam em paralelo
+    timeouts = {**TIMEOUTS_ORQUESTRACAO, **(dados.get("timeouts") or {})}
+    etapas = [
+        Etapa("consultor", partial(registro.executar, "consultor_mercado"), consult_in,
+              timeout=timeouts.get("consultor")),
+        Etapa("nft", partial(registro.executar, "nft"), payload_nft, timeout=timeouts.get("nft")),
+        Etapa("imagem", partial(registro.executar, "imagem"), dados.get("descricao") or "imagem do NFT de diárias",
+              timeout=timeouts.get("imagem")),
+    ]
+    execucao = await executar_etapas(
+        etapas,
+        ao_concluir=lambda nome, r: _progresso(nome, {"status": r["status"], "erro": r["erro"],
+                                                      "duracao_ms": r["duracao_ms"]}),
+    )
+
+    erros = {nome: r["erro"] for nome, r in execucao.items() if r["status"] != "ok"}
+    if len(erros) == len(execucao):
+        raise ErroOrquestracao(f"Erro na orquestração: {erros}")
+
+    return {
+        "sucesso": not erros,
+        "parcial": bool(erros),
+        "consultor": execucao["consultor"]["resultado"],
+        "precificacao": precificacao,
+        "nft": execucao["nft"]["resultado"],
+        "imagem": execucao["imagem"]["resultado"],
+        "erros": erros,
+        "tempos_ms": {nome: r["duracao_ms"] for nome, r in execucao.items()},
+    }
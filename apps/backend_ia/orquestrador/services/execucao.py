@@ -0,0 +1,117 @@
+# apps/backend_ia/orquestrador/services/execucao.py
+"""
+Camada de execução de agentes fora do event loop.
+
+Cada agente tem um perfil:
+  - "async": coroutine -> await direto no loop
+  - "leve":  síncrono e barato (só monta dicts/strings) -> roda no próprio loop
+  - "io":    síncrono com I/O bloqueante (rede, disco) -> pool de threads limitado
+  - "cpu":   síncrono e pesado (pandas etc.) -> pool de processos
+Além do pool, cada agente tem um limite próprio de execuções simultâneas.
+Os perfis são declarados no registro de agentes (agents/registro.py).
+
+Variáveis de ambiente:
+  EIAH_IO_WORKERS   tamanho do pool de threads (padrão 16)
+  EIAH_CPU_WORKERS  tamanho do pool de processos (padrão nº de CPUs; 0 desativa e usa threads)
+"""
+import asyncio
+import inspect
+import multiprocessing
+import os
+import threading
+import weakref
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable, Optional
+
+
+@dataclass(frozen=True)
+class Perfil:
+    tipo: str = "io"     # "async" | "leve" | "io" | "cpu"
+    limite: int = 8      # execuções simultâneas deste agente
+
+
+PERFIL_PADRAO = Perfil("io")
+
+_lock = threading.Lock()
+_pool_io: Optional[ThreadPoolExecutor] = None
+_pool_cpu: Optional[Executor] = None
+# semáforos são por event loop (asyncio.Semaphore não pode ser compartilhado entre loops)
+_semaforos: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()  # loop -> {perfil: Semaphore}
+
+
+def perfil(nome: str) -> Perfil:
+    """Perfil declarado no registro de agentes (agents/registro.py)."""
+    from ..agents.registro import obter
+
+    spec = obter(nome)
+    return spec.perfil if spec else PERFIL_PADRAO
+
+
+def _get_pool_io() -> ThreadPoolExecutor:
+    global _pool_io
+    with _lock:
+        if _pool_io is None:
+            _pool_io = ThreadPoolExecutor(
+                max_workers=int(os.getenv("EIAH_IO_WORKERS", "16")),
+                thread_name_prefix="agente-io",
+            )
+        return _pool_io
+
+
+def _get_pool_cpu() -> Executor:
+    global _pool_cpu
+    workers = int(os.getenv("EIAH_CPU_WORKERS", str(os.cpu_count() or 1)))
+    if workers <= 0:
+        return _get_pool_io()
+    with _lock:
+        if _pool_cpu is None:
+            # spawn: o processo do uvicorn tem threads, fork não é seguro aqui
+            _pool_cpu = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _pool_cpu
+
+
+def pool_cpu() -> Optional[Executor]:
+    """Pool de processos compartilhado (None se desativado ou se já estamos num processo filho)."""
+    if multiprocessing.parent_process() is not None:
+        return None
+    if int(os.getenv("EIAH_CPU_WORKERS", str(os.cpu_count() or 1))) <= 0:
+        return None
+    return _get_pool_cpu()
+
+
+def _semaforo(nome: str, limite: int) -> asyncio.Semaphore:
+    loop = asyncio.get_running_loop()
+    por_agente = _semaforos.setdefault(loop, {})
+    if nome not in por_agente:
+        por_agente[nome] = asyncio.Semaphore(limite)
+    return por_agente[nome]
+
+
+async def executar_agente(nome: str, funcao: Callable[[Any], Any], entrada: Any) -> Any:
+    """
+    Executa `funcao(entrada)` conforme o perfil do agente `nome`.
+    Para o perfil "cpu" a função precisa ser importável pelo nome (função de módulo).
+    """
+    p = perfil(nome)
+    async with _semaforo(nome, p.limite):
+        if inspect.iscoroutinefunction(funcao) or p.tipo == "async":
+            return await funcao(entrada)
+        if p.tipo == "leve":
+            return funcao(entrada)
+        loop = asyncio.get_running_loop()
+        pool = _get_pool_cpu() if p.tipo == "cpu" else _get_pool_io()
+        return await loop.run_in_executor(pool, funcao, entrada)
+
+
+def encerrar():
+    """Finaliza os pools (chamado no shutdown da aplicação)."""
+    global _pool_io, _pool_cpu
+    with _lock:
+        for pool in (_pool_cpu, _pool_io):
+            if pool is not None:
+                pool.shutdown(wait=False, cancel_futures=True)
+        _pool_io = _pool_cpu = None
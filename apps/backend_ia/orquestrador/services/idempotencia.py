@@ -0,0 +1,189 @@
+# apps/backend_ia/orquestrador/services/idempotencia.py
+"""
+Idempotência das emissões (IPFS + mint não podem rodar duas vezes para o mesmo pedido).
+
+Cada execução é identificada por (escopo, chave): a chave vem do cliente
+(header Idempotency-Key) ou é o hash do conteúdo validado (`chave_conteudo`).
+O resultado de sucesso fica numa tabela SQLite (DATA_DIR/idempotencia.sqlite3) e é
+devolvido direto nas repetições. Enquanto a primeira execução roda, a linha fica
+"executando" com um lease: duplicatas simultâneas (mesmo processo ou outro worker)
+esperam por ela em vez de executar de novo – até ESPERA_MAX_SEC (ou o `espera_max` da
+chamada); depois disso, EmAndamento (a rota responde 409 e o cliente repete mais tarde),
+em vez de prender a requisição pelo lease inteiro se o dono morreu. Falha libera a chave
+(o retry executa).
+
+A mesma chave com conteúdo diferente é erro do cliente (ConflitoIdempotencia).
+"""
+import asyncio
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Optional, Tuple
+
+from ..utils.paths import DATA_DIR
+from ..utils.sqlite import DONO, PorArquivo, StoreSQLite
+
+ARQUIVO = Path(os.getenv("EIAH_IDEMPOTENCIA_DB", DATA_DIR / "idempotencia.sqlite3"))
+TTL_SEC = float(os.getenv("EIAH_IDEMPOTENCIA_TTL", str(30 * 86400)))  # resultados guardados por 30 dias
+LEASE_SEC = float(os.getenv("EIAH_IDEMPOTENCIA_LEASE", "600"))         # execução travada antes de ser retomada
+ESPERA_SEC = 0.05
+ESPERA_MAX_SEC = float(os.getenv("EIAH_IDEMPOTENCIA_ESPERA", "60"))   # espera por duplicata em andamento
+
+
+class ConflitoIdempotencia(ValueError):
+    """Chave já usada com outro conteúdo."""
+
+
+class EmAndamento(RuntimeError):
+    """Execução da mesma chave em andamento além da espera máxima."""
+
+
+def chave_conteudo(dados: Any) -> str:
+    """sha256 do JSON canônico (chaves ordenadas) – mesma entrada, mesma chave."""
+    canonico = json.dumps(dados, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+    return hashlib.sha256(canonico.encode("utf-8")).hexdigest()
+
+
+class IdempotenciaStore(StoreSQLite):
+    def __init__(self, arquivo: Path):
+        super().__init__(arquivo)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS idempotencia ("
+            " escopo TEXT NOT NULL, chave TEXT NOT NULL, hash_entrada TEXT, status TEXT NOT NULL,"
+            " resultado TEXT, dono TEXT, lease_ate REAL, criado_em REAL NOT NULL, expira_em REAL,"
+            " PRIMARY KEY (escopo, chave))"
+        )
+        self._exec("DELETE FROM idempotencia WHERE status = 'concluido' AND expira_em < ?", (time.time(),))
+
+    def reservar(self, escopo: str, chave: str, hash_entrada: Optional[str] = None,
+                 dono: str = DONO) -> Tuple[str, Any]:
+        """
+        ("novo", None)         -> a execução é nossa; chamar concluir() ou liberar()
+        ("concluido", result)  -> já executado: devolver o resultado guardado
+        ("executando", None)   -> outra execução em andamento: esperar
+        """
+        agora = time.time()
+        with self._lock, self._conn:
+            self._conn.execute("BEGIN IMMEDIATE")
+            row = self._conn.execute(
+                "SELECT hash_entrada, status, resultado, lease_ate, expira_em FROM idempotencia"
+                " WHERE escopo = ? AND chave = ?", (escopo, chave)).fetchone()
+            if row is not None:
+                h, status, resultado, lease_ate, expira_em = row
+                if hash_entrada and h and h != hash_entrada:
+                    raise ConflitoIdempotencia(f"Chave '{chave}' já usada com outro conteúdo.")
+                if status == "concluido" and (expira_em is None or expira_em > agora):
+                    return "concluido", json.loads(resultado)
+                if status == "executando" and lease_ate and lease_ate > agora:
+                    return "executando", None
+            self._conn.execute(
+                "INSERT OR REPLACE INTO idempotencia (escopo, chave, hash_entrada, status, dono, lease_ate, criado_em)"
+                " VALUES (?, ?, ?, 'executando', ?, ?, ?)",
+                (escopo, chave, hash_entrada, dono, agora + LEASE_SEC, agora))
+            return "novo", None
+
+    def concluir(self, escopo: str, chave: str, resultado: Any, ttl_sec: float = TTL_SEC):
+        self._exec(
+            "UPDATE idempotencia SET status = 'concluido', resultado = ?, dono = NULL, lease_ate = NULL,"
+            " expira_em = ? WHERE escopo = ? AND chave = ?",
+            (json.dumps(resultado, ensure_ascii=False, default=str), time.time() + ttl_sec, escopo, chave))
+
+    def liberar(self, escopo: str, chave: str, dono: str = DONO):
+        self._exec("DELETE FROM idempotencia WHERE escopo = ? AND chave = ? AND status = 'executando' AND dono = ?",
+                   (escopo, chave, dono))
+
+    def obter(self, escopo: str, chave: str) -> Optional[Any]:
+        """Resultado guardado (None se não há execução concluída válida)."""
+        row = self._exec(
+            "SELECT resultado FROM idempotencia WHERE escopo = ? AND chave = ? AND status = 'concluido'"
+            " AND expira_em > ?", (escopo, chave, time.time())).fetchone()
+        return json.loads(row[0]) if row else None
+
+
+_stores: "PorArquivo[IdempotenciaStore]" = PorArquivo()
+
+
+def get_store() -> IdempotenciaStore:
+    arquivo = ARQUIVO
+    return _stores.obter(arquivo, lambda: IdempotenciaStore(arquivo))
+
+
+def _limite(espera_max: Optional[float]) -> Tuple[float, float]:
+    espera = ESPERA_MAX_SEC if espera_max is None else espera_max
+    return time.monotonic() + espera, espera
+
+
+def _conferir_espera(chave: str, limite: Tuple[float, float]):
+    if time.monotonic() >= limite[0]:
+        raise EmAndamento(f"Execução da chave '{chave}' ainda em andamento após {limite[1]:.0f}s; repita mais tarde.")
+
+
+def executar_uma_vez(
+    escopo: str,
+    chave: str,
+    funcao: Callable[[], Any],
+    hash_entrada: Optional[str] = None,
+    sucesso: Callable[[Any], bool] = lambda r: True,
+    espera_max: Optional[float] = None,
+) -> Tuple[Any, bool]:
+    """
+    Executa `funcao()` uma única vez por (escopo, chave). Devolve (resultado, reutilizado).
+    Só resultados com `sucesso(resultado)` ficam guardados; os demais liberam a chave.
+    Duplicata em andamento por mais de `espera_max` (padrão ESPERA_MAX_SEC): EmAndamento.
+    """
+    store = get_store()
+    limite = _limite(espera_max)
+    while True:
+        estado, resultado = store.reservar(escopo, chave, hash_entrada)
+        if estado == "concluido":
+            return resultado, True
+        if estado == "novo":
+            break
+        _conferir_espera(chave, limite)
+        time.sleep(ESPERA_SEC)  # duplicata simultânea: espera a execução em andamento
+    try:
+        resultado = funcao()
+    except BaseException:
+        store.liberar(escopo, chave)
+        raise
+    if sucesso(resultado):
+        store.concluir(escopo, chave, resultado)
+    else:
+        store.liberar(escopo, chave)
+    return resultado, False
+
+
+async def executar_uma_vez_async(
+    escopo: str,
+    chave: str,
+    funcao: Callable[[], Awaitable[Any]],
+    hash_entrada: Optional[str] = None,
+    sucesso: Callable[[Any], bool] = lambda r: True,
+    espera_max: Optional[float] = None,
+) -> Tuple[Any, bool]:
+    """
+    Versão para coroutines: nem a espera nem o SQLite (BEGIN IMMEDIATE pode aguardar a
+    trava até o busy_timeout) bloqueiam o event loop – o store roda na própria thread.
+    """
+    store = get_store()
+    limite = _limite(espera_max)
+    while True:
+        estado, resultado = await store.fora_do_loop(store.reservar, escopo, chave, hash_entrada)
+        if estado == "concluido":
+            return resultado, True
+        if estado == "novo":
+            break
+        _conferir_espera(chave, limite)
+        await asyncio.sleep(ESPERA_SEC)
+    try:
+        resultado = await funcao()
+    except BaseException:
+        store.agendar(store.liberar, escopo, chave)  # sem await: pode ser o cancelamento da requisição
+        raise
+    if sucesso(resultado):
+        await store.fora_do_loop(store.concluir, escopo, chave, resultado)
+    else:
+        await store.fora_do_loop(store.liberar, escopo, chave)
+    return resultado, False
@@ -0,0 +1,345 @@
+# apps/backend_ia/orquestrador/services/jobs.py
+"""
+Fila de jobs para emissões longas (consultor -> nft -> imagem, lotes de NFT).
+
+A fila é uma tabela SQLite (WAL) em DATA_DIR/jobs.sqlite3: sobrevive a restart e é
+compartilhada entre workers do uvicorn. Cada processo roda `EIAH_JOBS_WORKERS`
+tarefas asyncio que:
+  - pegam o próximo job "pendente" numa transação BEGIN IMMEDIATE (um job, um dono);
+  - renovam o lease enquanto o job roda;
+  - gravam progresso por etapa, resultado ou erro.
+Job "executando" de um processo que morreu volta para a fila: na subida (mesmo host,
+pid morto) ou quando o lease vence. Depois de MAX_TENTATIVAS vira "erro".
+
+Estados: pendente -> executando -> concluido | erro; pendente -> cancelado.
+Só job na fila pode ser cancelado: em execução, as etapas síncronas (upload IPFS, mint)
+rodam em threads do executor que não são interrompidas – o mint sairia mesmo com o job
+marcado como cancelado.
+Cada mudança incrementa `versao`, que o stream de eventos (SSE) acompanha.
+"""
+import asyncio
+import json
+import os
+import socket
+import sqlite3
+import time
+import uuid
+from pathlib import Path
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+from ..utils.paths import DATA_DIR
+from ..utils.sqlite import DONO, PorArquivo, StoreSQLite
+
+ARQUIVO = Path(os.getenv("EIAH_JOBS_DB", DATA_DIR / "jobs.sqlite3"))
+LEASE_SEC = float(os.getenv("EIAH_JOBS_LEASE_SEC", "300"))
+MAX_TENTATIVAS = int(os.getenv("EIAH_JOBS_MAX_TENTATIVAS", "3"))
+RETER_SEC = float(os.getenv("EIAH_JOBS_RETER_SEC", str(7 * 86400)))  # jobs finalizados guardados por 7 dias
+INTERVALO_SEC = 1.0  # polling da fila / renovação do lease
+
+TERMINAIS = ("concluido", "erro", "cancelado")
+
+# (entrada, progresso) -> resultado
+Executor = Callable[[Any, Callable[[str, Dict[str, Any]], None]], Awaitable[Any]]
+
+
+async def _emitir_nft(entrada, progresso):
+    from . import emissao
+    return await emissao.emitir(entrada, progresso)
+
+
+async def _nft_lote(entrada, progresso):
+    from ..agents import registro
+    return await registro.executar("nft_lote", entrada)
+
+
+TIPOS: Dict[str, Executor] = {
+    "emitir_nft": _emitir_nft,
+    "nft_lote": _nft_lote,
+}
+
+
+class JobStore(StoreSQLite):
+    def __init__(self, arquivo: Path):
+        super().__init__(arquivo)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            " id TEXT PRIMARY KEY, tipo TEXT NOT NULL, status TEXT NOT NULL,"
+            " entrada TEXT NOT NULL, resultado TEXT, erro TEXT, progresso TEXT NOT NULL DEFAULT '[]',"
+            " prioridade INTEGER NOT NULL DEFAULT 0, tentativas INTEGER NOT NULL DEFAULT 0,"
+            " cancelar INTEGER NOT NULL DEFAULT 0, dono TEXT, lease_ate REAL,"
+            " criado_em REAL NOT NULL, iniciado_em REAL, concluido_em REAL,"
+            " versao INTEGER NOT NULL DEFAULT 0)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_fila ON jobs (status, prioridade DESC, criado_em)")
+
+    @staticmethod
+    def _linha(cur: sqlite3.Cursor, row) -> Dict[str, Any]:
+        job = dict(zip([c[0] for c in cur.description], row))
+        for campo in ("entrada", "resultado", "progresso"):
+            if job.get(campo) is not None:
+                job[campo] = json.loads(job[campo])
+        job["cancelar"] = bool(job["cancelar"])
+        return job
+
+    # ---- API ----
+    def criar(self, tipo: str, entrada: Any, prioridade: int = 0) -> str:
+        id = uuid.uuid4().hex
+        self._exec(
+            "INSERT INTO jobs (id, tipo, status, entrada, prioridade, criado_em) VALUES (?, ?, 'pendente', ?, ?, ?)",
+            (id, tipo, json.dumps(entrada, ensure_ascii=False, default=str), prioridade, time.time()),
+        )
+        return id
+
+    def obter(self, id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            cur = self._conn.execute("SELECT * FROM jobs WHERE id = ?", (id,))
+            row = cur.fetchone()
+            return self._linha(cur, row) if row else None
+
+    def versao(self, id: str) -> Optional[int]:
+        row = self._exec("SELECT versao FROM jobs WHERE id = ?", (id,)).fetchone()
+        return row[0] if row else None
+
+    def listar(self, status: Optional[str] = None, limite: int = 50) -> List[Dict[str, Any]]:
+        sql = ("SELECT id, tipo, status, tentativas, criado_em, iniciado_em, concluido_em FROM jobs"
+               + (" WHERE status = ?" if status else "") + " ORDER BY criado_em DESC LIMIT ?")
+        with self._lock:
+            cur = self._conn.execute(sql, ((status,) if status else ()) + (limite,))
+            nomes = [c[0] for c in cur.description]
+            return [dict(zip(nomes, r)) for r in cur.fetchall()]
+
+    def pegar(self, dono: str = DONO) -> Optional[Dict[str, Any]]:
+        """Reserva o próximo job (pendente ou com lease vencido) para `dono`."""
+        agora = time.time()
+        with self._lock, self._conn:
+            self._conn.execute("BEGIN IMMEDIATE")
+            while True:
+                cur = self._conn.execute(
+                    "SELECT * FROM jobs WHERE (status = 'pendente' OR (status = 'executando' AND lease_ate < ?))"
+                    " ORDER BY prioridade DESC, criado_em LIMIT 1", (agora,))
+                row = cur.fetchone()
+                if row is None:
+                    return None
+                job = self._linha(cur, row)
+                if job["cancelar"] or job["tentativas"] >= MAX_TENTATIVAS:
+                    status, erro = (("cancelado", None) if job["cancelar"]
+                                    else ("erro", f"abandonado após {job['tentativas']} tentativa(s)"))
+                    self._conn.execute(
+                        "UPDATE jobs SET status = ?, erro = ?, concluido_em = ?, dono = NULL,"
+                        " versao = versao + 1 WHERE id = ?", (status, erro, agora, job["id"]))
+                    continue
+                self._conn.execute(
+                    "UPDATE jobs SET status = 'executando', tentativas = tentativas + 1, dono = ?, lease_ate = ?,"
+                    " iniciado_em = ?, versao = versao + 1 WHERE id = ?",
+                    (dono, agora + LEASE_SEC, agora, job["id"]))
+                job.update(status="executando", tentativas=job["tentativas"] + 1, dono=dono)
+                return job
+
+    def renovar(self, id: str, dono: str = DONO):
+        self._exec("UPDATE jobs SET lease_ate = ? WHERE id = ? AND dono = ?", (time.time() + LEASE_SEC, id, dono))
+
+    def progresso(self, id: str, evento: Dict[str, Any]):
+        evento = {"ts": time.time(), **evento}
+        with self._lock, self._conn:
+            self._conn.execute("BEGIN IMMEDIATE")
+            row = self._conn.execute("SELECT progresso FROM jobs WHERE id = ?", (id,)).fetchone()
+            if row is None:
+                return
+            eventos = json.loads(row[0]) + [evento]
+            self._conn.execute(
+                "UPDATE jobs SET progresso = ?, lease_ate = ?, versao = versao + 1 WHERE id = ?",
+                (json.dumps(eventos, ensure_ascii=False, default=str), time.time() + LEASE_SEC, id))
+
+    def finalizar(self, id: str, status: str, resultado: Any = None, erro: Optional[str] = None,
+                  dono: str = DONO):
+        self._exec(
+            "UPDATE jobs SET status = ?, resultado = ?, erro = ?, concluido_em = ?, dono = NULL, lease_ate = NULL,"
+            " versao = versao + 1 WHERE id = ? AND dono = ?",
+            (status, None if resultado is None else json.dumps(resultado, ensure_ascii=False, default=str),
+             erro, time.time(), id, dono))
+
+    def devolver(self, id: str, dono: str = DONO):
+        """Job interrompido pelo shutdown volta para a fila sem gastar tentativa."""
+        self._exec(
+            "UPDATE jobs SET status = 'pendente', tentativas = MAX(tentativas - 1, 0), dono = NULL,"
+            " lease_ate = NULL, versao = versao + 1 WHERE id = ? AND dono = ?", (id, dono))
+
+    def cancelar(self, id: str) -> Optional[str]:
+        """Pendente vira cancelado; nos demais estados nada muda e o status atual é devolvido."""
+        with self._lock, self._conn:
+            self._conn.execute("BEGIN IMMEDIATE")
+            row = self._conn.execute("SELECT status FROM jobs WHERE id = ?", (id,)).fetchone()
+            if row is None:
+                return None
+            status = row[0]
+            if status == "pendente":
+                self._conn.execute(
+                    "UPDATE jobs SET status = 'cancelado', cancelar = 1, concluido_em = ?, versao = versao + 1"
+                    " WHERE id = ?", (time.time(), id))
+                return "cancelado"
+            return status
+
+    def recuperar(self) -> int:
+        """Devolve à fila os jobs 'executando' de processos mortos deste host."""
+        host = socket.gethostname()
+        with self._lock:
+            donos = [r[0] for r in self._conn.execute(
+                "SELECT DISTINCT dono FROM jobs WHERE status = 'executando' AND dono LIKE ?", (f"{host}:%",))]
+        mortos = [d for d in donos if d != DONO and not _pid_vivo(int(d.rsplit(":", 1)[1]))]
+        total = 0
+        for d in mortos:
+            total += self._exec(
+                "UPDATE jobs SET status = 'pendente', dono = NULL, lease_ate = NULL, versao = versao + 1"
+                " WHERE status = 'executando' AND dono = ?", (d,)).rowcount
+        return total
+
+    def limpar(self, reter_sec: float = RETER_SEC) -> int:
+        return self._exec(
+            "DELETE FROM jobs WHERE status IN ('concluido', 'erro', 'cancelado') AND concluido_em < ?",
+            (time.time() - reter_sec,)).rowcount
+
+
+def _pid_vivo(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+_stores: "PorArquivo[JobStore]" = PorArquivo()
+
+
+def get_store() -> JobStore:
+    arquivo = ARQUIVO
+    return _stores.obter(arquivo, lambda: JobStore(arquivo))
+
+
+# ---------------- API de módulo ----------------
+
+_workers: List[asyncio.Task] = []
+_novo: Optional[asyncio.Event] = None
+_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def enviar(tipo: str, entrada: Any, prioridade: int = 0) -> Dict[str, Any]:
+    if tipo not in TIPOS:
+        raise ValueError(f"Tipo de job desconhecido: '{tipo}'. Disponíveis: {sorted(TIPOS)}")
+    store = get_store()
+    id = store.criar(tipo, entrada, prioridade)
+    print(f"[JOBS] {tipo} enfileirado ({id})")
+    if _loop is not None and _novo is not None:
+        _loop.call_soon_threadsafe(_novo.set)  # acorda um worker sem esperar o polling
+    return store.obter(id)
+
+
+def obter(id: str) -> Optional[Dict[str, Any]]:
+    return get_store().obter(id)
+
+
+def listar(status: Optional[str] = None, limite: int = 50) -> List[Dict[str, Any]]:
+    return get_store().listar(status, limite)
+
+
+def cancelar(id: str) -> Optional[str]:
+    return get_store().cancelar(id)
+
+
+async def _executar(store: JobStore, job: Dict[str, Any]):
+    # todo acesso ao SQLite sai do event loop (fora_do_loop/agendar, na thread do store):
+    # BEGIN IMMEDIATE disputado entre workers pode esperar a trava até o busy_timeout
+    id = job["id"]
+
+    def progresso(etapa: str, info: Dict[str, Any]):
+        store.agendar(store.progresso, id, {"etapa": etapa, **info})  # mesma thread: ordem preservada
+
+    tarefa = asyncio.ensure_future(TIPOS[job["tipo"]](job["entrada"], progresso))
+    inicio = time.perf_counter()
+    try:
+        while True:
+            feito, _ = await asyncio.wait({tarefa}, timeout=INTERVALO_SEC)
+            if feito:
+                break
+            await store.fora_do_loop(store.renovar, id)
+        resultado = tarefa.result()
+        await store.fora_do_loop(store.finalizar, id, "concluido", resultado)
+        status = "concluido"
+    except asyncio.CancelledError:
+        if not tarefa.cancelled():  # o próprio worker foi cancelado (shutdown): volta para a fila
+            tarefa.cancel()
+            store.agendar(store.devolver, id)
+            raise
+        # cancelada por dentro (não há cancelamento de job em execução): não é "cancelado"
+        await store.fora_do_loop(store.finalizar, id, "erro", erro="Execução interrompida")
+        status = "erro"
+    except Exception as e:
+        await store.fora_do_loop(store.finalizar, id, "erro", erro=str(e))
+        status = "erro"
+    print(f"[JOBS] {job['tipo']} {id}: {status} em {round((time.perf_counter() - inicio) * 1000, 2)} ms")
+
+
+async def _worker(n: int):
+    store = get_store()
+    while True:
+        try:
+            job = await store.fora_do_loop(store.pegar)
+        except sqlite3.Error as e:
+            print(f"[JOBS] worker {n}: falha ao ler a fila: {e}")
+            job = None
+        if job is None:
+            try:
+                await asyncio.wait_for(_novo.wait(), INTERVALO_SEC)
+            except asyncio.TimeoutError:
+                pass
+            _novo.clear()
+            continue
+        await _executar(store, job)
+
+
+def iniciar(workers: int):
+    """Sobe `workers` tarefas no event loop atual (chamado pelo lifespan da app)."""
+    global _novo, _loop
+    if _workers or workers <= 0:
+        return
+    store = get_store()
+    recuperados, removidos = store.recuperar(), store.limpar()
+    _loop = asyncio.get_running_loop()
+    _novo = asyncio.Event()
+    _workers.extend(_loop.create_task(_worker(n), name=f"jobs-{n}") for n in range(workers))
+    print(f"[JOBS] {workers} worker(s) em {store.arquivo} "
+          f"({recuperados} job(s) recuperado(s), {removidos} antigo(s) removido(s))")
+
+
+async def parar():
+    """Cancela os workers; jobs em andamento voltam para 'pendente'."""
+    global _novo, _loop
+    tarefas = list(_workers)
+    _workers.clear()
+    for t in tarefas:
+        t.cancel()
+    await asyncio.gather(*tarefas, return_exceptions=True)
+    _novo = _loop = None
+
+
+async def eventos(id: str, intervalo: float = 0.25, keepalive: float = 15.0) -> AsyncIterator[str]:
+    """Stream SSE: um evento a cada mudança do job, até ele terminar."""
+    store = get_store()
+    ultima, silencio = None, 0.0
+    while True:
+        versao = await store.fora_do_loop(store.versao, id)
+        if versao is None:
+            return
+        if versao != ultima:
+            ultima, silencio = versao, 0.0
+            job = await store.fora_do_loop(store.obter, id)
+            dados = {k: job[k] for k in ("id", "tipo", "status", "progresso", "tentativas", "erro")}
+            yield f"event: {job['status']}\ndata: {json.dumps(dados, ensure_ascii=False, default=str)}\n\n"
+            if job["status"] in TERMINAIS:
+                return
+        elif silencio >= keepalive:
+            silencio = 0.0
+            yield ": keepalive\n\n"
+        await asyncio.sleep(intervalo)
+        silencio += intervalo
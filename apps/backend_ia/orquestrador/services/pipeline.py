@@ -0,0 +1,116 @@
+# apps/backend_ia/orquestrador/services/pipeline.py
+"""
+Estágio de orquestração com dependências.
+
+Cada etapa declara de quais outras depende; etapas independentes rodam ao mesmo
+tempo (asyncio), cada uma com seu timeout. Falha/timeout de uma etapa não derruba
+as demais: o resultado é parcial e as dependentes da etapa que falhou são marcadas
+como "ignorada".
+"""
+import asyncio
+import inspect
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+
+@dataclass
+class Etapa:
+    nome: str
+    funcao: Callable[[Any], Any]
+    entrada: Any = None
+    depende_de: List[str] = field(default_factory=list)
+    timeout: Optional[float] = None
+    # (entrada, resultados_das_dependencias) -> entrada final da etapa
+    preparar: Optional[Callable[[Any, Dict[str, Any]], Any]] = None
+
+
+def _validar(etapas: List[Etapa]) -> Dict[str, Etapa]:
+    por_nome: Dict[str, Etapa] = {}
+    for e in etapas:
+        if e.nome in por_nome:
+            raise ValueError(f"Etapa duplicada: '{e.nome}'")
+        por_nome[e.nome] = e
+    for e in etapas:
+        for dep in e.depende_de:
+            if dep not in por_nome:
+                raise ValueError(f"Etapa '{e.nome}' depende de '{dep}', que não existe")
+
+    # detecção de ciclo (DFS)
+    visitando, ok = set(), set()
+
+    def _visita(nome: str):
+        if nome in ok:
+            return
+        if nome in visitando:
+            raise ValueError(f"Ciclo de dependências envolvendo '{nome}'")
+        visitando.add(nome)
+        for dep in por_nome[nome].depende_de:
+            _visita(dep)
+        visitando.discard(nome)
+        ok.add(nome)
+
+    for nome in por_nome:
+        _visita(nome)
+    return por_nome
+
+
+async def _chamar(funcao: Callable[[Any], Any], entrada: Any) -> Any:
+    if inspect.iscoroutinefunction(funcao):
+        return await funcao(entrada)
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, funcao, entrada)
+
+
+async def executar_etapas(
+    etapas: List[Etapa],
+    timeout_padrao: Optional[float] = None,
+    ao_concluir: Optional[Callable[[str, Dict[str, Any]], None]] = None,
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Executa as etapas respeitando dependências e devolve, por etapa:
+      { status: "ok"|"erro"|"timeout"|"ignorada", resultado, erro, duracao_ms }
+    `ao_concluir(nome, resultado)` é chamado assim que cada etapa termina (progresso).
+
+    Obs.: no timeout de uma função síncrona a thread do executor não é interrompida;
+    apenas deixamos de esperar por ela.
+    """
+    por_nome = _validar(etapas)
+    tarefas: Dict[str, asyncio.Task] = {}
+
+    async def _rodar(etapa: Etapa) -> Dict[str, Any]:
+        deps = {}
+        for dep in etapa.depende_de:
+            deps[dep] = await tarefas[dep]
+        falhas = [d for d, r in deps.items() if r["status"] != "ok"]
+        if falhas:
+            return {"status": "ignorada", "resultado": None,
+                    "erro": f"dependência falhou: {', '.join(falhas)}", "duracao_ms": 0.0}
+
+        timeout = etapa.timeout if etapa.timeout is not None else timeout_padrao
+        inicio = time.perf_counter()
+        try:
+            entrada = etapa.entrada
+            if etapa.preparar:
+                entrada = etapa.preparar(entrada, {d: r["resultado"] for d, r in deps.items()})
+            resultado = await asyncio.wait_for(_chamar(etapa.funcao, entrada), timeout)
+            status, erro = "ok", None
+        except asyncio.TimeoutError:
+            resultado, status, erro = None, "timeout", f"excedeu {timeout}s"
+        except Exception as e:
+            resultado, status, erro = None, "erro", str(e)
+        duracao = round((time.perf_counter() - inicio) * 1000, 2)
+        if status != "ok":
+            print(f"[PIPELINE] Etapa '{etapa.nome}' {status}: {erro}")
+        saida = {"status": status, "resultado": resultado, "erro": erro, "duracao_ms": duracao}
+        if ao_concluir:
+            try:
+                ao_concluir(etapa.nome, saida)
+            except Exception as e:  # progresso nunca derruba a etapa
+                print(f"[PIPELINE] Callback de '{etapa.nome}' falhou: {e}")
+        return saida
+
+    for nome, etapa in por_nome.items():
+        tarefas[nome] = asyncio.ensure_future(_rodar(etapa))
+    resultados = await asyncio.gather(*tarefas.values())
+    return dict(zip(tarefas.keys(), resultados))
@@ -0,0 +1,69 @@
+# apps/backend_ia/orquestrador/services/prefetch.py
+"""
+Prefetch agendado dos conectores de mercado.
+
+Uma thread daemon roda `rodada()` logo ao subir e depois a cada `intervalo` segundos:
+cada conector aquece as chaves configuradas (cidades com dataset, fontes com URL) no
+cache local, então as requisições do consultor encontram tudo pronto. Iniciado e
+parado pelo lifespan da app (main.py); EIAH_PREFETCH_SEC=0 desliga.
+"""
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+_thread: Optional[threading.Thread] = None
+_parar = threading.Event()
+_lock = threading.Lock()
+
+
+def rodada(nomes: Optional[List[str]] = None) -> Dict[str, Any]:
+    """Um ciclo de prefetch em todos os conectores (ou só em `nomes`). Falhas ficam isoladas."""
+    # import tardio: o boot da app não carrega pandas/pyarrow
+    from ..agents.sources import conectores
+
+    resultado: Dict[str, Any] = {}
+    for nome, conector in conectores.CONECTORES.items():
+        if nomes and nome not in nomes:
+            continue
+        chaves = conector.chaves_configuradas()
+        if not chaves:
+            resultado[nome] = {"status": "sem_chaves"}
+            continue
+        t0 = time.perf_counter()
+        try:
+            resultado[nome] = conector.prefetch(chaves)
+        except Exception as e:
+            resultado[nome] = {"status": "erro", "erro": str(e)}
+        resultado[nome]["duracao_ms"] = round((time.perf_counter() - t0) * 1000, 2)
+        print(f"[PREFETCH] {nome}: {resultado[nome]['status']} ({len(chaves)} chave(s)) "
+              f"em {resultado[nome]['duracao_ms']} ms")
+    return resultado
+
+
+def _laco(intervalo: float):
+    while not _parar.is_set():
+        try:
+            rodada()
+        except Exception as e:  # nunca derruba a thread
+            print(f"[PREFETCH] rodada falhou: {e}")
+        _parar.wait(intervalo)
+
+
+def iniciar(intervalo: float):
+    global _thread
+    with _lock:
+        if _thread is not None and _thread.is_alive():
+            return
+        _parar.clear()
+        _thread = threading.Thread(target=_laco, args=(intervalo,), name="prefetch", daemon=True)
+        _thread.start()
+    print(f"[PREFETCH] agendado a cada {intervalo:.0f}s")
+
+
+def parar(timeout: float = 5.0):
+    global _thread
+    with _lock:
+        t, _thread = _thread, None
+        _parar.set()
+    if t is not None:
+        t.join(timeout)
@@ -0,0 +1,99 @@
+# apps/backend_ia/orquestrador/test_agenda.py
+import os, sys, json, pytest
+from datetime import date
+from fastapi.testclient import TestClient
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from orquestrador.conftest import _payload_nft
+from orquestrador.main import app
+from orquestrador.services import agenda
+
+client = TestClient(app)
+
+
+def test_sobreposicao_janelas_e_liberacao(tmp_path):
+    store = agenda.AgendaStore(tmp_path / "a.json")
+    assert store.reservar("p1", "2025-10-05", "2025-10-08", "a") == []
+    assert store.reservar("p1", date(2025, 10, 12), date(2025, 10, 15), "b") == []
+    assert store.reservar("p1", "2025-10-05", "2025-10-08", "a") == []      # repetição da mesma emissão
+    assert store.reservar("p1", "2025-10-08", "2025-10-12", "c") == []      # check-out = check-in
+    assert store.reservar("p2", "2025-10-05", "2025-10-08", "d") == []      # outro imóvel
+
+    # cruza os três períodos de p1
+    assert store.reservar("p1", "2025-10-07", "2025-10-13", "x") == [
+        {"inicio": "2025-10-05", "fim": "2025-10-08"},
+        {"inicio": "2025-10-08", "fim": "2025-10-12"},
+        {"inicio": "2025-10-12", "fim": "2025-10-15"},
+    ]
+    assert store.livre("p1", "2025-10-01", "2025-10-05") and not store.livre("p1", "2025-10-14", "2025-10-20")
+    assert store.janelas("p1", "2025-10-01", "2025-10-31") == [
+        {"inicio": "2025-10-01", "fim": "2025-10-05", "noites": 4},
+        {"inicio": "2025-10-15", "fim": "2025-10-31", "noites": 16},
+    ]
+    assert store.janelas("p1", "2025-10-01", "2025-10-31", noites=5) == [
+        {"inicio": "2025-10-15", "fim": "2025-10-31", "noites": 16}]
+
+    assert store.liberar("p1", "2025-10-08", "2025-10-12", "outra") is False  # só a própria emissão libera
+    assert store.liberar("p1", "2025-10-08", "2025-10-12", "c") is True
+    assert store.janelas("p1", "2025-10-06", "2025-10-13") == [
+        {"inicio": "2025-10-08", "fim": "2025-10-12", "noites": 4}]
+    assert store.total() == {"imoveis": 2, "periodos": 3}
+    with pytest.raises(ValueError):
+        store.reservar("p1", "2025-11-02", "2025-11-02", "z")
+
+
+def test_persistencia_entre_processos_e_compactacao(tmp_path, monkeypatch):
+    arquivo = tmp_path / "a.json"
+    a, b = agenda.AgendaStore(arquivo), agenda.AgendaStore(arquivo)  # dois workers no mesmo arquivo
+    assert a.reservar("p1", "2025-10-01", "2025-10-03", "a") == []
+    assert b.reservar("p1", "2025-10-02", "2025-10-04", "b") == [{"inicio": "2025-10-01", "fim": "2025-10-03"}]
+
+    monkeypatch.setattr(agenda, "COMPACTAR_APOS", 10)
+    for dia in range(3, 30):
+        assert b.reservar(f"p{dia % 3}", date(2025, 11, dia), date(2025, 11, dia + 1), f"r{dia}") == []
+    snapshot = json.loads(arquivo.read_text())
+    assert sum(map(len, snapshot.values())) >= 10
+    assert all(p == sorted(p) for p in snapshot.values())
+
+    # o outro processo percebe o snapshot novo; uma carga do zero vê o mesmo estado
+    assert not a.livre("p0", "2025-11-03", "2025-11-04")
+    assert a.total() == b.total() == agenda.AgendaStore(arquivo).total() == {"imoveis": 3, "periodos": 28}
+
+
+def test_rota_recusa_periodo_emitido_e_lote_marca_indisponivel(monkeypatch):
+    from orquestrador.agents import nft
+
+    mints = []
+    monkeypatch.setattr(nft, "mint_nft", lambda wallet, uri, *reserva: mints.append(reserva) or
+                        {"txHash": f"0x{len(mints)}", "nftId": f"id{len(mints)}"})
+    monkeypatch.setattr(nft, "mint_lote", lambda itens: {"txHash": "0xL", "nftIds": ["L"] * len(itens)})
+
+    assert client.post("/api/nft", json=_payload_nft(5)).status_code == 200
+    # mesmo imóvel, outro hóspede no mesmo período: 409 sem upload nem mint
+    outro = {**_payload_nft(5), "wallet": "0xdef456"}
+    r = client.post("/api/nft", json=outro)
+    assert r.status_code == 409 and r.json()["detail"]["conflitos"] == [{"inicio": "2025-10-05", "fim": "2025-10-06"}]
+    assert len(mints) == 1
+
+    # falha no mint devolve o período à agenda
+    monkeypatch.setattr(nft, "mint_nft", lambda *a: (_ for _ in ()).throw(RuntimeError("rpc")))
+    assert client.post("/api/nft", json=_payload_nft(6)).status_code == 200  # agente devolve sucesso False
+    assert agenda.get_store().livre("prop123", "2025-10-06", "2025-10-07")
+
+    # lote: conflito com emissão anterior e entre itens do próprio lote
+    itens = [outro, _payload_nft(7), {**_payload_nft(7), "wallet": "0xdef456"}, _payload_nft(8)]
+    data = client.post("/api/nft/lote", json={"itens": itens}).json()["resultado"]
+    assert [i["status"] for i in data["itens"]] == ["indisponivel", "emitido", "indisponivel", "emitido"]
+    assert data["itens"][2]["conflitos"] == [{"inicio": "2025-10-07", "fim": "2025-10-08"}]
+
+    # tudoOuNada: um indisponível cancela o lote e libera o que já tinha reservado
+    itens = [_payload_nft(10), _payload_nft(11), outro]
+    data = client.post("/api/nft/lote", json={"itens": itens, "tudoOuNada": True}).json()["resultado"]
+    assert [i["status"] for i in data["itens"]] == ["cancelado", "cancelado", "indisponivel"]
+
+    disp = client.get("/api/nft/disponibilidade/prop123", params={"de": "2025-10-01", "ate": "2025-10-15", "noites": 2})
+    assert disp.status_code == 200
+    assert disp.json()["reservas"] == [{"inicio": f"2025-10-{d:02d}", "fim": f"2025-10-{d + 1:02d}"} for d in (5, 7, 8)]
+    assert disp.json()["janelas"] == [{"inicio": "2025-10-01", "fim": "2025-10-05", "noites": 4},
+                                      {"inicio": "2025-10-09", "fim": "2025-10-15", "noites": 6}]
+    assert client.get("/api/nft/disponibilidade/prop123", params={"de": "2025-10-05", "ate": "2025-10-05"}).status_code == 400
@@ -0,0 +1,103 @@
+# apps/backend_ia/orquestrador/test_campanha.py
+import os, sys, json, threading, pytest
+from fastapi.testclient import TestClient
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from orquestrador.main import app
+from orquestrador.routers import campanha
+from orquestrador.services.campanha_store import JsonLogStore, SQLiteStore
+
+client = TestClient(app)
+
+ITENS = [
+    {"id": 1, "Título": "Post A", "Responsável": "Ana", "Status": "Planejado"},
+    {"id": 2, "Título": "Post B", "Responsável": "Bia", "Status": "Aprovado"},
+    {"id": 3, "Título": "Post C", "Responsável": "Ana", "Status": "Planejado"},
+]
+
+
+@pytest.fixture
+def arquivo(tmp_path):
+    f = tmp_path / "campanha.json"
+    f.write_text(json.dumps(ITENS, ensure_ascii=False), encoding="utf-8")
+    return f
+
+
+@pytest.fixture
+def api(arquivo, monkeypatch):
+    monkeypatch.setattr(campanha, "FILE", arquivo)
+    return client
+
+
+def test_stats_e_put_atualizam_contadores(api):
+    assert api.get("/api/campanha/stats").json() == {
+        "total": 3, "planejado": 2, "emProducao": 0, "aprovado": 1, "publicado": 0,
+    }
+    assert api.put("/api/campanha/1", json={"Status": "Publicado"}).json() == {"success": True}
+    assert api.put("/api/campanha/99", json={"Status": "Publicado"}).status_code == 404
+    assert api.put("/api/campanha/1", json={"Status": "Outro"}).status_code == 422
+
+    stats = api.get("/api/campanha/stats").json()
+    assert stats["planejado"] == 1 and stats["publicado"] == 1
+    itens = api.get("/api/campanha").json()
+    assert [i["Status"] for i in itens] == ["Publicado", "Aprovado", "Planejado"]
+    assert itens[0]["Responsável"] == "Ana"
+
+
+@pytest.mark.parametrize("backend", ["json", "sqlite"])
+def test_store_sobrevive_reabertura_e_escritas_concorrentes(arquivo, backend):
+    def abrir():
+        return JsonLogStore(arquivo) if backend == "json" else SQLiteStore(arquivo.with_suffix(".sqlite3"), snapshot=arquivo)
+
+    store = abrir()
+    outro = abrir()  # simula um segundo worker
+    status = ["Planejado", "Em produção", "Aprovado", "Publicado"]
+
+    def escreve(i):
+        for n in range(50):
+            (store if i % 2 else outro).atualizar_status(str(i), status[n % 4])
+
+    ts = [threading.Thread(target=escreve, args=(i,)) for i in (1, 2, 3)]
+    for t in ts: t.start()
+    for t in ts: t.join()
+
+    final = {"1": "Em produção", "2": "Em produção", "3": "Em produção"}  # 49 % 4 == 1
+    for s in (store, outro, abrir()):
+        assert {str(i["id"]): i["Status"] for i in s.listar()} == final
+        assert s.contagem("Em produção") == 3 and s.total() == 3
+
+
+def test_json_store_compacta_log(arquivo, monkeypatch):
+    from orquestrador.services import campanha_store
+
+    monkeypatch.setattr(campanha_store, "COMPACTAR_APOS", 5)
+    store = JsonLogStore(arquivo)
+    for n in range(12):
+        store.atualizar_status("2", "Publicado" if n % 2 else "Planejado")
+    # log zerado a cada 5 escritas; snapshot reflete o estado compactado
+    assert store.log.read_text().count("\n") == 2
+    assert JsonLogStore(arquivo).obter("2")["Status"] == "Publicado"
+
+
+def test_listagem_paginada_filtrada_com_etag(api):
+    r = api.get("/api/campanha", params={"limit": 2})
+    assert [i["id"] for i in r.json()] == [1, 2]
+    assert r.headers["X-Total-Count"] == "3"
+    r2 = api.get("/api/campanha", params={"limit": 2, "cursor": r.headers["X-Next-Cursor"]})
+    assert [i["id"] for i in r2.json()] == [3] and "X-Next-Cursor" not in r2.headers
+
+    r = api.get("/api/campanha", params={"Responsável": "Ana", "Status": "Planejado", "limit": 1})
+    assert [i["id"] for i in r.json()] == [1]
+    r = api.get("/api/campanha", params={"Responsável": "Ana", "Status": "Planejado", "cursor": r.headers["X-Next-Cursor"]})
+    assert [i["id"] for i in r.json()] == [3]
+    assert api.get("/api/campanha", params={"cursor": "lixo"}).status_code == 400
+
+    etag = api.get("/api/campanha").headers["ETag"]
+    assert api.get("/api/campanha", headers={"If-None-Match": etag}).status_code == 304
+    etag_stats = api.get("/api/campanha/stats").headers["ETag"]
+    assert api.get("/api/campanha/stats", headers={"If-None-Match": etag_stats}).status_code == 304
+
+    api.put("/api/campanha/2", json={"Status": "Planejado"})
+    r = api.get("/api/campanha", headers={"If-None-Match": etag})
+    assert r.status_code == 200 and r.headers["ETag"] != etag
+    assert api.get("/api/campanha/stats", headers={"If-None-Match": etag_stats}).json()["planejado"] == 3
@@ -0,0 +1,323 @@
+# apps/backend_ia/orquestrador/test_chain.py
+import os, sys, json, threading, pytest
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from orquestrador.utils import abi, blockchain, chain
+
+CONTA = "0xf39fd6e51aad88f6f4ce6ab8827279cfffb92266"
+CONTRATO = "0x5fbdb2315678afecb367f032d93f642f64180aa3"
+GUEST = "0x90f79bf6eb2c4f870365e785982e1f101e93b906"
+
+
+class _NoRPC(BaseHTTPRequestHandler):
+    """Stand-in do nó de desenvolvimento: contas desbloqueadas, lotes JSON-RPC e mineração no polling."""
+    protocol_version = "HTTP/1.1"
+    lock = threading.Lock()
+
+    @classmethod
+    def zerar(cls):
+        cls.requisicoes = []   # lista de métodos por requisição HTTP
+        cls.nonces = []        # nonces aceitos, na ordem de chegada
+        cls.externas = set()   # nonces da mesma conta usados "por outro processo"
+        cls.txs = {}           # hash -> tx
+        cls.blocos = [[]]      # uma transação por bloco (bloco 0 vazio)
+        cls.recibos = {}       # hash -> recibo (minerado)
+        cls.tokens = 0
+        cls.reservas = {}      # imovelId -> reservas mineradas (cada uma encarece o isAvailable)
+        cls.perder = 0         # próximos eth_sendTransaction aceitos cuja resposta "se perde"
+        cls.minerar = True     # False: recibos nunca chegam
+
+    @classmethod
+    def externos(cls, n):
+        """Outro processo envia n transações pela mesma conta."""
+        for _ in range(n):
+            nonce = len(cls.nonces) + len(cls.externas)
+            cls.externas.add(nonce)
+            cls.blocos.append([{"from": CONTA, "to": CONTRATO, "nonce": hex(nonce), "input": "0x",
+                                "hash": "0x%064x" % (10 ** 6 + nonce)}])
+
+    def _uma(self, req):
+        m, p = req["method"], req.get("params") or []
+        if m == "eth_accounts":
+            return [CONTA]
+        if m == "eth_getTransactionCount":
+            return hex(len(self.nonces) + len(self.externas))
+        if m == "eth_blockNumber":
+            return hex(len(self.blocos) - 1)
+        if m == "eth_getBlockByNumber":
+            return {"transactions": [] if p[0] == "pending" else self.blocos[int(p[0], 16)]}
+        if m == "eth_estimateGas":
+            gas = self._gas(self._itens(p[0]["data"]))
+            if gas > 1000000:
+                raise ValueError("gas required exceeds allowance (1000000)")
+            return hex(gas)
+        if m == "eth_sendTransaction":
+            tx = p[0]
+            nonce = int(tx["nonce"], 16)
+            if nonce in self.nonces or nonce in self.externas:
+                raise ValueError(f"Nonce too low. Expected nonce to be {len(self.nonces) + len(self.externas)}")
+            self.nonces.append(nonce)
+            h = "0x%064x" % (len(self.txs) + 1)
+            self.txs[h] = tx
+            self.blocos.append([{**tx, "input": tx["data"], "hash": h}])
+            return h
+        if m == "eth_getTransactionReceipt":
+            h = p[0]
+            if h not in self.recibos and h in self.txs and self.minerar:
+                # minera na primeira consulta: devolve null e o recibo fica para a próxima
+                itens = self._itens(self.txs[h]["data"])
+                gas = int(self.txs[h]["gas"], 16)
+                if gas < self._gas(itens):  # estimativa velha: reverte consumindo todo o gas
+                    self.recibos[h] = {"transactionHash": h, "status": "0x0", "gasUsed": hex(gas), "logs": []}
+                    return None
+                usado = self._gas(itens)
+                logs = []
+                for imovel, guest, *_ in itens:
+                    type(self).tokens += 1
+                    logs.append({"address": CONTRATO, "topics": [
+                        blockchain.EVENTO_MINT, "0x%064x" % self.tokens, "0x%064x" % imovel, "0x" + guest[2:].zfill(64)]})
+                revertida = any(guest == "0x" + "0" * 39 + "1" for _, guest, *_ in itens)
+                if not revertida:
+                    for imovel, *_ in itens:
+                        self.reservas[imovel] = self.reservas.get(imovel, 0) + 1
+                self.recibos[h] = {"transactionHash": h, "status": "0x0" if revertida else "0x1",
+                                   "gasUsed": hex(usado), "logs": [] if revertida else logs}
+                return None
+            return self.recibos.get(h)
+        raise ValueError(f"método desconhecido {m}")
+
+    @classmethod
+    def _gas(cls, itens):
+        # 100k por transação e por mint + ~8k por reserva já existente do imóvel
+        return 100000 * (1 + len(itens)) + sum(8000 * cls.reservas.get(imovel, 0) for imovel, *_ in itens)
+
+    @staticmethod
+    def _itens(data):
+        if data.startswith("0x" + abi.seletor(blockchain.MINT_RESERVA_LOTE).hex()):
+            return list(zip(*abi.decodificar_chamada(blockchain.MINT_RESERVA_LOTE, data)))
+        return [tuple(abi.decodificar_chamada(blockchain.MINT_RESERVA, data))]
+
+    def _responder(self, req):
+        try:
+            return {"jsonrpc": "2.0", "id": req["id"], "result": self._uma(req)}
+        except ValueError as e:
+            return {"jsonrpc": "2.0", "id": req["id"], "error": {"code": -32000, "message": str(e)}}
+
+    def do_POST(self):
+        corpo = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        with self.lock:
+            lote = corpo if isinstance(corpo, list) else [corpo]
+            type(self).requisicoes.append([r["method"] for r in lote])
+            saida = [self._responder(r) for r in lote]
+            if self.perder and lote[0]["method"] == "eth_sendTransaction":
+                type(self).perder -= 1
+                self.close_connection = True  # aceita a transação e cai antes de responder
+                return
+        dados = json.dumps(saida if isinstance(corpo, list) else saida[0]).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(dados)))
+        self.end_headers()
+        self.wfile.write(dados)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def no_rpc(monkeypatch):
+    _NoRPC.zerar()
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), _NoRPC)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    monkeypatch.setenv("EIAH_RPC_URL", f"http://127.0.0.1:{srv.server_address[1]}")
+    monkeypatch.setenv("EIAH_NFT_CONTRATO", CONTRATO)
+    monkeypatch.setenv("EIAH_CHAIN_RECIBO_SEC", "0.05")
+    monkeypatch.setenv("EIAH_CHAIN_TIMEOUT", "10")
+    yield _NoRPC
+    chain.encerrar()
+    srv.shutdown()
+
+
+def test_keccak_seletores_e_codificacao_abi():
+    assert abi.keccak256(b"").hex() == "c5d2460186f7233c927e7db2dcc703c0e500b653ca82273b7bfad8045d85a470"
+    assert abi.seletor("transfer(address,uint256)").hex() == "a9059cbb"
+    assert abi.topico("Transfer(address,address,uint256)") == \
+        "0xddf252ad1be2c89b69c2b068fc378daa952ba7f163c4a11628f55a4df523b3ef"
+    # exemplo da especificação ABI do Solidity
+    data = abi.chamada("f(uint256,uint32[],bytes10,bytes)", 0x123, [0x456, 0x789], b"1234567890", b"Hello, world!")
+    palavras = [data[10 + 64 * i:10 + 64 * (i + 1)] for i in range(9)]
+    assert data[:10] == "0x8be65246"
+    assert [int(p, 16) for p in (palavras[0], palavras[1], palavras[3], palavras[4], palavras[7])] == \
+        [0x123, 0x80, 0xe0, 2, 13]
+    with pytest.raises(ValueError):
+        abi.codificar(["uint8"], [256])
+
+
+def test_mints_concorrentes_nonce_local_gas_em_cache_e_recibos_em_lote(no_rpc):
+    saidas, erros = [], []
+
+    def mint(dia):
+        try:
+            saidas.append(blockchain.mint_nft(GUEST, f"ipfs://meta{dia}", f"prop{dia}",
+                                              f"2025-10-{dia:02d}", f"2025-10-{dia + 1:02d}"))
+        except Exception as e:
+            erros.append(e)
+
+    threads = [threading.Thread(target=mint, args=(d,)) for d in range(1, 13)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert erros == []
+    assert sorted(no_rpc.nonces) == list(range(12))                      # sem nonce repetido nem lacuna
+    metodos = [m for req in no_rpc.requisicoes for m in req]
+    assert metodos.count("eth_getTransactionCount") == 1                 # nonce lido uma vez só
+    assert metodos.count("eth_estimateGas") == 12                        # uma por calldata
+    assert max(req.count("eth_getTransactionReceipt") for req in no_rpc.requisicoes) > 1  # polling em lote
+    assert sorted(int(s["nftId"]) for s in saidas) == list(range(1, 13))
+
+    tx = next(iter(no_rpc.txs.values()))
+    assert tx["from"] == CONTA and tx["to"] == CONTRATO and int(tx["gas"], 16) == 240000
+    imovel, guest, inicio, fim, uri = abi.decodificar_chamada(blockchain.MINT_RESERVA, tx["data"])
+    assert imovel == blockchain.imovel_id(f"prop{uri[len('ipfs://meta'):]}") and guest == GUEST
+    assert fim - inicio == 86400 and uri.startswith("ipfs://meta")
+
+
+def test_nonce_ressincroniza_lote_e_revert(no_rpc):
+    assert blockchain.mint_nft(GUEST, "ipfs://a", 7, "2025-11-01", "2025-11-03")["nftId"] == "1"
+
+    # outro processo usou a mesma conta: o nonce local (1) fica velho -> relê do nó e reenvia
+    no_rpc.externos(5)
+    r = blockchain.mint_nft(GUEST, "ipfs://b", 7, "2025-11-03", "2025-11-05")
+    assert no_rpc.nonces[-1] == 6 and r["nftId"] == "2"
+
+    with pytest.raises(chain.TransacaoRevertida):
+        blockchain.mint_nft("0x" + "0" * 39 + "1", "ipfs://c", 7, "2025-11-05", "2025-11-06")
+
+
+def test_sem_rpc_segue_simulado(monkeypatch):
+    monkeypatch.delenv("EIAH_RPC_URL", raising=False)
+    r = blockchain.mint_lote([("0xabc", "ipfs://x")] * 2)
+    assert len(r["nftIds"]) == 2 and r["txHashes"] == [r["txHash"]] * 2
+
+
+def test_mint_em_lote_divide_pelo_gas_e_mapeia_ids_pelos_eventos(no_rpc, monkeypatch):
+    monkeypatch.setattr(blockchain, "GAS_MAX_TX", 500000)
+    # um imóvel por item: o custo não muda entre a estimativa e a mineração dos blocos
+    itens = [(GUEST, f"ipfs://dia{d}", f"prop{d}", f"2025-12-{d:02d}", f"2025-12-{d + 1:02d}") for d in range(1, 11)]
+    r = blockchain.mint_lote(itens)
+
+    # 10 itens: o nó recusa a estimativa (> bloco) -> 5 + 5 -> cada 5 (720k) vira 2 (360k) + 3 (480k)
+    lotes = [no_rpc._itens(tx["data"]) for tx in no_rpc.txs.values()]
+    assert [len(l) for l in lotes] == [2, 3, 2, 3]
+    assert [uri for l in lotes for *_, uri in l] == [f"ipfs://dia{d}" for d in range(1, 11)]  # URI por token
+    assert no_rpc.nonces == [0, 1, 2, 3]
+    assert r["nftIds"] == [str(t) for t in range(1, 11)]
+    assert r["txHashes"] == [h for h, l in zip(no_rpc.txs, lotes) for _ in l]
+
+    # evento que não bate com o item (outro guest) é erro, não id trocado
+    original = no_rpc._itens
+    monkeypatch.setattr(_NoRPC, "_itens", staticmethod(
+        lambda data: [(i, CONTA, *resto) for i, _, *resto in original(data)]))
+    r = blockchain.mint_lote(itens[:2])
+    assert r["nftIds"] == [None, None] and r["blocos"][0]["status"] == "pendente"   # minerada: não é "erro"
+    assert "não corresponde" in r["blocos"][0]["erro"]
+
+
+def test_resposta_perdida_no_envio_nao_minta_de_novo(no_rpc):
+    # o nó aceita a transação e a conexão cai antes da resposta: confere pelo nonce, sem reenviar
+    no_rpc.perder = 1
+    r = blockchain.mint_nft(GUEST, "ipfs://a", 7, "2025-11-01", "2025-11-03")
+    assert len(no_rpc.txs) == 1 and no_rpc.nonces == [0]
+    assert r == {"txHash": next(iter(no_rpc.txs)), "nftId": "1"}
+    metodos = [m for req in no_rpc.requisicoes for m in req]
+    assert metodos.count("eth_sendTransaction") == 1 and "eth_getBlockByNumber" in metodos
+
+    # nonce já usado por outro processo (contador local velho): relê e reenvia
+    no_rpc.externos(3)
+    blockchain.mint_nft(GUEST, "ipfs://b", 7, "2025-11-03", "2025-11-05")
+    assert no_rpc.nonces == [0, 4]
+
+
+def test_recibo_atrasado_fica_pendente_e_segura_a_emissao(no_rpc, monkeypatch):
+    from orquestrador.agents import nft
+    from orquestrador.conftest import _payload_nft
+    from orquestrador.services import agenda
+
+    monkeypatch.setenv("EIAH_CHAIN_TIMEOUT", "0.3")
+    no_rpc.minerar = False
+
+    with pytest.raises(chain.TransacaoPendente) as e:
+        blockchain.mint_nft(GUEST, "ipfs://a", 7, "2025-11-01", "2025-11-03")
+    assert e.value.tx_hashes == list(no_rpc.txs) and isinstance(e.value, TimeoutError)
+
+    r = nft.executar({**_payload_nft(3), "wallet": GUEST})
+    assert r["sucesso"] is False and r["pendente"] is True
+    assert r["resultado"]["txHash"] == list(no_rpc.txs)[-1] and r["resultado"]["idNFT"] is None
+    assert not agenda.get_store().livre("prop123", "2025-10-03", "2025-10-04")   # período segue reservado
+    assert nft.executar({**_payload_nft(3), "wallet": GUEST})["resultado"]["idempotencia"]["reutilizado"] is True
+    assert len(no_rpc.txs) == 2                                                   # repetição sem novo mint
+
+
+def test_lote_dividido_revert_no_segundo_bloco_preserva_o_primeiro(no_rpc, monkeypatch):
+    from orquestrador.agents import nft
+    from orquestrador.conftest import _payload_nft
+    from orquestrador.services import agenda
+
+    monkeypatch.setattr(blockchain, "GAS_MAX_TX", 500000)
+    revert = "0x" + "0" * 39 + "1"
+
+    # 6 itens (700k) -> 3 + 3; o guest do 5º item faz a 2ª transação reverter
+    itens = [(revert if d == 5 else GUEST, f"ipfs://dia{d}", "prop9", f"2025-12-{d:02d}", f"2025-12-{d + 1:02d}")
+             for d in range(1, 7)]
+    r = blockchain.mint_lote(itens)
+    hashes = list(no_rpc.txs)
+    assert [b["status"] for b in r["blocos"]] == ["minerado", "revertido"]
+    assert r["nftIds"][:3] == ["1", "2", "3"] and r["nftIds"][3:] == [None] * 3
+    assert r["txHashes"] == [hashes[0]] * 3 + [hashes[1]] * 3
+
+    # no agente: só os itens do bloco revertido saem com erro e liberam chave e período
+    lote = [{**_payload_nft(d), "wallet": revert if d == 5 else GUEST} for d in range(1, 7)]
+    data = nft.executar_lote({"itens": lote})
+    assert [i["status"] for i in data["resultado"]["itens"]] == ["emitido"] * 3 + ["erro"] * 3
+    assert [t["status"] for t in data["resultado"]["transacoes"]] == ["minerado", "revertido"]
+    store = agenda.get_store()
+    assert not store.livre("prop123", "2025-10-01", "2025-10-04") and store.livre("prop123", "2025-10-04", "2025-10-07")
+    assert nft.executar_lote({"itens": lote[:3]})["resultado"]["itens"][0]["reutilizado"] is True
+
+
+def test_estimativa_velha_reverte_por_gas_e_reenvia_com_gas_novo(no_rpc, monkeypatch):
+    cli = chain.cliente()
+    item = (GUEST, "ipfs://x", "prop1", "2025-10-20", "2025-10-21")
+    data = blockchain._calldata_mint(*item)
+    assert cli.estimar_gas(CONTRATO, data) == 240000                  # imóvel ainda sem reservas
+    assert cli.estimar_gas(CONTRATO, data) == 240000 and \
+        [m for req in no_rpc.requisicoes for m in req].count("eth_estimateGas") == 1
+
+    # seis diárias mintadas depois: o mesmo mint agora custa 248k (cada uma com estimativa própria)
+    for d in range(1, 7):
+        blockchain.mint_nft(GUEST, f"ipfs://d{d}", "prop1", f"2025-10-{d:02d}", f"2025-10-{d + 1:02d}")
+    assert len(no_rpc.txs) == 6 and all(r["status"] == "0x1" for r in no_rpc.recibos.values())
+
+    # a estimativa do cache reverte por gas: é descartada e a transação sai uma vez de novo
+    r = blockchain.mint_nft(*item)
+    revertida, nova = list(no_rpc.txs)[-2:]
+    assert no_rpc.recibos[revertida]["status"] == "0x0" and r["txHash"] == nova
+    assert int(no_rpc.txs[nova]["gas"], 16) == int((200000 + 6 * 8000) * chain.GAS_MARGEM) and r["nftId"] == "7"
+
+    # lote: a estimativa do bloco fica velha entre estimar e minerar – mesmo reenvio
+    lote = [(GUEST, f"ipfs://l{d}", "prop1", f"2025-11-{d:02d}", f"2025-11-{d + 1:02d}") for d in (1, 2)]
+    cli.estimar_gas(CONTRATO, blockchain._calldata_lote([blockchain._args_mint(*i) for i in lote]))
+    for d in range(10, 20):
+        blockchain.mint_nft(GUEST, f"ipfs://y{d}", "prop1", f"2025-11-{d:02d}", f"2025-11-{d + 1:02d}")
+    r = blockchain.mint_lote(lote)
+    assert r["blocos"][0]["status"] == "minerado" and None not in r["nftIds"]
+    assert no_rpc.recibos[list(no_rpc.txs)[-2]]["status"] == "0x0"
+
+    # revert do contrato (não por gas) não gera reenvio
+    antes = len(no_rpc.txs)
+    with pytest.raises(chain.TransacaoRevertida):
+        blockchain.mint_nft("0x" + "0" * 39 + "1", "ipfs://w", "prop1", "2025-12-01", "2025-12-02")
+    assert len(no_rpc.txs) == antes + 1
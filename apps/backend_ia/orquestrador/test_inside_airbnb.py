@@ -0,0 +1,473 @@
+# apps/backend_ia/orquestrador/test_inside_airbnb.py
+import os, sys, gzip, threading, pytest
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from orquestrador.agents.sources import inside_airbnb, cache_colunar, catalogo, conectores, serie_historica
+from orquestrador.utils import arquivos, http
+
+CSV = (
+    "id,name,room_type,price,availability_365,minimum_nights,last_review,latitude,longitude\n"
+    '1,"Casa, praia",Entire home/apt,"$300",65,2,2024-01-10,-27.59,-48.54\n'
+    "2,Apto,Private room,$150,300,1,2024-01-20,-27.60,-48.55\n"
+    "3,Loft,Entire home/apt,$450,,3,2024-02-05,-27.61,-48.50\n"
+    "4,Quarto,Private room,,200,,,-27.58,-48.52\n"
+).encode("utf-8")
+
+
+class _Servidor(BaseHTTPRequestHandler):
+    """Servidor de fixture: entrega arquivos de `arquivos` com ETag e responde 304."""
+    protocol_version = "HTTP/1.1"  # keep-alive, para exercitar o pool do cliente
+    arquivos = {}
+    requisicoes = []
+    falhas = {}  # path -> nº de 503 antes de responder
+
+    def do_GET(self):
+        type(self).requisicoes.append((self.path, self.headers.get("If-None-Match")))
+        if self.falhas.get(self.path):
+            self.falhas[self.path] -= 1
+            self.send_response(503); self.send_header("Retry-After", "0")
+            self.send_header("Content-Length", "0"); self.end_headers(); return
+        corpo = self.arquivos.get(self.path)
+        if corpo is None:
+            self.send_response(404); self.send_header("Content-Length", "0"); self.end_headers(); return
+        etag = f'"{hash(corpo) & 0xffffffff:x}"'
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304); self.send_header("ETag", etag)
+            self.send_header("Content-Length", "0"); self.end_headers(); return
+        self.send_response(200)
+        self.send_header("ETag", etag)
+        self.send_header("Content-Length", str(len(corpo)))
+        self.end_headers()
+        self.wfile.write(corpo)
+
+    def log_message(self, *args):
+        pass
+
+
+def _definir_catalogo(monkeypatch, pasta, cidades):
+    import json
+    arq = pasta / "catalogo.json"
+    arq.write_text(json.dumps({"padrao": {"max_age_sec": 86400}, "cidades": cidades}), encoding="utf-8")
+    monkeypatch.setattr(catalogo, "ARQUIVO", arq)
+    catalogo.recarregar()
+
+
+@pytest.fixture
+def cidades(dirs, monkeypatch):
+    """cidades(Nome=url | {...entrada do catálogo...}) reescreve o catálogo do teste."""
+    def _cidades(**entradas):
+        _definir_catalogo(monkeypatch, dirs[1], {
+            c: (e if isinstance(e, dict) else {"url": e}) for c, e in entradas.items()})
+    return _cidades
+
+
+@pytest.fixture
+def servidor():
+    _Servidor.arquivos = {"/listings.csv": CSV, "/listings.csv.gz": gzip.compress(CSV)}
+    _Servidor.requisicoes = []
+    _Servidor.falhas = {}
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), _Servidor)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{srv.server_address[1]}"
+    srv.shutdown()
+
+
+@pytest.fixture(autouse=True)
+def dirs(tmp_path, monkeypatch):
+    raw, proc = tmp_path / "raw", tmp_path / "processed"
+    raw.mkdir(); proc.mkdir()
+    monkeypatch.setattr(cache_colunar, "RAW_DIR", raw)
+    monkeypatch.setattr(cache_colunar, "PROCESSED_DIR", proc)
+    monkeypatch.setattr(cache_colunar, "MANIFESTO", proc / "inside_manifest.json")
+    monkeypatch.setattr(serie_historica, "DIR", proc / "serie")
+    monkeypatch.setattr(conectores, "DIR", proc / "fontes")
+    _definir_catalogo(monkeypatch, proc, {})
+    # processos filhos não enxergam os monkeypatches -> cálculo em thread
+    monkeypatch.setenv("EIAH_CPU_WORKERS", "0")
+    return raw, proc
+
+
+@pytest.mark.parametrize("arquivo", ["/listings.csv", "/listings.csv.gz"])
+def test_metricas_de_cidade(servidor, arquivo):
+    m = inside_airbnb.compute_metrics_for_city("Florianopolis", servidor + arquivo)
+    assert m["fonte"] == "InsideAirbnb"
+    assert m["ticket_medio"] == 300.0
+    assert m["ocupacao_media"] == round(1 - (565 / 3) / 365, 4)
+    assert m["duracao_media"] == 2.0
+    assert m["sazonalidade"][0] == "jan"
+    assert m["tipos_imovel"] == ["Entire home/apt", "Private room"]
+
+
+def test_cache_colunar_quente_nao_reparseia(servidor, monkeypatch):
+    url = servidor + "/listings.csv"
+    cache_colunar.carregar_tabela(url)
+    entrada = cache_colunar.ler_manifesto()[cache_colunar.url_hash(url)]
+    assert entrada["linhas"] == 4 and "price" in entrada["colunas"]
+
+    def _falha(*a, **k):
+        raise AssertionError("não deveria reparsear o CSV")
+
+    monkeypatch.setattr(cache_colunar, "_processar", _falha)
+    df = cache_colunar.carregar_tabela(url, colunas=["price", "room_type"])
+    assert list(df.columns) == ["price", "room_type"]
+    assert len(_Servidor.requisicoes) == 1
+
+    # cache vencido -> GET condicional -> 304, sem reprocessar
+    df = cache_colunar.carregar_tabela(url, max_age_sec=0, colunas=["price"])
+    assert _Servidor.requisicoes[-1][1] is not None
+    assert df["price"].max() == 450.0
+
+
+def test_ingestao_em_blocos(servidor, monkeypatch):
+    # blocos de ~2 linhas: agregados e Arrow precisam bater com o parse de uma vez
+    monkeypatch.setattr(cache_colunar, "BLOCO_BYTES", 128)
+    monkeypatch.setattr(cache_colunar, "CHUNK_BYTES", 7)
+    url = servidor + "/listings.csv.gz"
+    m = inside_airbnb.compute_metrics_for_city("Florianopolis", url)
+    assert m["ticket_medio"] == 300.0 and m["duracao_media"] == 2.0
+    assert m["tipos_imovel"] == ["Entire home/apt", "Private room"]
+
+    entrada = cache_colunar.ler_manifesto()[cache_colunar.url_hash(url)]
+    assert entrada["linhas"] == 4 and entrada["bytes"] == len(_Servidor.arquivos["/listings.csv.gz"])
+    df = cache_colunar.carregar_tabela(url)
+    assert len(df) == 4 and str(df["last_review"].dtype).startswith("datetime64")
+    assert df["room_type"].tolist()[:2] == ["Entire home/apt", "Private room"]
+
+
+def test_kernels_de_tipagem():
+    import pyarrow as pa
+    preco = cache_colunar._normalize_price(pa.array(["R$ 1.234,56", "$300", "abc", None, "", " 12 "]))
+    assert preco.to_pylist() == [1234.56, 300.0, None, None, None, 12.0]
+    assert cache_colunar._para_float(pa.array(["65", " 3.5 ", "1e2", "x", None])).to_pylist() == [65.0, 3.5, 100.0, None, None]
+
+
+def test_get_city_metrics_materializa_por_versao(servidor, cidades, monkeypatch):
+    from orquestrador.agents.sources import metricas_store
+
+    monkeypatch.setattr(metricas_store, "_mem", None)
+    cidades(Teste=servidor + "/listings.csv")
+    calculos = []
+    original = inside_airbnb.compute_metrics_for_city
+
+    def contando(cidade, url, *a):
+        calculos.append(cidade)
+        return original(cidade, url, *a)
+
+    monkeypatch.setattr(inside_airbnb, "compute_metrics_for_city", contando)
+    primeira = inside_airbnb.get_city_metrics(["Teste"])["Teste"]
+    assert inside_airbnb.get_city_metrics(["Teste"])["Teste"] == primeira
+    assert calculos == ["Teste"]
+
+    # TTL e bruto vencidos, servidor responde 304 -> mesma versão, não recalcula
+    monkeypatch.setattr(metricas_store, "TTL_SEC", 0)
+    cidades(Teste={"url": servidor + "/listings.csv", "max_age_sec": 0})  # política do catálogo
+    inside_airbnb.get_city_metrics(["Teste"])
+    assert calculos == ["Teste"] and _Servidor.requisicoes[-1][1] is not None
+
+    # dataset mudou -> recalcula
+    _Servidor.arquivos["/listings.csv"] = CSV.replace(b"$450", b"$600")
+    assert inside_airbnb.get_city_metrics(["Teste"])["Teste"]["ticket_medio"] == 350.0
+    assert calculos == ["Teste", "Teste"]
+
+
+def test_calcular_cidades_paralelo_isola_erros(servidor, cidades, monkeypatch):
+    from orquestrador.agents.sources import metricas_store
+
+    monkeypatch.setattr(metricas_store, "_mem", None)
+    cidades(A=servidor + "/listings.csv", B=servidor + "/listings.csv.gz", Quebrada=servidor + "/nao-existe.csv")
+    eventos = []
+
+    metricas, rel = inside_airbnb.calcular_cidades(
+        ["A", "B", "Quebrada", "Sem Dataset"], workers=3,
+        progresso=lambda c, feitas, total, r: eventos.append((c, feitas, total)),
+    )
+    assert list(metricas) == ["A", "B", "Quebrada", "Sem Dataset"]
+    assert metricas["A"]["ticket_medio"] == metricas["B"]["ticket_medio"] == 300.0
+    assert "erro" in metricas["Quebrada"] and rel["Quebrada"]["status"] == "erro"
+    assert rel["A"]["origem"] == "calculo" and rel["A"]["total_ms"] >= rel["A"]["calculo_ms"]
+    assert sorted(e[1] for e in eventos) == [1, 2, 3, 4] and all(e[2] == 4 for e in eventos)
+
+    _, rel = inside_airbnb.calcular_cidades(["A", "B"])
+    assert rel["A"]["origem"] == rel["B"]["origem"] == "memoria"
+
+
+def test_serie_historica_intervalo_e_compactacao(monkeypatch):
+    from datetime import datetime, timezone
+    monkeypatch.setattr(serie_historica, "COMPACTAR_APOS", 3)
+    for mes, dia, ticket in [(1, 5, 100.0), (1, 20, 200.0), (2, 3, 300.0), (3, 1, 400.0), (1, 25, 150.0)]:
+        ts = datetime(2025, mes, dia, tzinfo=timezone.utc)
+        serie_historica.registrar({"São José": {"ticket_medio": ticket, "sazonalidade": ["jan", "fev"]},
+                                   "Vazia": {"ticket_medio": None}}, "inside_airbnb", ts=ts)
+    part_jan = serie_historica._particao("São José", "2025-01")
+    assert len(list(part_jan.glob("*.parquet"))) == 3
+    assert not serie_historica._particao("Vazia", "2025-01").exists()
+
+    df = serie_historica.consultar("São José", datetime(2025, 1, 10), datetime(2025, 3, 1))
+    assert df["ticket_medio"].tolist() == [200.0, 150.0, 300.0]
+
+    serie_historica.compactar()
+    assert [p.name.split("-")[0] for p in part_jan.glob("*.parquet")] == ["compacto"]
+    pontos = serie_historica.tendencia("São José")
+    assert [(p["mes"], p["snapshots"], p["ticket_medio"]) for p in pontos] == [
+        ("2025-01", 3, 150.0), ("2025-02", 1, 300.0), ("2025-03", 1, 400.0)]
+    assert pontos[0]["sazonalidade"] == ["jan", "fev"]
+
+    from fastapi.testclient import TestClient
+    from orquestrador.main import app
+    r = TestClient(app).get("/api/consultor-mercado/historico",
+                            params={"cidade": "São José", "inicio": "2025-02-01T00:00:00Z"})
+    assert r.status_code == 200
+    assert [p["mes"] for p in r.json()["resultado"]["tendencia"]] == ["2025-02", "2025-03"]
+
+
+def test_calcular_cidades_grava_serie_so_quando_recalcula(servidor, cidades, monkeypatch):
+    from orquestrador.agents.sources import metricas_store
+
+    monkeypatch.setattr(metricas_store, "_mem", None)
+    cidades(Teste=servidor + "/listings.csv")
+    inside_airbnb.get_city_metrics(["Teste"])
+    inside_airbnb.get_city_metrics(["Teste"])  # memória -> não grava de novo
+    df = serie_historica.consultar("Teste")
+    assert len(df) == 1 and df["ticket_medio"][0] == 300.0 and df["versao"][0].endswith(f":{cache_colunar.VERSAO_SCHEMA}")
+
+
+def test_consultor_usa_metricas_reais_e_memoriza(servidor, cidades, monkeypatch):
+    from orquestrador.agents import consultor_mercado
+    from orquestrador.agents.sources import metricas_store
+
+    monkeypatch.setattr(metricas_store, "_mem", None)
+    cidades(Teste=servidor + "/listings.csv")
+    consultor_mercado.limpar_memo()
+    chamadas = []
+    original = inside_airbnb.get_city_metrics
+    monkeypatch.setattr(inside_airbnb, "get_city_metrics", lambda c: chamadas.append(c) or original(c))
+
+    dados = {"cidades": ["Teste"], "incluir_solidity": False}
+    r1 = consultor_mercado.executar(dados)["resultado"]
+    assert "| Airbnb | Web2 | 300.0 |" in r1["comparativo_markdown"]
+    assert r1["insights_pendentes"]["tem_dados_reais?"] and r1["contrato_solidity"] == ""
+    assert r1["contratos_texto"] == consultor_mercado.CLAUSULAS_TEXTO
+
+    r1["sugestoes"].clear()  # resposta devolvida é cópia: não contamina o memo
+    r2 = consultor_mercado.executar(dados)["resultado"]
+    assert r2["sugestoes"] and r2["timestamp"] == r1["timestamp"]
+    assert chamadas == [["Teste"]]
+
+    consultor_mercado.executar({**dados, "incluir_solidity": True})  # flags fazem parte da chave
+    assert len(chamadas) == 2
+    consultor_mercado.limpar_memo()
+
+
+def test_cliente_http_pool_retry_condicional_e_taxa(servidor):
+    import time
+    _Servidor.falhas = {"/listings.csv": 2}
+    c = http.ClienteHTTP(tentativas=3, backoff=0.01, taxa_por_host=20)
+    r = c.get(servidor + "/listings.csv")
+    assert r.status == 200 and r.corpo == CSV and len(_Servidor.requisicoes) == 3
+
+    t0 = time.perf_counter()
+    r2 = c.get(servidor + "/listings.csv", http.condicional(r.etag))
+    r3 = c.get(servidor + "/listings.csv", http.condicional(r.etag))
+    assert r2.status == r3.status == 304 and r2.corpo == b""
+    assert time.perf_counter() - t0 >= 0.09  # 20 req/s por host
+    assert sum(len(v) for v in c._ociosas.values()) == 1  # uma conexão reaproveitada
+
+    with pytest.raises(http.ErroHTTP) as e:
+        c.get(servidor + "/nao-existe.csv")
+    assert e.value.status == 404
+    c.fechar()
+
+
+def test_conector_resumo_json_cache_e_fallback(servidor, monkeypatch):
+    import json
+    _Servidor.arquivos["/web2.json"] = json.dumps(
+        {"itens": [{"plataforma": "Booking", "ticket_medio": 410.5, "ocupacao_media": 0.61}]}).encode()
+    web2 = conectores.ResumoJSONConector("web2", None, "plataforma", ["Booking", "Vrbo"], url=servidor + "/web2.json")
+    assert web2.chaves_configuradas() == ["Booking", "Vrbo"]
+
+    booking, vrbo = web2.coletar()
+    assert booking["ticket_medio"] == 410.5 and booking["sazonalidade"] == []
+    assert vrbo == {"plataforma": "Vrbo", **conectores.CAMPOS_METRICAS}
+    web2.coletar()
+    assert len(_Servidor.requisicoes) == 1  # dentro do MAX_AGE_SEC: cache local
+
+    monkeypatch.setattr(conectores, "MAX_AGE_SEC", 0)
+    web2.coletar()
+    assert _Servidor.requisicoes[-1][1] is not None  # GET condicional -> 304
+
+    _Servidor.falhas["/web2.json"] = 99  # fonte fora do ar -> serve a última cópia
+    assert web2.coletar(["Booking"])[0]["ticket_medio"] == 410.5
+
+
+def test_prefetch_aquece_cidades_configuradas(servidor, cidades, monkeypatch):
+    from orquestrador.agents.sources import metricas_store
+    from orquestrador.services import prefetch
+
+    monkeypatch.setattr(metricas_store, "_mem", None)
+    cidades(Teste=servidor + "/listings.csv", Sem=None)
+    res = prefetch.rodada(["inside_airbnb", "web3"])
+    assert res["inside_airbnb"]["status"] == "ok" and res["web3"]["status"] == "sem_chaves"
+    assert metricas_store.em_memoria("Teste", servidor + "/listings.csv")["ticket_medio"] == 300.0
+
+
+def test_catalogo_proxy_checksum_e_download_compartilhado(servidor, cidades, monkeypatch):
+    import hashlib
+    from orquestrador.agents.sources import metricas_store
+
+    monkeypatch.setattr(metricas_store, "_mem", None)
+    url = servidor + "/listings.csv"
+    cidades(
+        Floripa={"url": url, "snapshot": "2025-06-27", "sha256": hashlib.sha256(CSV).hexdigest()},
+        Ilha=url,  # mesma fonte: um download só
+        BC={"url": None, "proxy": "Floripa"},
+        Ciclo={"proxy": "Ciclo"},
+    )
+    assert catalogo.resolver("BC").proxy_de == "Floripa" and catalogo.resolver("Ciclo").url is None
+    assert catalogo.resolver("Fora") is None
+
+    metricas, rel = inside_airbnb.calcular_cidades(["Floripa", "Ilha", "BC", "Ciclo"], workers=4)
+    assert metricas["Floripa"]["ticket_medio"] == metricas["Ilha"]["ticket_medio"] == 300.0
+    assert metricas["BC"]["fonte"] == "InsideAirbnb (proxy: Floripa)" and rel["BC"]["proxy_de"] == "Floripa"
+    assert rel["Ciclo"]["origem"] == "sem_dataset"
+    assert len(_Servidor.requisicoes) == 1
+
+    # versão fixada e cópia íntegra: nem revalida, mesmo com o bruto "vencido"
+    assert cache_colunar.atualizar_bruto(url, max_age_sec=0, sha256=hashlib.sha256(CSV).hexdigest())
+    assert len(_Servidor.requisicoes) == 1
+    assert cache_colunar.verificar(url) == {"bruto": "ok", "processado": "ok", "sha256": hashlib.sha256(CSV).hexdigest()}
+
+    # checksum divergente: não substitui a cópia local
+    with pytest.raises(RuntimeError, match="Checksum"):
+        cache_colunar.atualizar_bruto(url, sha256="0" * 64)
+    assert cache_colunar.caminho_bruto(url).read_bytes() == CSV
+
+    cache_colunar.caminho_processado(url).write_bytes(b"corrompido")
+    assert cache_colunar.verificar(url)["processado"] == "divergente"
+
+    from fastapi.testclient import TestClient
+    from orquestrador.main import app
+    r = TestClient(app).get("/api/consultor-mercado/catalogo", params={"verificar": True})
+    por_cidade = {c["cidade"]: c for c in r.json()["resultado"]["cidades"]}
+    assert por_cidade["Floripa"]["snapshot"] == "2025-06-27" and por_cidade["Floripa"]["cache"]["bruto"] == "ok"
+
+
+def test_precificacao_quantis_sazonalidade_e_emissao(servidor, cidades, monkeypatch):
+    import time
+    from orquestrador.agents.sources import precificacao
+
+    monkeypatch.setattr(precificacao, "_tabelas", None)
+    monkeypatch.setattr(precificacao, "MIN_AMOSTRAS", 1)
+    cidades(Floripa=servidor + "/listings.csv", BC={"proxy": "Floripa"})
+
+    s = precificacao.sugerir("Floripa", "Entire home/apt", "2025-01-30", "2025-02-02")
+    assert s["base"] == 375.0 and s["fatorSazonal"] == 1.25 and s["valorDiaria"] == 468.75
+    assert precificacao.sugerir("BC", "Castelo", "2025-03-01", "2025-03-05")["valorDiaria"] == 300.0 * 0.8
+    with pytest.raises(LookupError):
+        precificacao.sugerir("Fora")
+
+    t0 = time.perf_counter()
+    for _ in range(1000):
+        precificacao.sugerir("Floripa", "Private room", "2025-01-10", "2025-01-20", 0.75)
+    assert (time.perf_counter() - t0) / 1000 < 1e-3  # tabela quente: sub-milissegundo
+    assert precificacao.aquecer(["Floripa", "BC"]) == {servidor + "/listings.csv": "ok"}
+
+    from fastapi.testclient import TestClient
+    from orquestrador.main import app
+    from orquestrador.agents import registro
+    recebidos = {}
+
+    async def executar(nome, entrada):
+        recebidos[nome] = entrada
+        return {"sucesso": True}
+
+    monkeypatch.setattr(registro, "executar", executar)
+    nft = {"nomeProprietario": "C", "documento": "1", "wallet": "0xabc", "idPropriedade": "p1",
+           "nomeNFT": "Casa", "descricao": "d", "dataInicio": "2025-01-30", "dataFim": "2025-02-02",
+           "moeda": "BRL", "regras": "r", "politicaCancelamento": "flexivel"}
+    r = TestClient(app).post("/api/orquestrador/emitir-nft", json={
+        "nft": nft, "cidade": "Floripa", "tipoImovel": "Entire home/apt",
+        "consultor": {"cidades": ["Floripa"]}})
+    assert r.json()["precificacao"]["valorDiaria"] == 468.75
+    assert recebidos["nft"]["precoSugerido"] == 468.75 and recebidos["nft"]["valorDiaria"] == "468.75"
+
+
+def test_indice_espacial_vizinhos_raio_e_rota(servidor, cidades, monkeypatch):
+    import time
+    import numpy as np
+    from orquestrador.agents.sources import indice_espacial
+
+    monkeypatch.setattr(indice_espacial, "_memoria", {})
+    cidades(Floripa=servidor + "/listings.csv")
+
+    r = indice_espacial.comparaveis("Floripa", -27.59, -48.54, k=2)
+    assert [i["id"] for i in r["itens"]] == ["1", "2"] and r["preco_mediano"] == 225.0
+    assert [i["id"] for i in indice_espacial.comparaveis("Floripa", -27.59, -48.54, 2.5)["itens"]] == ["1", "2", "4"]
+    r = indice_espacial.comparaveis("Floripa", -27.59, -48.54, k=5, tipo_imovel="Private room")
+    assert [i["id"] for i in r["itens"]] == ["2", "4"] and r["preco_mediano"] == 150.0
+
+    # persistido ao lado do cache: recarrega do .npz sem reler o Arrow
+    monkeypatch.setattr(indice_espacial, "_memoria", {})
+    monkeypatch.setattr(indice_espacial, "_construir", lambda *a: pytest.fail("deveria ler o .npz"))
+    assert len(indice_espacial.obter("Floripa")) == 4
+
+    from fastapi.testclient import TestClient
+    from orquestrador.main import app
+    cli = TestClient(app)
+    r = cli.get("/api/consultor-mercado/comparaveis", params={"cidade": "Floripa", "lat": -27.59, "lon": -48.54, "k": 1})
+    assert r.json()["resultado"]["itens"][0]["id"] == "1"
+    assert cli.get("/api/consultor-mercado/comparaveis", params={"cidade": "X", "lat": 0, "lon": 0}).status_code == 404
+
+    # 200k pontos: consultas em milissegundos, iguais à força bruta
+    rng = np.random.default_rng(0)
+    n = 200_000
+    lat, lon = -27.6 + rng.normal(0, 0.05, n), -48.5 + rng.normal(0, 0.05, n)
+    idx = indice_espacial.IndiceEspacial.construir(np.arange(n), lat, lon, rng.uniform(100, 900, n),
+                                                    rng.choice(["a", "b"], n))
+    dist = indice_espacial._haversine(-27.6, -48.5, lat, lon)
+    assert [int(i["id"]) for i in idx.vizinhos(-27.6, -48.5, 10)] == np.argsort(dist)[:10].tolist()
+    assert len(idx.raio(-27.6, -48.5, 1.0)) == int((dist <= 1.0).sum())
+    t0 = time.perf_counter()
+    for _ in range(100):
+        idx.vizinhos(-27.6, -48.5, 10)
+        idx.raio(-27.62, -48.48, 1.0, "a", limite=50)
+    assert (time.perf_counter() - t0) / 100 < 10e-3
+
+
+def test_escrita_atomica_concorrente_no_mesmo_arquivo(tmp_path):
+    destino = tmp_path / "metricas.json"
+
+    def gravar(letra):
+        for _ in range(20):
+            arquivos.escrever_atomico(destino, letra * 200_000)
+
+    threads = [threading.Thread(target=gravar, args=(c,)) for c in "abcdefgh"]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    conteudo = destino.read_text()
+    assert len(conteudo) == 200_000 and len(set(conteudo)) == 1   # sempre um arquivo inteiro de uma escrita
+    assert not list(tmp_path.glob(".*.tmp"))
+
+
+def test_metricas_store_concorrente_nao_perde_cidades(dirs, monkeypatch):
+    from orquestrador.agents.sources import metricas_store
+    from orquestrador.utils.arquivos import escrever_json, ler_json
+
+    monkeypatch.setattr(metricas_store, "_mem", None)
+    threads = [threading.Thread(target=metricas_store.salvar, args=(f"C{i}", "u", "v1", {"n": i}))
+               for i in range(16)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    # outro worker grava uma cidade no arquivo; a memória deste segue sem ela
+    arquivo = dirs[1] / "inside_metricas.json"
+    disco = ler_json(arquivo)
+    escrever_json(arquivo, {**disco, "Outro": {**disco["C0"], "metricas": {"n": -1}}})
+    assert metricas_store.em_memoria("Outro", "u") is None
+    metricas_store.invalidar("C1")
+    assert set(ler_json(arquivo)) == {f"C{i}" for i in range(16) if i != 1} | {"Outro"}
+    assert metricas_store.em_memoria("Outro", "u") == {"n": -1}
@@ -0,0 +1,130 @@
+# apps/backend_ia/orquestrador/test_ipfs.py
+import os, sys, json, time, base64, hashlib, threading, pytest
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from orquestrador.utils import ipfs
+
+
+def _cid(dados: bytes) -> str:
+    # implementação independente: 0x01 (CIDv1) 0x55 (raw) 0x12 0x20 (sha2-256, 32 bytes)
+    return "b" + base64.b32encode(b"\x01\x55\x12\x20" + hashlib.sha256(dados).digest()).decode().lower().rstrip("=")
+
+
+class _NoIPFS(BaseHTTPRequestHandler):
+    """Stand-in do nó IPFS: block/put (multipart, vários blocos) e gateway /ipfs/<cid>."""
+    protocol_version = "HTTP/1.1"
+    blocos = {}
+    requisicoes = []
+    falhar = False
+
+    def _responder(self, status, corpo=b"", tipo="application/json"):
+        self.send_response(status)
+        self.send_header("Content-Type", tipo)
+        self.send_header("Retry-After", "0")
+        self.send_header("Content-Length", str(len(corpo)))
+        self.end_headers()
+        self.wfile.write(corpo)
+
+    def do_POST(self):
+        corpo = self.rfile.read(int(self.headers["Content-Length"]))
+        type(self).requisicoes.append(self.path)
+        if self.falhar:
+            return self._responder(503)
+        fronteira = self.headers["Content-Type"].split("boundary=")[1].encode()
+        linhas = []
+        for parte in corpo.split(b"--" + fronteira)[1:-1]:
+            dados = parte.split(b"\r\n\r\n", 1)[1][:-2]
+            self.blocos[_cid(dados)] = dados
+            linhas.append(json.dumps({"Key": _cid(dados), "Size": len(dados)}))
+        self._responder(200, "\n".join(linhas).encode())
+
+    def do_GET(self):
+        dados = self.blocos.get(self.path.split("?")[0].rsplit("/", 1)[-1])
+        self._responder(200 if dados is not None else 404, dados or b"", "application/vnd.ipld.raw")
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def no_ipfs(monkeypatch):
+    _NoIPFS.blocos, _NoIPFS.requisicoes, _NoIPFS.falhar = {}, [], False
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), _NoIPFS)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{srv.server_address[1]}"
+    monkeypatch.setenv("EIAH_IPFS_API", url)
+    monkeypatch.setenv("EIAH_IPFS_GATEWAY", url)
+    yield url
+    ipfs.parar()
+    srv.shutdown()
+
+
+def test_cid_confere_com_vetores_conhecidos():
+    assert ipfs.calcular_cid(b"hello world") == "bafkreifzjut3te2nhyekklss27nh3k72ysco7y32koao5eei66wof36n5e"
+    assert ipfs.calcular_cid(b"") == "bafkreihdwdcefgh4dqkjv67uzcmw7ojee6xedzdetojuzjevtenxquvyku"
+    assert ipfs.calcular_cid(b"x" * 1000) == _cid(b"x" * 1000)
+
+
+def test_metadata_e_imagem_deduplicadas_e_pinagem_em_lote(no_ipfs):
+    from orquestrador.agents import nft
+    from orquestrador.schemas.nft_schema import NFTRequest
+    from orquestrador.conftest import _payload_nft
+
+    imagem = b"\x89PNG imagem"
+    png = "data:image/png;base64," + base64.b64encode(imagem).decode()
+    metas = [nft._metadata(NFTRequest(**{**_payload_nft(d % 2 + 1), "imagemUrl": png})) for d in range(4)]
+    r = ipfs.upload_lote_ipfs(metas)
+    # 4 NFTs, 2 metadatas distintas + 1 imagem compartilhada = 3 blocos
+    assert len({x["ipfsHash"] for x in r}) == 2 and r[0]["tokenURI"] == f"ipfs://{r[0]['ipfsHash']}"
+    assert metas[0]["image"] == "ipfs://" + _cid(imagem)
+    assert ipfs.store().estatisticas()["pins"] == {"pendente": 3}
+    assert json.loads(ipfs.obter(r[0]["ipfsHash"])) == metas[0]
+
+    # nó fora do ar: nada se perde, tudo é reagendado com backoff
+    _NoIPFS.falhar = True
+    assert ipfs.enviar_pendentes()["status"] == "erro"
+    assert ipfs.store().status(r[0]["ipfsHash"])["tentativas"] == 1
+    assert ipfs.enviar_pendentes()["enviados"] == 0  # ainda no backoff
+    _NoIPFS.falhar = False
+    _NoIPFS.requisicoes.clear()
+    ipfs.store()._conn.execute("UPDATE pins SET proximo_em = 0")  # vence o backoff
+
+    # em segundo plano: um único POST com os 3 blocos, CIDs conferidos pelo nó
+    ipfs.iniciar(0.05)
+    fim = time.time() + 5
+    while ipfs.store().estatisticas()["pins"] != {"pinado": 3} and time.time() < fim:
+        time.sleep(0.02)
+    assert ipfs.store().estatisticas()["pins"] == {"pinado": 3}
+    assert len(_NoIPFS.requisicoes) == 1 and _NoIPFS.requisicoes[0].startswith("/api/v0/block/put")
+    assert set(_NoIPFS.blocos) == {x["ipfsHash"] for x in r} | {metas[0]["image"][7:]}
+
+
+def test_lru_despeja_so_pinados_e_relê_pelo_gateway(no_ipfs, monkeypatch):
+    monkeypatch.setattr(ipfs, "MAX_BYTES", 250)
+    bs = ipfs.store()
+    a, b = bs.adicionar(b"a" * 100), bs.adicionar(b"b" * 100)
+    c = bs.adicionar(b"c" * 100)  # acima do limite, mas nada pinado: nada sai
+    assert bs.estatisticas()["blocos"] == 3
+
+    assert bs.obter(a) == b"a" * 100          # a fica recente; b é o menos usado
+    assert ipfs.enviar_pendentes()["enviados"] == 3
+    assert not bs.contem(b) and bs.contem(a) and bs.contem(c)
+    assert ipfs.obter(b) == b"b" * 100        # volta pelo gateway, conferido pelo CID
+    assert bs.adicionar(b"a" * 100) == a      # dedupe: mesmo conteúdo, mesmo bloco
+
+
+def test_lote_com_falha_desfaz_blocos_e_pinagem_sem_blocos(no_ipfs):
+    bs = ipfs.store()
+    existente = bs.adicionar(b"ja estava")
+    with pytest.raises(TypeError):
+        bs.adicionar_lote([b"novo 1", b"ja estava", b"novo 2", "nao e bytes"])
+    # o ROLLBACK leva as linhas da fila; os blocos novos saem do LRU e do disco junto
+    assert bs.estatisticas() == {"blocos": 1, "bytes": 9, "max_bytes": bs.max_bytes, "pins": {"pendente": 1}}
+    assert not bs.contem(_cid(b"novo 1")) and bs.status(_cid(b"novo 1")) is None
+    assert [p.name for p in (bs.pasta / "blocos").glob("*/*")] == [existente]
+
+    # pendente cujo bloco sumiu do disco: reagenda e não faz POST vazio
+    bs._caminho(existente).unlink()
+    assert ipfs.enviar_pendentes() == {"status": "erro", "enviados": 0, "reagendados": 1}
+    assert _NoIPFS.requisicoes == []
@@ -0,0 +1,99 @@
+# apps/backend_ia/orquestrador/test_jobs.py
+import os, sys, time, json, asyncio, socket, pytest
+from fastapi.testclient import TestClient
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from orquestrador.conftest import _payload_nft
+from orquestrador.main import app
+from orquestrador.services import jobs
+
+
+@pytest.fixture
+def fila(monkeypatch):
+    monkeypatch.setattr(jobs, "INTERVALO_SEC", 0.05)
+    monkeypatch.setenv("EIAH_PREFETCH_SEC", "0")
+    monkeypatch.setenv("EIAH_JOBS_WORKERS", "2")
+    return jobs.get_store()
+
+
+def _esperar(cliente, id, status, timeout=5.0):
+    fim = time.time() + timeout
+    while time.time() < fim:
+        job = cliente.get(f"/api/jobs/{id}").json()
+        if job["status"] in status:
+            return job
+        time.sleep(0.02)
+    raise AssertionError(f"job {id} não chegou a {status}: {job['status']}")
+
+
+def test_emissao_assincrona_status_resultado_e_eventos(fila):
+    with TestClient(app) as cliente:
+        r = cliente.post("/api/orquestrador/emitir-nft?assincrono=true", json={"nft": _payload_nft()})
+        assert r.status_code == 202
+        id = r.json()["job"]
+        job = _esperar(cliente, id, jobs.TERMINAIS)
+        assert job["status"] == "concluido" and job["tentativas"] == 1
+        assert {e["etapa"] for e in job["progresso"]} >= {"consultor", "nft", "imagem"}
+
+        res = cliente.get(f"/api/jobs/{id}/resultado")
+        assert res.status_code == 200
+        assert set(res.json()["resultado"]["tempos_ms"]) == {"consultor", "nft", "imagem"}
+
+        stream = cliente.get(f"/api/jobs/{id}/eventos").text
+        ultimo = [b for b in stream.split("\n\n") if b.startswith("event:")][-1]
+        assert ultimo.startswith("event: concluido")
+        assert json.loads(ultimo.split("data: ", 1)[1])["id"] == id
+
+        assert cliente.get("/api/jobs/nao-existe").status_code == 404
+        assert cliente.post("/api/jobs", json={"tipo": "x", "entrada": {}}).status_code == 400
+
+
+def test_cancelamento_de_job_pendente_e_recusa_em_execucao(fila, monkeypatch):
+    async def lento(entrada, progresso):
+        progresso("inicio", {})
+        await asyncio.sleep(0.5)
+        return {"ok": True}
+
+    monkeypatch.setitem(jobs.TIPOS, "lento", lento)
+    monkeypatch.setenv("EIAH_JOBS_WORKERS", "1")
+    with TestClient(app) as cliente:
+        a = cliente.post("/api/jobs", json={"tipo": "lento", "entrada": {}}).json()["job"]
+        b = cliente.post("/api/jobs", json={"tipo": "lento", "entrada": {}}).json()["job"]
+        _esperar(cliente, a, ["executando"])
+        assert cliente.post(f"/api/jobs/{b}/cancelar").json()["status"] == "cancelado"  # ainda na fila
+        # em execução: recusado, e o job termina normalmente
+        r = cliente.post(f"/api/jobs/{a}/cancelar")
+        assert r.status_code == 409 and "execução" in r.json()["detail"]
+        assert _esperar(cliente, a, jobs.TERMINAIS)["status"] == "concluido"
+        assert cliente.get(f"/api/jobs/{a}/resultado").json()["resultado"] == {"ok": True}
+        assert cliente.get(f"/api/jobs/{b}/resultado").json()["status"] == "cancelado"
+
+
+def test_fila_sobrevive_a_restart(fila):
+    # job pendente e job "executando" de um processo que morreu (mesmo host, pid inexistente)
+    pendente = fila.criar("nft_lote", {"itens": [_payload_nft()]})
+    orfao = fila.criar("nft_lote", {"itens": [_payload_nft(2), _payload_nft(3)]})
+    morto = f"{socket.gethostname()}:999999999"
+    assert [fila.pegar(dono=morto)["id"] for _ in range(2)] == [pendente, orfao]
+    fila.devolver(pendente, dono=morto)
+
+    with TestClient(app) as cliente:
+        for id, n in ((pendente, 1), (orfao, 2)):
+            assert _esperar(cliente, id, jobs.TERMINAIS)["status"] == "concluido"
+            r = cliente.get(f"/api/jobs/{id}/resultado").json()["resultado"]
+            assert r["resultado"]["contagem"] == {"emitido": n}
+
+
+def test_fila_travada_por_outro_worker_nao_bloqueia_o_event_loop(fila):
+    import sqlite3
+    with TestClient(app) as cliente:
+        outro = sqlite3.connect(fila.arquivo, isolation_level=None)
+        outro.execute("BEGIN IMMEDIATE")  # outro worker do uvicorn segurando a trava de escrita
+        try:
+            time.sleep(0.2)               # os workers já esperam a trava dentro do pegar()
+            inicio = time.monotonic()
+            assert cliente.get("/").status_code == 200
+            assert time.monotonic() - inicio < 1.0
+        finally:
+            outro.execute("ROLLBACK")
+            outro.close()
@@ -0,0 +1,244 @@
+# apps/backend_ia/orquestrador/test_orquestrador.py
+import os, sys, time, asyncio, pytest
+from fastapi.testclient import TestClient
+
+pytestmark = [
+    pytest.mark.filterwarnings(
+        "ignore:Using extra keyword arguments on `Field` is deprecated.*:DeprecationWarning"
+    ),
+    pytest.mark.filterwarnings(
+        "ignore:datetime\\.datetime\\.utcnow\\(\\) is deprecated.*:DeprecationWarning"
+    ),
+]
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from orquestrador.conftest import _payload_nft
+from orquestrador.main import app
+from orquestrador.services.pipeline import Etapa, executar_etapas
+
+client = TestClient(app)
+
+
+def test_emitir_nft_orquestrado_retorna_todas_as_etapas():
+    resp = client.post("/api/orquestrador/emitir-nft", json={"nft": _payload_nft(), "descricao": "banner"})
+    assert resp.status_code == 200
+    data = resp.json()
+    assert data["sucesso"] is True and data["parcial"] is False
+    assert data["consultor"]["resultado"]["agente"] == "consultor_mercado"
+    assert data["imagem"]["agente"] == "imagem"
+    assert set(data["tempos_ms"]) == {"consultor", "nft", "imagem"}
+
+
+def test_pipeline_paralelo_com_timeout_e_resultado_parcial():
+    def lento(_):
+        time.sleep(0.3)
+        return "lento"
+
+    def falha(_):
+        raise RuntimeError("boom")
+
+    etapas = [
+        Etapa("a", lento, timeout=1.0),
+        Etapa("b", lento, timeout=1.0),
+        Etapa("c", lento, timeout=0.05),
+        Etapa("d", falha),
+        Etapa("e", lambda x: x, depende_de=["d"]),
+        Etapa("f", lambda x: x, depende_de=["a"], preparar=lambda _, deps: deps["a"] + "+f"),
+    ]
+    inicio = time.perf_counter()
+    res = asyncio.run(executar_etapas(etapas))
+    # a e b rodam juntas: bem menos que a soma (0.6s)
+    assert time.perf_counter() - inicio < 0.55
+    assert res["a"]["status"] == "ok" and res["b"]["status"] == "ok"
+    assert res["c"]["status"] == "timeout"
+    assert res["d"]["status"] == "erro" and "boom" in res["d"]["erro"]
+    assert res["e"]["status"] == "ignorada"
+    assert res["f"]["resultado"] == "lento+f"
+
+
+def test_execucao_respeita_limite_por_agente(monkeypatch):
+    from orquestrador.agents import registro
+    from orquestrador.services import execucao
+
+    spec = registro.AgenteSpec("teste_lento", "teste:lento", frozenset({"json"}), execucao.Perfil("io", limite=1))
+    monkeypatch.setitem(registro.REGISTRO, "teste_lento", spec)
+
+    def lento(x):
+        time.sleep(0.1)
+        return x
+
+    async def _rodar():
+        return await asyncio.gather(*[execucao.executar_agente("teste_lento", lento, i) for i in range(3)])
+
+    inicio = time.perf_counter()
+    assert asyncio.run(_rodar()) == [0, 1, 2]
+    # limite=1 -> as três chamadas são serializadas
+    assert time.perf_counter() - inicio >= 0.3
+
+
+def test_boot_nao_importa_agentes_pesados():
+    """O import da app não deve carregar gTTS/pandas (agentes carregados sob demanda)."""
+    import subprocess
+
+    codigo = (
+        "import sys; sys.path.insert(0, %r); import orquestrador.main; "
+        "print('pandas' in sys.modules, 'gtts' in sys.modules)"
+    ) % os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+    out = subprocess.run([sys.executable, "-c", codigo], capture_output=True, text=True, check=True)
+    assert out.stdout.strip().splitlines()[-1] == "False False"
+
+
+def test_nft_lote_valida_antes_agrupa_mints_e_reporta_por_item(monkeypatch):
+    from orquestrador.agents import nft
+
+    chamadas = {"ipfs": 0, "mint": []}
+
+    def upload(metadatas):
+        chamadas["ipfs"] += 1
+        return [{"tokenURI": f"ipfs://m{i}", "ipfsHash": f"m{i}"} for i in range(len(metadatas))]
+
+    def mint(itens):
+        chamadas["mint"].append(len(itens))
+        if len(chamadas["mint"]) == 2:
+            raise RuntimeError("gas")
+        return {"txHash": f"0x{len(chamadas['mint'])}", "nftIds": [item[1] for item in itens]}
+
+    monkeypatch.setattr(nft, "upload_lote_ipfs", upload)
+    monkeypatch.setattr(nft, "mint_lote", mint)
+    monkeypatch.setattr(nft, "MAX_MINTS_POR_TX", 3)
+
+    itens = [_payload_nft(d) for d in range(1, 9)]
+    del itens[5]["wallet"]
+    resp = client.post("/api/nft/lote", json={"itens": itens})
+    assert resp.status_code == 200
+    data = resp.json()
+    assert data["sucesso"] is False and data["parcial"] is True
+    # 7 válidos -> 1 upload, 3 transações (3 + 3 + 1); a 2ª falha só para os seus itens
+    assert chamadas == {"ipfs": 1, "mint": [3, 3, 1]}
+    status = [i["status"] for i in data["resultado"]["itens"]]
+    assert status == ["emitido"] * 3 + ["erro", "erro", "invalido", "erro", "emitido"]
+    assert data["resultado"]["itens"][5]["erros"][0]["campo"] == "wallet"
+    assert data["resultado"]["itens"][7]["txHash"] == "0x3"
+    assert data["resultado"]["contagem"] == {"emitido": 4, "erro": 3, "invalido": 1}
+
+    chamadas["mint"].clear()
+    resp = client.post("/api/nft/lote", json={"itens": itens, "tudoOuNada": True})
+    assert {i["status"] for i in resp.json()["resultado"]["itens"]} == {"cancelado", "invalido"}
+    assert chamadas["mint"] == []
+
+    assert client.post("/api/nft/lote", json={"itens": []}).status_code == 400
+
+
+def test_idempotencia_nft_repeticao_conflito_e_duplicatas_simultaneas(monkeypatch):
+    import threading
+    from orquestrador.agents import nft
+
+    mints = []
+
+    def mint(wallet, uri, *reserva):
+        time.sleep(0.2)
+        mints.append(wallet)
+        return {"txHash": f"0x{len(mints)}", "nftId": f"id{len(mints)}"}
+
+    monkeypatch.setattr(nft, "mint_nft", mint)
+
+    # 5 requisições idênticas ao mesmo tempo -> um único mint, todas com o mesmo NFT
+    saidas = []
+    threads = [threading.Thread(target=lambda: saidas.append(nft.executar(_payload_nft(5)))) for _ in range(5)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(mints) == 1
+    assert {s["resultado"]["idNFT"] for s in saidas} == {"id1"}
+    assert sorted(s["resultado"]["idempotencia"]["reutilizado"] for s in saidas) == [False] + [True] * 4
+
+    # retry pela rota: devolve o gravado sem novo mint
+    r = client.post("/api/nft", json=_payload_nft(5)).json()["resultado"]
+    assert r["resultado"]["txHash"] == "0x1" and len(mints) == 1
+
+    # chave do cliente: mesma chave + outro conteúdo = conflito
+    assert client.post("/api/nft", json=_payload_nft(6), headers={"Idempotency-Key": "k1"}).status_code == 200
+    assert client.post("/api/nft", json=_payload_nft(7), headers={"Idempotency-Key": "k1"}).status_code == 409
+    assert len(mints) == 2
+
+    # lote reaproveita o que já foi emitido por /api/nft
+    monkeypatch.setattr(nft, "mint_lote", lambda itens: {"txHash": "0xL", "nftIds": ["L"] * len(itens)})
+    itens = client.post("/api/nft/lote", json=[_payload_nft(5), _payload_nft(8)]).json()["resultado"]["itens"]
+    assert itens[0]["reutilizado"] is True and itens[0]["idNFT"] == "id1"
+    assert itens[1]["txHash"] == "0xL" and "reutilizado" not in itens[1]
+    assert nft.executar(_payload_nft(8))["resultado"]["idNFT"] == "L"
+
+
+def test_emitir_nft_com_idempotency_key_devolve_a_mesma_emissao():
+    h = {"Idempotency-Key": "emissao-1"}
+    a = client.post("/api/orquestrador/emitir-nft", json={"nft": _payload_nft(9)}, headers=h).json()
+    b = client.post("/api/orquestrador/emitir-nft", json={"nft": _payload_nft(9)}, headers=h).json()
+    assert a["idempotente"] is False and b["idempotente"] is True
+    assert a["nft"]["resultado"]["idNFT"] == b["nft"]["resultado"]["idNFT"]
+    r = client.post("/api/orquestrador/emitir-nft", json={"nft": _payload_nft(10)}, headers=h)
+    assert r.status_code == 409
+
+
+def test_nft_request_tipado_valida_uma_vez_na_rota(monkeypatch):
+    from decimal import Decimal
+    from orquestrador.agents import nft
+    from orquestrador.schemas.nft_schema import NFTRequest, validar_lote
+
+    # período invertido e preço inválido: 422 na rota, apontando o campo
+    erro = client.post("/api/nft", json={**_payload_nft(12), "dataFim": "2025-10-12"})
+    assert erro.status_code == 422 and erro.json()["detail"][0]["loc"][-1] == "dataFim"
+    assert client.post("/api/nft", json={**_payload_nft(12), "valorDiaria": "abc"}).status_code == 422
+    assert client.post("/api/nft", json={**_payload_nft(12), "valorDiaria": "0"}).status_code == 422
+
+    # o agente recebe o modelo já validado (sem nova validação) com tipos de verdade
+    recebidos = []
+    monkeypatch.setattr(NFTRequest, "model_validate", classmethod(lambda cls, d: pytest.fail("revalidou")))
+    monkeypatch.setattr(nft, "_emitir", lambda e: recebidos.append(e) or {"idNFT": "x"})
+    assert client.post("/api/nft", json=_payload_nft(12)).status_code == 200
+    assert recebidos[0].valorDiaria == Decimal("1.5") and recebidos[0].dataFim.day == 13
+
+    # lote: um TypeAdapter para a lista; erros por índice e campo
+    itens = [_payload_nft(1), {**_payload_nft(2), "dataInicio": "2025-10-05"}, None, _payload_nft(3)]
+    validos, erros = validar_lote(itens)
+    assert sorted(validos) == [0, 3] and validos[3].dataInicio.day == 3
+    assert erros[1] == [{"campo": "dataFim", "erro": "Value error, dataFim deve ser posterior a dataInicio"}]
+    assert 2 in erros
+
+
+def test_duplicata_com_dono_morto_nao_prende_a_requisicao(monkeypatch):
+    from orquestrador.services import idempotencia
+
+    # outro worker reservou a chave e morreu: o lease (600s) ainda vale
+    store = idempotencia.get_store()
+    assert store.reservar("emitir-nft", "k-orfa", idempotencia.chave_conteudo({"nft": _payload_nft(14)}),
+                          dono="outro:1")[0] == "novo"
+    assert store.reservar("nft", "k-orfa", None, dono="outro:1")[0] == "novo"
+    monkeypatch.setattr(idempotencia, "ESPERA_MAX_SEC", 0.2)
+
+    inicio = time.monotonic()
+    r = client.post("/api/nft", json=_payload_nft(14), headers={"Idempotency-Key": "k-orfa"})
+    assert r.status_code == 409 and "em andamento" in r.json()["detail"]
+    assert time.monotonic() - inicio < 5
+    with pytest.raises(idempotencia.EmAndamento):
+        idempotencia.executar_uma_vez("emitir-nft", "k-orfa", lambda: pytest.fail("executou"), espera_max=0.1)
+
+
+def test_falha_na_prova_pdf_nao_desfaz_o_mint(monkeypatch):
+    from orquestrador.agents import nft
+    from orquestrador.services import agenda
+
+    mints = []
+    monkeypatch.setattr(nft, "mint_nft", lambda wallet, uri, *reserva: mints.append(reserva) or
+                        {"txHash": "0x1", "nftId": "id1"})
+    monkeypatch.setenv("EIAH_PROVAS_DESTINO", "bogus")
+
+    # token já mintado: sucesso sem prova, período e chave continuam gravados
+    r = nft.executar(_payload_nft(15))
+    assert r["sucesso"] is True and r["resultado"]["idNFT"] == "id1"
+    assert r["resultado"]["provaVerificacaoNFT"] is None
+    assert not agenda.get_store().livre("prop123", "2025-10-15", "2025-10-16")
+
+    # repetição devolve a emissão gravada sem novo mint
+    assert nft.executar(_payload_nft(15))["resultado"]["idempotencia"]["reutilizado"] is True
+    assert len(mints) == 1
@@ -0,0 +1,55 @@
+# apps/backend_ia/orquestrador/test_pdf.py
+import os, sys, re, pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from orquestrador.utils import ipfs, pdf
+
+DADOS = {
+    "nftId": "42",
+    "nome": "Carlos (Proprietário)",
+    "descricao": "Hospedagem à beira-mar \\ com piscina. " * 30,
+    "wallet": "0x90f79bf6eb2c4f870365e785982e1f101e93b906",
+    "tokenURI": "ipfs://bafkreifzjut3te2nhyekklss27nh3k72ysco7y32koao5eei66wof36n5e",
+    "txHash": "0x" + "ab" * 32,
+}
+
+
+def _conferir_estrutura(doc: bytes):
+    assert doc.startswith(b"%PDF-1.4\n") and doc.endswith(b"%%EOF\n")
+    startxref = int(re.search(rb"startxref\n(\d+)\n%%EOF\n$", doc).group(1))
+    assert doc[startxref:].startswith(b"xref\n0 9\n")
+    entradas = doc[startxref:].split(b"\n")[3:11]
+    for n, entrada in enumerate(entradas, start=1):
+        assert doc[int(entrada[:10]):].startswith(b"%d 0 obj\n" % n)
+    tam = int(re.search(rb"8 0 obj\n<< /Length (\d+) >>\nstream\n", doc).group(1))
+    ini = doc.index(b"stream\n", doc.index(b"8 0 obj")) + len(b"stream\n")
+    assert doc[ini + tam:].startswith(b"\nendstream")
+
+
+def test_prova_estrutura_campos_e_determinismo():
+    doc = pdf.renderizar(DADOS)
+    _conferir_estrutura(doc)
+    for campo in ("nftId", "wallet", "tokenURI", "txHash"):
+        assert b"(" + DADOS[campo].encode() + b") Tj" in doc
+    assert b"(Carlos \\(Propriet\xe1rio\\)) Tj" in doc            # WinAnsi + escape de parênteses
+    assert doc.count(b"...) Tj") == 1                             # descrição longa truncada
+    assert pdf.renderizar(DADOS) == doc                           # sem data: mesma emissão, mesmo PDF
+    assert pdf.renderizar({**DADOS, "nftId": "43"}) != doc
+    _conferir_estrutura(pdf.renderizar({}))                       # campos ausentes não quebram o layout
+
+
+def test_lote_no_store_ipfs_e_em_disco(tmp_path, monkeypatch):
+    monkeypatch.setattr(pdf, "PROVAS_DIR", tmp_path / "provas")
+    lote = [{**DADOS, "nftId": str(i)} for i in range(5)]
+
+    urls = pdf.gerar_pdfs_prova(lote + lote[:1])
+    assert urls[0] == urls[5] and len(set(urls)) == 5             # endereçado por conteúdo: deduplica
+    assert ipfs.obter(urls[3][len("ipfs://"):]) == pdf.renderizar(lote[3])
+
+    urls = pdf.gerar_pdfs_prova(lote, destino="disco")
+    assert urls[2].startswith("file://") and urls[2].endswith("/provas/prova_2.pdf")
+    assert (tmp_path / "provas" / "prova_2.pdf").read_bytes() == pdf.renderizar(lote[2])
+    assert not list((tmp_path / "provas").glob(".*.tmp"))
+
+    with pytest.raises(ValueError):
+        pdf.gerar_pdf_prova(DADOS, destino="s3")
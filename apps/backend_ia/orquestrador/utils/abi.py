@@ -0,0 +1,222 @@
+# apps/backend_ia/orquestrador/utils/abi.py
+"""
+Keccak-256 e codificação ABI (Solidity) sem dependência externa.
+
+Só o necessário para chamar o contrato NFTDiarias via JSON-RPC:
+seletores de função, tópicos de evento e (de)codificação de argumentos
+(uint/int, address, bool, bytesN, bytes, string e arrays T[] / T[k]).
+"""
+from typing import Any, List, Sequence, Tuple
+
+_RC = [
+    0x0000000000000001, 0x0000000000008082, 0x800000000000808A, 0x8000000080008000,
+    0x000000000000808B, 0x0000000080000001, 0x8000000080008081, 0x8000000000008009,
+    0x000000000000008A, 0x0000000000000088, 0x0000000080008009, 0x000000008000000A,
+    0x000000008000808B, 0x800000000000008B, 0x8000000000008089, 0x8000000000008003,
+    0x8000000000008002, 0x8000000000000080, 0x000000000000800A, 0x800000008000000A,
+    0x8000000080008081, 0x8000000000008080, 0x0000000080000001, 0x8000000080008008,
+]
+_ROT = [
+    [0, 36, 3, 41, 18],
+    [1, 44, 10, 45, 2],
+    [62, 6, 43, 15, 61],
+    [28, 55, 25, 21, 56],
+    [27, 20, 39, 8, 14],
+]
+_M64 = (1 << 64) - 1
+_TAXA = 136  # bytes absorvidos por bloco (1088 bits) no Keccak-256
+
+
+def _rol(x: int, n: int) -> int:
+    return ((x << n) | (x >> (64 - n))) & _M64 if n else x
+
+
+def _keccak_f(a: List[List[int]]):
+    for rc in _RC:
+        c = [a[x][0] ^ a[x][1] ^ a[x][2] ^ a[x][3] ^ a[x][4] for x in range(5)]
+        d = [c[(x - 1) % 5] ^ _rol(c[(x + 1) % 5], 1) for x in range(5)]
+        for x in range(5):
+            for y in range(5):
+                a[x][y] ^= d[x]
+        b = [[0] * 5 for _ in range(5)]
+        for x in range(5):
+            for y in range(5):
+                b[y][(2 * x + 3 * y) % 5] = _rol(a[x][y], _ROT[x][y])
+        for x in range(5):
+            for y in range(5):
+                a[x][y] = b[x][y] ^ ((~b[(x + 1) % 5][y]) & b[(x + 2) % 5][y])
+        a[0][0] ^= rc
+
+
+def keccak256(dados: bytes) -> bytes:
+    """Keccak-256 do Ethereum (padding 0x01, não o SHA3-256 do NIST)."""
+    msg = bytearray(dados)
+    msg.append(0x01)
+    msg.extend(b"\x00" * (-len(msg) % _TAXA))
+    msg[-1] |= 0x80
+    a = [[0] * 5 for _ in range(5)]
+    for ini in range(0, len(msg), _TAXA):
+        bloco = msg[ini:ini + _TAXA]
+        for i in range(_TAXA // 8):
+            a[i % 5][i // 5] ^= int.from_bytes(bloco[8 * i:8 * i + 8], "little")
+        _keccak_f(a)
+    return b"".join(a[i % 5][i // 5].to_bytes(8, "little") for i in range(4))
+
+
+def seletor(assinatura: str) -> bytes:
+    """4 primeiros bytes do keccak da assinatura canônica, ex.: "transfer(address,uint256)"."""
+    return keccak256(assinatura.encode("ascii"))[:4]
+
+
+def topico(assinatura: str) -> str:
+    """topics[0] de um evento, ex.: "Transfer(address,address,uint256)"."""
+    return "0x" + keccak256(assinatura.encode("ascii")).hex()
+
+
+def _tipos_da_assinatura(assinatura: str) -> List[str]:
+    args = assinatura[assinatura.index("(") + 1:assinatura.rindex(")")]
+    return [t.strip() for t in args.split(",")] if args.strip() else []
+
+
+# ---------------- codificação ----------------
+
+def _array(tipo: str) -> Tuple[str, Any]:
+    """("uint256[]" -> ("uint256", None)); ("address[3]" -> ("address", 3)); não-array -> (tipo, False)."""
+    if not tipo.endswith("]"):
+        return tipo, False
+    base, tam = tipo[:tipo.rindex("[")], tipo[tipo.rindex("[") + 1:-1]
+    return base, (int(tam) if tam else None)
+
+
+def _dinamico(tipo: str) -> bool:
+    base, tam = _array(tipo)
+    if tam is False:
+        return tipo in ("string", "bytes")
+    return tam is None or _dinamico(base)
+
+
+def _palavra(n: int) -> bytes:
+    return (n & ((1 << 256) - 1)).to_bytes(32, "big")
+
+
+def _estatico(tipo: str, valor: Any) -> bytes:
+    if tipo.startswith("uint"):
+        n = int(valor)
+        bits = int(tipo[4:] or 256)
+        if not 0 <= n < (1 << bits):
+            raise ValueError(f"{valor} fora do intervalo de {tipo}")
+        return _palavra(n)
+    if tipo.startswith("int"):
+        n = int(valor)
+        bits = int(tipo[3:] or 256)
+        if not -(1 << (bits - 1)) <= n < (1 << (bits - 1)):
+            raise ValueError(f"{valor} fora do intervalo de {tipo}")
+        return _palavra(n)
+    if tipo == "address":
+        b = bytes.fromhex(str(valor)[2:] if str(valor).startswith("0x") else str(valor))
+        if len(b) != 20:
+            raise ValueError(f"Endereço inválido: {valor}")
+        return b"\x00" * 12 + b
+    if tipo == "bool":
+        return _palavra(1 if valor else 0)
+    if tipo.startswith("bytes"):
+        b = bytes.fromhex(valor[2:]) if isinstance(valor, str) else bytes(valor)
+        if len(b) > int(tipo[5:]):
+            raise ValueError(f"{len(b)} bytes não cabem em {tipo}")
+        return b.ljust(32, b"\x00")
+    raise ValueError(f"Tipo ABI não suportado: {tipo}")
+
+
+def _codificar_um(tipo: str, valor: Any) -> bytes:
+    base, tam = _array(tipo)
+    if tam is not False:
+        itens = list(valor)
+        if tam is not None and len(itens) != tam:
+            raise ValueError(f"{tipo} espera {tam} itens, recebeu {len(itens)}")
+        corpo = codificar([base] * len(itens), itens)
+        return (_palavra(len(itens)) if tam is None else b"") + corpo
+    if tipo in ("string", "bytes"):
+        b = valor.encode("utf-8") if isinstance(valor, str) and tipo == "string" else (
+            bytes.fromhex(valor[2:]) if isinstance(valor, str) else bytes(valor))
+        return _palavra(len(b)) + b.ljust((len(b) + 31) // 32 * 32, b"\x00")
+    return _estatico(tipo, valor)
+
+
+def codificar(tipos: Sequence[str], valores: Sequence[Any]) -> bytes:
+    """abi.encode(valores...) – cabeças estáticas + caudas dos tipos dinâmicos."""
+    if len(tipos) != len(valores):
+        raise ValueError(f"{len(tipos)} tipos para {len(valores)} valores")
+    partes = [_codificar_um(t, v) for t, v in zip(tipos, valores)]
+    tam_cabeca = sum(32 if _dinamico(t) else len(p) for t, p in zip(tipos, partes))
+    cabeca, cauda = b"", b""
+    for t, p in zip(tipos, partes):
+        if _dinamico(t):
+            cabeca += _palavra(tam_cabeca + len(cauda))
+            cauda += p
+        else:
+            cabeca += p
+    return cabeca + cauda
+
+
+def chamada(assinatura: str, *valores: Any) -> str:
+    """calldata hex ("0x" + seletor + argumentos) para eth_call / eth_sendTransaction."""
+    return "0x" + (seletor(assinatura) + codificar(_tipos_da_assinatura(assinatura), valores)).hex()
+
+
+# ---------------- decodificação ----------------
+
+def _decodificar_um(tipo: str, dados: bytes, pos: int) -> Any:
+    """Valor de `tipo` cuja cabeça está em dados[pos:] (offsets relativos ao início de `dados`)."""
+    base, tam = _array(tipo)
+    if _dinamico(tipo):
+        ini = int.from_bytes(dados[pos:pos + 32], "big")
+        if tam is False:  # string / bytes
+            n = int.from_bytes(dados[ini:ini + 32], "big")
+            b = dados[ini + 32:ini + 32 + n]
+            return b.decode("utf-8") if tipo == "string" else b
+        if tam is None:
+            tam, ini = int.from_bytes(dados[ini:ini + 32], "big"), ini + 32
+        return decodificar([base] * tam, dados[ini:])
+    if tam is not False:  # T[k] estático: k cabeças em sequência
+        passo = 32 * _palavras_estaticas(base)
+        return [_decodificar_um(base, dados, pos + i * passo) for i in range(tam)]
+    palavra = dados[pos:pos + 32]
+    if tipo.startswith("uint"):
+        return int.from_bytes(palavra, "big")
+    if tipo.startswith("int"):
+        return int.from_bytes(palavra, "big", signed=True)
+    if tipo == "address":
+        return "0x" + palavra[12:].hex()
+    if tipo == "bool":
+        return palavra[-1] == 1
+    if tipo.startswith("bytes"):
+        return palavra[:int(tipo[5:])]
+    raise ValueError(f"Tipo ABI não suportado: {tipo}")
+
+
+def _palavras_estaticas(tipo: str) -> int:
+    base, tam = _array(tipo)
+    return 1 if tam is False else tam * _palavras_estaticas(base)
+
+
+def decodificar(tipos: Sequence[str], dados: Any) -> List[Any]:
+    """abi.decode – inverso de codificar(); `dados` em bytes ou hex ("0x...")."""
+    if isinstance(dados, str):
+        dados = bytes.fromhex(dados[2:] if dados.startswith("0x") else dados)
+    valores, pos = [], 0
+    for t in tipos:
+        valores.append(_decodificar_um(t, dados, pos))
+        pos += 32 if _dinamico(t) else 32 * _palavras_estaticas(t)
+    return valores
+
+
+def decodificar_chamada(assinatura: str, data: str) -> List[Any]:
+    """Argumentos de um calldata gerado por chamada() (confere o seletor)."""
+    if data[2:10] != seletor(assinatura).hex():
+        raise ValueError(f"calldata não é de {assinatura}")
+    return decodificar(_tipos_da_assinatura(assinatura), data[10:])
+
+
+def decodificar_uint(dados: str) -> int:
+    """Palavra de 32 bytes em hex (topics[i], retorno de eth_call) como inteiro."""
+    return int(dados, 16) if dados and dados != "0x" else 0
@@ -0,0 +1,34 @@
+# apps/backend_ia/orquestrador/utils/arquivos.py
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Any
+
+
+def escrever_atomico(path: Path, conteudo: Any):
+    """Escreve em arquivo temporário e troca com os.replace (nunca deixa arquivo pela metade)."""
+    path = Path(path)
+    # temporário por processo e thread: duas threads gravando o mesmo path não dividem arquivo
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    modo = "wb" if isinstance(conteudo, bytes) else "w"
+    try:
+        with open(tmp, modo, **({} if modo == "wb" else {"encoding": "utf-8"})) as f:
+            f.write(conteudo)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+
+
+def ler_json(path: Path, padrao: Any = None) -> Any:
+    try:
+        return json.loads(Path(path).read_text(encoding="utf-8") or "null")
+    except FileNotFoundError:
+        return padrao
+
+
+def escrever_json(path: Path, dados: Any):
+    escrever_atomico(path, json.dumps(dados, ensure_ascii=False, indent=2, default=str))
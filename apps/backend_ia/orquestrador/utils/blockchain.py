@@ -1,6 +1,198 @@
-def mint_nft(wallet: str, token_uri: str) -> dict:
-    # Comunicação com contrato via ethers.js wrapper ou API
-    return {
-        "txHash": "0xabc...",
-        "nftId": str(uuid.uuid4())
-    }
+import os
+import uuid
+from datetime import datetime, timezone
+from typing import Any, List, Optional, Sequence, Tuple
+
+from . import abi, chain
+
+# máximo de mints agrupados numa mesma transação (limite de gas do bloco)
+MAX_MINTS_POR_TX = int(os.getenv("EIAH_MINTS_POR_TX", "50"))
+# teto de gas por transação de lote; acima dele o lote é dividido ao meio (bloco de 30M no Hardhat)
+GAS_MAX_TX = int(os.getenv("EIAH_GAS_MAX_TX", "15000000"))
+
+MINT_RESERVA = "mintReservation(uint256,address,uint64,uint64,string)"
+MINT_RESERVA_LOTE = "mintReservationBatch(uint256[],address[],uint64[],uint64[],string[])"
+EVENTO_MINT = abi.topico("ReservationMinted(uint256,uint256,address,uint64,uint64)")
+
+
+def _contrato() -> str:
+    endereco = os.getenv("EIAH_NFT_CONTRATO", "").strip()
+    if not endereco:
+        raise RuntimeError("EIAH_NFT_CONTRATO não configurado (endereço do NFTDiarias).")
+    return endereco
+
+
+def imovel_id(valor: Any) -> int:
+    """imovelId (uint256) do contrato: numérico direto, senão keccak do id textual (ex.: "prop123")."""
+    if valor is None or valor == "":
+        return 0
+    texto = str(valor).strip()
+    return int(texto) if texto.isdigit() else abi.decodificar_uint(abi.keccak256(texto.encode("utf-8")).hex())
+
+
+def epoch(data: Optional[str]) -> int:
+    """"2025-10-01" (ou ISO com hora) -> epoch em segundos, UTC."""
+    if not data:
+        raise ValueError("dataInicio/dataFim obrigatórias para o mint na blockchain.")
+    dt = datetime.fromisoformat(str(data))
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return int(dt.timestamp())
+
+
+def _args_mint(wallet: str, token_uri: str, imovel: Any = None,
+               inicio: Optional[str] = None, fim: Optional[str] = None) -> tuple:
+    return imovel_id(imovel), wallet, epoch(inicio), epoch(fim), token_uri
+
+
+def _calldata_mint(*item: Any) -> str:
+    return abi.chamada(MINT_RESERVA, *_args_mint(*item))
+
+
+def _calldata_lote(args: List[tuple]) -> str:
+    # arrays paralelos: imovelIds[], guests[], startDates[], endDates[], tokenURIs[]
+    return abi.chamada(MINT_RESERVA_LOTE, *[list(coluna) for coluna in zip(*args)])
+
+
+def _eventos(recibo: dict, contrato: str) -> List[Tuple[int, int, str]]:
+    """(tokenId, imovelId, guest) de cada ReservationMinted do recibo, na ordem de emissão."""
+    return [(abi.decodificar_uint(log["topics"][1]), abi.decodificar_uint(log["topics"][2]),
+             "0x" + log["topics"][3][-40:].lower())
+            for log in chain.logs(recibo, EVENTO_MINT, contrato)]
+
+
+def mint_nft(wallet: str, token_uri: str, imovel: Any = None,
+             inicio: Optional[str] = None, fim: Optional[str] = None) -> dict:
+    # Sem EIAH_RPC_URL: emissão simulada (desenvolvimento/testes)
+    if not chain.configurado():
+        return {
+            "txHash": "0xabc...",
+            "nftId": str(uuid.uuid4())
+        }
+    contrato = _contrato()
+    recibo = chain.cliente().transacionar(contrato, _calldata_mint(wallet, token_uri, imovel, inicio, fim))
+    eventos = _eventos(recibo, contrato)
+    if not eventos:
+        raise RuntimeError(f"ReservationMinted ausente no recibo {recibo.get('transactionHash')}")
+    return {"txHash": recibo["transactionHash"], "nftId": str(eventos[0][0])}
+
+
+def _dividir(cli: "chain.ClienteChain", contrato: str, args: List[tuple]) -> List[Tuple[List[tuple], str, int]]:
+    """Blocos (args, calldata, gas) cuja estimativa cabe em GAS_MAX_TX – divide ao meio até caber."""
+    data = _calldata_lote(args)
+    try:
+        gas = cli.estimar_gas(contrato, data)
+    except chain.ErroRPC as e:
+        # lote acima do limite de gas do bloco: o nó recusa a própria estimativa
+        if len(args) == 1 or "gas" not in str(e).lower():
+            raise
+        gas = GAS_MAX_TX + 1
+    if gas <= GAS_MAX_TX or len(args) == 1:
+        return [(args, data, gas)]
+    meio = len(args) // 2
+    print(f"[CHAIN] Lote de {len(args)} mints estimado em {gas} gas; dividindo em {meio} + {len(args) - meio}")
+    return _dividir(cli, contrato, args[:meio]) + _dividir(cli, contrato, args[meio:])
+
+
+def _ids_do_bloco(recibo: dict, contrato: str, args: List[tuple]) -> List[str]:
+    tx_hash = recibo.get("transactionHash")
+    eventos = _eventos(recibo, contrato)
+    if len(eventos) != len(args):
+        raise RuntimeError(f"{len(eventos)} ReservationMinted para {len(args)} itens em {tx_hash}")
+    ids = []
+    for (imovel, wallet, *_), (token_id, ev_imovel, ev_guest) in zip(args, eventos):
+        if ev_imovel != imovel or ev_guest != wallet.lower():
+            raise RuntimeError(f"Evento do token {token_id} não corresponde ao item em {tx_hash}")
+        ids.append(str(token_id))
+    return ids
+
+
+def mint_lote(itens: Sequence[Sequence[Any]]) -> dict:
+    """
+    Mint de vários itens (wallet, tokenURI, imovel, inicio, fim) com mintReservationBatch:
+    um tokenURI por token, N mints por transação. O lote é dividido pelo gas estimado
+    (GAS_MAX_TX); as transações saem em sequência com nonces locais e os recibos são
+    aguardados juntos. Os ids vêm dos eventos ReservationMinted, conferidos item a item
+    (imovelId e guest). "txHashes"/"nftIds" seguem a ordem de `itens` (None onde não mintou).
+
+    Dividido, o lote deixa de ser atômico: "blocos" traz o desfecho de cada transação
+    ({"itens": índices, "txHash", "status", "erro"}) – falha de um bloco não apaga os
+    tokens mintados pelos outros. Status: "minerado"; "revertido" e "erro" (nada mintado);
+    "pendente" (envio sem confirmação, recibo fora do prazo ou eventos que não batem com os
+    itens – pode ter mintado, conferir antes de emitir de novo).
+    """
+    if not chain.configurado():
+        tx_hash = "0xabc..."
+        return {
+            "txHash": tx_hash,
+            "txHashes": [tx_hash] * len(itens),
+            "nftIds": [str(uuid.uuid4()) for _ in itens],
+            "blocos": [{"itens": list(range(len(itens))), "txHash": tx_hash, "status": "minerado"}],
+        }
+    if not itens:
+        return {"txHash": None, "txHashes": [], "nftIds": [], "blocos": []}
+    contrato = _contrato()
+    cli = chain.cliente()
+    args = [_args_mint(*item) for item in itens]
+    divisao = _dividir(cli, contrato, args)  # só estimativas: erro aqui não enviou nada
+
+    blocos, inicio = [], 0
+    for bloco_args, data, gas in divisao:
+        bloco = {"itens": list(range(inicio, inicio + len(bloco_args))), "txHash": None}
+        inicio += len(bloco_args)
+        try:
+            bloco.update({"txHash": cli.enviar(contrato, data, gas=gas), "status": "pendente"})
+        except chain.ResultadoIncerto as e:
+            bloco.update({"status": "pendente", "erro": str(e)})
+        except Exception as e:
+            bloco.update({"status": "erro", "erro": str(e)})
+        blocos.append(bloco)
+    enviados = [b["txHash"] for b in blocos if b["txHash"]]
+    recibos = dict(zip(enviados, cli.aguardar(enviados, exigir_sucesso=False, parcial=True)))
+
+    # revert por falta de gas (reservas mineradas depois da estimativa): nada mintou no
+    # bloco – nova estimativa e um único reenvio
+    reenviados = []
+    for bloco, (_, data, gas) in zip(blocos, divisao):
+        recibo = recibos.get(bloco["txHash"])
+        if recibo is None or not chain.sem_gas(recibo, gas):
+            continue
+        try:
+            novo_gas = cli.estimar_gas(contrato, data, renovar=True)
+            print(f"[CHAIN] {bloco['txHash']} esgotou o gas; reenviando com {novo_gas}")
+            bloco["txHash"] = cli.enviar(contrato, data, gas=novo_gas)
+            reenviados.append(bloco["txHash"])
+        except chain.ResultadoIncerto as e:
+            bloco.update({"txHash": None, "status": "pendente", "erro": str(e)})
+        except Exception as e:
+            print(f"[CHAIN] Reenvio de {bloco['txHash']} falhou: {e}")  # fica o revert original
+    if reenviados:
+        enviados += reenviados
+        recibos.update(zip(reenviados, cli.aguardar(reenviados, exigir_sucesso=False, parcial=True)))
+
+    tx_hashes: List[Optional[str]] = [None] * len(itens)
+    nft_ids: List[Optional[str]] = [None] * len(itens)
+    for bloco in blocos:
+        tx_hash = bloco["txHash"]
+        for k in bloco["itens"]:
+            tx_hashes[k] = tx_hash
+        if tx_hash is None:
+            continue
+        recibo = recibos.get(tx_hash)
+        if recibo is None:
+            bloco.setdefault("erro", f"Transação {tx_hash} sem recibo no prazo")
+            continue
+        if int(recibo.get("status", "0x1"), 16) != 1:
+            bloco.update({"status": "revertido", "erro": str(chain.TransacaoRevertida(recibo))})
+            continue
+        try:
+            ids = _ids_do_bloco(recibo, contrato, [args[k] for k in bloco["itens"]])
+        except RuntimeError as e:
+            # minerada, mas eventos que não batem com os itens: não há id confiável a gravar
+            bloco.update({"status": "pendente", "erro": str(e)})
+            continue
+        for k, token_id in zip(bloco["itens"], ids):
+            nft_ids[k] = token_id
+        bloco["status"] = "minerado"
+    return {"txHash": enviados[0] if enviados else None, "txHashes": tx_hashes, "nftIds": nft_ids, "blocos": blocos}
+
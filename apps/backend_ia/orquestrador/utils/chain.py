@@ -0,0 +1,454 @@
+# apps/backend_ia/orquestrador/utils/chain.py
+"""
+Cliente JSON-RPC da blockchain (mint do NFTDiarias).
+
+- transporte: ClienteHTTP compartilhado (utils/http.py) – conexões keep-alive em pool,
+  novas tentativas em falha de conexão/5xx nas leituras; requisições em lote (JSON-RPC batch);
+- nonce local por remetente: lido uma vez ("pending") e incrementado sob lock, de modo
+  que envios concorrentes não disputem nem repitam nonce;
+- eth_sendTransaction vai sem retry do transporte. Envio sem resposta ou recusado por
+  nonce é conferido no nó (transação do remetente com aquele nonce): se é a nossa, vale
+  o hash encontrado; só com o nonce comprovadamente livre ou usado por outra transação
+  há reenvio. Sem como comprovar, EnvioIncerto – nunca um segundo mint às cegas;
+- recibo que não chega no prazo é TransacaoPendente (com o hash), não "não minerada";
+- estimativas de gas em cache por (remetente, contrato, hash do calldata), com margem e
+  TTL. O custo depende do estado do contrato (ex.: reservas já existentes do imóvel): revert
+  que esgota o gas descarta a estimativa e a transação é reenviada uma vez com gas novo;
+- recibos: uma thread consulta todas as transações pendentes numa única chamada em lote
+  por intervalo, em vez de um polling por transação.
+
+A assinatura fica com o nó (eth_sendTransaction com conta desbloqueada), como no nó de
+desenvolvimento do Hardhat em apps/backend (`npx hardhat node`, contas de teste já
+desbloqueadas).
+
+Variáveis de ambiente:
+  EIAH_RPC_URL           endpoint JSON-RPC (sem ele mint_nft/mint_lote seguem simulados)
+  EIAH_CHAIN_FROM        conta remetente (padrão: eth_accounts[0])
+  EIAH_NFT_CONTRATO      endereço do NFTDiarias implantado
+  EIAH_CHAIN_RECIBO_SEC  intervalo do polling de recibos (padrão 0.5)
+  EIAH_CHAIN_TIMEOUT     espera máxima por recibo em segundos (padrão 120)
+  EIAH_CHAIN_GAS_TTL     validade das estimativas de gas em segundos (padrão 300)
+  EIAH_CHAIN_BUSCA       blocos recentes varridos ao conferir um envio (padrão 64)
+"""
+import hashlib
+import itertools
+import os
+import threading
+import time
+from concurrent.futures import Future, wait
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from . import http
+
+GAS_MARGEM = 1.2  # folga sobre eth_estimateGas (o estado muda entre estimativa e execução)
+# nonce já consumido por outro envio (outro processo na mesma conta); "already known" não entra:
+# é a mesma transação reenviada, e reenviar com outro nonce duplicaria o mint
+ERROS_NONCE = ("nonce too low", "nonce has already been used")
+
+
+class ErroRPC(RuntimeError):
+    def __init__(self, metodo: str, erro: Dict[str, Any]):
+        super().__init__(f"{metodo}: {erro.get('message', erro)}")
+        self.codigo = erro.get("code")
+        self.dados = erro.get("data")
+
+
+class TransacaoRevertida(RuntimeError):
+    def __init__(self, recibo: Dict[str, Any]):
+        super().__init__(f"Transação {recibo.get('transactionHash')} revertida (status 0x0)")
+        self.recibo = recibo
+
+
+class ResultadoIncerto(RuntimeError):
+    """A transação pode ter sido (ou ainda ser) minerada: não reenviar nem dar como falha."""
+    tx_hashes: List[str] = []
+
+
+class EnvioIncerto(ResultadoIncerto):
+    def __init__(self, tx: Dict[str, Any], causa: Exception):
+        super().__init__(f"Envio com nonce {int(tx['nonce'], 16)} sem confirmação do nó ({causa}); não reenviado")
+        self.tx = tx
+        self.tx_hashes = []
+
+
+class TransacaoPendente(ResultadoIncerto, TimeoutError):
+    def __init__(self, tx_hashes: Sequence[str], timeout: float):
+        super().__init__(f"{len(tx_hashes)} transação(ões) sem recibo após {timeout:.0f}s: {', '.join(tx_hashes)}")
+        self.tx_hashes = list(tx_hashes)
+
+
+def _hex(n: int) -> str:
+    return hex(int(n))
+
+
+class ClienteRPC:
+    def __init__(self, url: str, transporte: Optional[http.ClienteHTTP] = None):
+        self.url = url
+        self._transporte = transporte
+        self._ids = itertools.count(1)
+
+    @property
+    def transporte(self) -> http.ClienteHTTP:
+        return self._transporte or http.cliente()
+
+    def chamar(self, metodo: str, params: Sequence[Any] = (), repetir: bool = True) -> Any:
+        """`repetir=False`: uma única tentativa no transporte (chamadas que não são idempotentes)."""
+        r = self.transporte.post_json(self.url, {"jsonrpc": "2.0", "id": next(self._ids),
+                                                 "method": metodo, "params": list(params)},
+                                      tentativas=None if repetir else 1)
+        if not isinstance(r.corpo, dict):
+            raise ConnectionError(f"Resposta JSON-RPC inválida de {self.url}")
+        if r.corpo.get("error"):
+            raise ErroRPC(metodo, r.corpo["error"])
+        return r.corpo.get("result")
+
+    def lote(self, chamadas: Sequence[Tuple[str, Sequence[Any]]]) -> List[Any]:
+        """
+        Várias chamadas numa requisição (JSON-RPC batch). Resultados na ordem de `chamadas`;
+        a posição de uma chamada com erro recebe a ErroRPC (não levanta).
+        """
+        if not chamadas:
+            return []
+        ids = [next(self._ids) for _ in chamadas]
+        r = self.transporte.post_json(self.url, [
+            {"jsonrpc": "2.0", "id": i, "method": m, "params": list(p)} for i, (m, p) in zip(ids, chamadas)])
+        if not isinstance(r.corpo, list):
+            raise ConnectionError(f"Resposta de lote JSON-RPC inválida de {self.url}")
+        por_id = {item.get("id"): item for item in r.corpo}
+        saida = []
+        for i, (metodo, _) in zip(ids, chamadas):
+            item = por_id.get(i) or {"error": {"message": "sem resposta no lote"}}
+            saida.append(ErroRPC(metodo, item["error"]) if item.get("error") else item.get("result"))
+        return saida
+
+
+class GerenciadorNonce:
+    """Próximo nonce por remetente, atribuído localmente (um único eth_getTransactionCount)."""
+
+    def __init__(self, rpc: ClienteRPC):
+        self.rpc = rpc
+        self._proximo: Dict[str, int] = {}
+        self._locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    def _lock_de(self, endereco: str) -> threading.Lock:
+        with self._lock:
+            return self._locks.setdefault(endereco, threading.Lock())
+
+    def reservar(self, endereco: str) -> int:
+        endereco = endereco.lower()
+        with self._lock_de(endereco):
+            if endereco not in self._proximo:
+                self._proximo[endereco] = int(self.rpc.chamar("eth_getTransactionCount", [endereco, "pending"]), 16)
+            nonce = self._proximo[endereco]
+            self._proximo[endereco] = nonce + 1
+            return nonce
+
+    def ressincronizar(self, endereco: str):
+        """Descarta o contador: o próximo reservar() relê o nonce "pending" do nó."""
+        endereco = endereco.lower()
+        with self._lock_de(endereco):
+            self._proximo.pop(endereco, None)
+
+
+class CacheGas:
+    def __init__(self, rpc: ClienteRPC, ttl_sec: float = 300.0, margem: float = GAS_MARGEM):
+        self.rpc = rpc
+        self.ttl_sec = ttl_sec
+        self.margem = margem
+        self._cache: Dict[Tuple[str, str, str], Tuple[int, float]] = {}
+        self._locks: Dict[Tuple[str, str, str], threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _chave(tx: Dict[str, Any]) -> Tuple[str, str, str]:
+        # calldata inteiro: argumentos diferentes (outro imóvel, outras datas) custam gas diferente
+        data = (tx.get("data") or "0x").lower()
+        return (str(tx.get("from", "")).lower(), str(tx.get("to", "")).lower(),
+                hashlib.sha256(data.encode()).hexdigest())
+
+    def estimar(self, tx: Dict[str, Any]) -> int:
+        chave = self._chave(tx)
+        with self._lock:
+            lock = self._locks.setdefault(chave, threading.Lock())
+        with lock:  # envios simultâneos da mesma chamada esperam uma única estimativa
+            hit = self._cache.get(chave)
+            if hit and hit[1] > time.monotonic():
+                return hit[0]
+            gas = int(int(self.rpc.chamar("eth_estimateGas", [tx]), 16) * self.margem)
+            self._guardar(chave, gas)
+            return gas
+
+    def _guardar(self, chave: Tuple[str, str, str], gas: int):
+        agora = time.monotonic()
+        with self._lock:
+            self._cache[chave] = (gas, agora + self.ttl_sec)
+            if len(self._cache) > 1024:  # uma entrada por calldata: descarta as vencidas
+                for k in [k for k, (_, validade) in self._cache.items() if validade <= agora]:
+                    del self._cache[k]
+                    self._locks.pop(k, None)
+
+    def invalidar(self, tx: Optional[Dict[str, Any]] = None):
+        """Descarta a estimativa de `tx` (todas, sem `tx`)."""
+        with self._lock:
+            if tx is None:
+                self._cache.clear()
+                self._locks.clear()
+            else:
+                self._cache.pop(self._chave(tx), None)
+
+
+class MonitorRecibos:
+    """Polling em lote: cada volta pede os recibos de todas as transações pendentes de uma vez."""
+
+    def __init__(self, rpc: ClienteRPC, intervalo_sec: float = 0.5):
+        self.rpc = rpc
+        self.intervalo_sec = intervalo_sec
+        self._pendentes: Dict[str, List[Future]] = {}
+        self._lock = threading.Lock()
+        self._parar = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def acompanhar(self, tx_hash: str) -> Future:
+        fut: Future = Future()
+        with self._lock:
+            self._pendentes.setdefault(tx_hash, []).append(fut)
+            if self._thread is None or not self._thread.is_alive():
+                self._parar.clear()
+                self._thread = threading.Thread(target=self._loop, name="eiah-recibos", daemon=True)
+                self._thread.start()
+        return fut
+
+    def aguardar(self, tx_hashes: Sequence[str], timeout: float, parcial: bool = False) -> List[Optional[Dict[str, Any]]]:
+        """Recibos na ordem de `tx_hashes`. No prazo esgotado: TransacaoPendente (parcial: None no lugar)."""
+        futuros = [self.acompanhar(h) for h in tx_hashes]
+        _, faltando = wait(futuros, timeout=timeout)
+        if faltando:
+            with self._lock:  # desiste delas: não seguem no polling
+                for h, f in zip(tx_hashes, futuros):
+                    if f in faltando and f in self._pendentes.get(h, []):
+                        self._pendentes[h].remove(f)
+                        if not self._pendentes[h]:
+                            del self._pendentes[h]
+            if not parcial:
+                raise TransacaoPendente([h for h, f in zip(tx_hashes, futuros) if f in faltando], timeout)
+        return [None if f in faltando else f.result() for f in futuros]
+
+    def _loop(self):
+        while not self._parar.wait(self.intervalo_sec):
+            with self._lock:
+                hashes = list(self._pendentes)
+                if not hashes:
+                    self._thread = None  # nada pendente: a thread termina e renasce no próximo acompanhar()
+                    return
+            try:
+                recibos = self.rpc.lote([("eth_getTransactionReceipt", [h]) for h in hashes])
+            except Exception as e:
+                print(f"[CHAIN] Polling de {len(hashes)} recibo(s) falhou: {e}")
+                continue
+            for h, recibo in zip(hashes, recibos):
+                if recibo is None or isinstance(recibo, ErroRPC):
+                    continue
+                with self._lock:
+                    futuros = self._pendentes.pop(h, [])
+                for f in futuros:
+                    f.set_result(recibo)
+
+    def parar(self):
+        self._parar.set()
+        with self._lock:
+            pendentes, self._pendentes = self._pendentes, {}
+            self._thread = None
+        for futuros in pendentes.values():
+            for f in futuros:
+                f.cancel()
+
+
+class ClienteChain:
+    def __init__(self, url: str, remetente: Optional[str] = None, intervalo_recibo: float = 0.5,
+                 timeout_recibo: float = 120.0, gas_ttl: float = 300.0, busca_blocos: int = 64):
+        self.rpc = ClienteRPC(url)
+        self.busca_blocos = busca_blocos
+        self.nonces = GerenciadorNonce(self.rpc)
+        self.gas = CacheGas(self.rpc, gas_ttl)
+        self.recibos = MonitorRecibos(self.rpc, intervalo_recibo)
+        self.timeout_recibo = timeout_recibo
+        self._remetente = remetente
+        self._lock = threading.Lock()
+
+    @property
+    def remetente(self) -> str:
+        with self._lock:
+            if not self._remetente:
+                contas = self.rpc.chamar("eth_accounts")
+                if not contas:
+                    raise RuntimeError("Nó sem contas desbloqueadas; defina EIAH_CHAIN_FROM.")
+                self._remetente = contas[0]
+            return self._remetente
+
+    def call(self, para: str, data: str, bloco: str = "latest") -> str:
+        return self.rpc.chamar("eth_call", [{"to": para, "data": data}, bloco])
+
+    def estimar_gas(self, para: str, data: str, valor: int = 0, renovar: bool = False) -> int:
+        """Estimativa com margem (cache); `renovar` descarta a do cache e consulta o nó."""
+        tx: Dict[str, Any] = {"from": self.remetente, "to": para, "data": data}
+        if valor:
+            tx["value"] = _hex(valor)
+        if renovar:
+            self.gas.invalidar(tx)
+        return self.gas.estimar(tx)
+
+    def _localizar(self, remetente: str, nonce: int) -> Optional[Dict[str, Any]]:
+        """Transação de `remetente` com `nonce` no bloco pendente ou nos últimos `busca_blocos` blocos."""
+        topo = int(self.rpc.chamar("eth_blockNumber"), 16)
+        blocos = self.rpc.lote([("eth_getBlockByNumber", ["pending", True])] + [
+            ("eth_getBlockByNumber", [_hex(n), True]) for n in range(topo, max(-1, topo - self.busca_blocos), -1)])
+        for bloco in blocos:
+            if not isinstance(bloco, dict):
+                continue
+            for t in bloco.get("transactions") or []:
+                if (isinstance(t, dict) and str(t.get("from", "")).lower() == remetente.lower()
+                        and int(t.get("nonce", "0x0"), 16) == nonce):
+                    return t
+        return None
+
+    def _conferir_envio(self, tx: Dict[str, Any], causa: Exception) -> Optional[str]:
+        """
+        Envio sem resposta ou recusado por nonce: a transação com este nonce já está no nó?
+        Devolve o hash se é a nossa; None se o nonce segue livre ou foi usado por outra
+        transação (reenviar é seguro). Sem como saber: EnvioIncerto.
+        """
+        nonce = int(tx["nonce"], 16)
+        try:
+            achada = self._localizar(tx["from"], nonce)
+            if achada:
+                dados = (achada.get("input") or achada.get("data") or "").lower()
+                if dados == tx["data"].lower() and str(achada.get("to", "")).lower() == tx["to"].lower():
+                    return achada["hash"]
+                return None
+            if isinstance(causa, ErroRPC):
+                # recusada por nonce e ausente dos blocos recentes: a nossa, aceita agora, estaria
+                # lá – o nonce é de outra transação antiga (contador local velho)
+                return None
+            if int(self.rpc.chamar("eth_getTransactionCount", [tx["from"], "pending"]), 16) <= nonce:
+                return None  # nonce não consumido: a transação não entrou
+        except Exception as e:
+            print(f"[CHAIN] Conferência do nonce {nonce} falhou: {e}")
+        raise EnvioIncerto(tx, causa)
+
+    def enviar(self, para: str, data: str, valor: int = 0, gas: Optional[int] = None) -> str:
+        """eth_sendTransaction com gas (cache) e nonce (local). Devolve o hash da transação."""
+        tx: Dict[str, Any] = {"from": self.remetente, "to": para, "data": data}
+        if valor:
+            tx["value"] = _hex(valor)
+        tx["gas"] = _hex(gas or self.estimar_gas(para, data, valor))  # antes do nonce: revert não abre lacuna
+        for tentativa in range(2):
+            tx["nonce"] = _hex(self.nonces.reservar(tx["from"]))
+            try:
+                # sem retry do transporte: repetir o POST pode minerar a mesma chamada duas vezes
+                return self.rpc.chamar("eth_sendTransaction", [tx], repetir=False)
+            except ErroRPC as e:
+                if not any(m in str(e).lower() for m in ERROS_NONCE):
+                    self.nonces.ressincronizar(tx["from"])  # recusada pelo nó: o nonce não foi usado
+                    raise
+                # nonce ocupado: por esta mesma transação (resposta perdida) ou por outro processo
+                try:
+                    tx_hash = self._conferir_envio(tx, e)
+                finally:
+                    self.nonces.ressincronizar(tx["from"])
+                if tx_hash:
+                    return tx_hash
+                if tentativa == 0:
+                    print(f"[CHAIN] {e}; nonce ressincronizado")
+                    continue
+                raise
+            except Exception as e:
+                # sem resposta (conexão caiu, timeout): a transação pode ter chegado ao nó
+                try:
+                    tx_hash = self._conferir_envio(tx, e)
+                finally:
+                    self.nonces.ressincronizar(tx["from"])
+                if tx_hash:
+                    return tx_hash
+                raise
+        raise AssertionError("inalcançável")
+
+    def aguardar(self, tx_hashes: Sequence[str], timeout: Optional[float] = None,
+                 exigir_sucesso: bool = True, parcial: bool = False) -> List[Optional[Dict[str, Any]]]:
+        recibos = self.recibos.aguardar(tx_hashes, timeout or self.timeout_recibo, parcial)
+        if exigir_sucesso:
+            for r in recibos:
+                if r is not None and int(r.get("status", "0x1"), 16) != 1:
+                    raise TransacaoRevertida(r)
+        return recibos
+
+    def transacionar(self, para: str, data: str, valor: int = 0, gas: Optional[int] = None) -> Dict[str, Any]:
+        """
+        enviar() + aguardar() do recibo (status 0x1). Sem recibo no prazo: TransacaoPendente.
+        Revert por falta de gas com a estimativa do cache (estado do contrato mudou): nada foi
+        executado – nova estimativa e um único reenvio.
+        """
+        limite = gas or self.estimar_gas(para, data, valor)
+        recibo = self.aguardar([self.enviar(para, data, valor, limite)], exigir_sucesso=False)[0]
+        if gas is None and sem_gas(recibo, limite):
+            limite = self.estimar_gas(para, data, valor, renovar=True)
+            print(f"[CHAIN] {recibo.get('transactionHash')} esgotou o gas; reenviando com {limite}")
+            recibo = self.aguardar([self.enviar(para, data, valor, limite)], exigir_sucesso=False)[0]
+        if int(recibo.get("status", "0x1"), 16) != 1:
+            self.gas.invalidar({"from": self.remetente, "to": para, "data": data})
+            raise TransacaoRevertida(recibo)
+        return recibo
+
+    def encerrar(self):
+        self.recibos.parar()
+
+
+def sem_gas(recibo: Dict[str, Any], gas: int) -> bool:
+    """Revertida consumindo todo o gas enviado: estimativa velha, não recusa do contrato."""
+    return int(recibo.get("status", "0x1"), 16) != 1 and int(recibo.get("gasUsed", "0x0"), 16) >= gas
+
+
+def logs(recibo: Dict[str, Any], topico0: str, endereco: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Logs do recibo com topics[0] == topico0 (e emitidos por `endereco`, se informado)."""
+    return [
+        log for log in recibo.get("logs") or []
+        if log.get("topics") and log["topics"][0].lower() == topico0.lower()
+        and (endereco is None or log.get("address", "").lower() == endereco.lower())
+    ]
+
+
+_cliente: Optional[ClienteChain] = None
+_cliente_lock = threading.Lock()
+
+
+def configurado() -> bool:
+    return bool(os.getenv("EIAH_RPC_URL"))
+
+
+def cliente() -> ClienteChain:
+    """Cliente do processo para EIAH_RPC_URL (recriado se a URL mudar)."""
+    global _cliente
+    url = os.getenv("EIAH_RPC_URL")
+    if not url:
+        raise RuntimeError("EIAH_RPC_URL não configurada.")
+    with _cliente_lock:
+        if _cliente is None or _cliente.rpc.url != url:
+            if _cliente is not None:
+                _cliente.encerrar()
+            _cliente = ClienteChain(
+                url,
+                remetente=os.getenv("EIAH_CHAIN_FROM") or None,
+                intervalo_recibo=float(os.getenv("EIAH_CHAIN_RECIBO_SEC", "0.5")),
+                timeout_recibo=float(os.getenv("EIAH_CHAIN_TIMEOUT", "120")),
+                gas_ttl=float(os.getenv("EIAH_CHAIN_GAS_TTL", "300")),
+                busca_blocos=int(os.getenv("EIAH_CHAIN_BUSCA", "64")),
+            )
+        return _cliente
+
+
+def encerrar():
+    global _cliente
+    with _cliente_lock:
+        if _cliente is not None:
+            _cliente.encerrar()
+            _cliente = None
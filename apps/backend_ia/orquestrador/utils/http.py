@@ -0,0 +1,280 @@
+# apps/backend_ia/orquestrador/utils/http.py
+"""
+Cliente HTTP compartilhado pelos conectores de dados de mercado.
+
+- pool de conexões keep-alive por host (http.client, sem dependência externa);
+- novas tentativas com backoff exponencial + jitter em falha de conexão, 429 e 5xx
+  (respeita Retry-After);
+- GET condicional (If-None-Match / If-Modified-Since): 304 volta como status, não erro;
+- limite de requisições por segundo por host;
+- redirecionamentos (até MAX_REDIRECTS);
+- POST (corpo em bytes ou JSON), repetido nas mesmas condições – use só em chamadas
+  idempotentes (ex.: gravação endereçada por conteúdo, leituras JSON-RPC); as demais
+  passam `tentativas=1`.
+
+Variáveis de ambiente:
+  EIAH_HTTP_POR_HOST    conexões ociosas guardadas por host (padrão 8)
+  EIAH_HTTP_TENTATIVAS  tentativas por requisição (padrão 3)
+  EIAH_HTTP_TAXA        requisições/s por host, 0 = sem limite (padrão 0)
+  EIAH_HTTP_TIMEOUT     timeout de conexão/leitura em segundos (padrão 30)
+"""
+import http.client
+import json
+import os
+import random
+import ssl
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from urllib.parse import urljoin, urlsplit
+
+MAX_REDIRECTS = 5
+REPETIR_STATUS = {429, 500, 502, 503, 504}
+USER_AGENT = "EIAH-Orquestrador/1.0"
+
+
+class ErroHTTP(Exception):
+    def __init__(self, status: int, url: str, motivo: str = ""):
+        super().__init__(f"HTTP {status} em {url} {motivo}".strip())
+        self.status = status
+        self.url = url
+
+
+@dataclass
+class Resposta:
+    status: int
+    headers: Dict[str, str]   # nomes em minúsculas
+    url: str                  # final, depois de redirecionamentos
+    corpo: Any = None         # bytes em get(); http.client.HTTPResponse em abrir()
+
+    @property
+    def etag(self) -> Optional[str]:
+        return self.headers.get("etag")
+
+    @property
+    def last_modified(self) -> Optional[str]:
+        return self.headers.get("last-modified")
+
+
+def condicional(etag: Optional[str] = None, last_modified: Optional[str] = None) -> Dict[str, str]:
+    """Cabeçalhos de GET condicional a partir do que foi guardado da última resposta."""
+    h = {}
+    if etag:
+        h["If-None-Match"] = etag
+    if last_modified:
+        h["If-Modified-Since"] = last_modified
+    return h
+
+
+class _Limitador:
+    """Intervalo mínimo entre inícios de requisição ao mesmo host."""
+
+    def __init__(self, taxa: float):
+        self.intervalo = 1.0 / taxa if taxa > 0 else 0.0
+        self.proximo = 0.0
+        self.lock = threading.Lock()
+
+    def aguardar(self):
+        if not self.intervalo:
+            return
+        with self.lock:
+            agora = time.monotonic()
+            espera = self.proximo - agora
+            self.proximo = max(agora, self.proximo) + self.intervalo
+        if espera > 0:
+            time.sleep(espera)
+
+
+class ClienteHTTP:
+    def __init__(
+        self,
+        max_por_host: int = 8,
+        tentativas: int = 3,
+        backoff: float = 0.5,
+        taxa_por_host: float = 0.0,
+        timeout: float = 30.0,
+    ):
+        self.max_por_host = max_por_host
+        self.tentativas = max(1, tentativas)
+        self.backoff = backoff
+        self.taxa_por_host = taxa_por_host
+        self.timeout = timeout
+        self._ociosas: Dict[Tuple[str, str, int], List[http.client.HTTPConnection]] = {}
+        self._limitadores: Dict[str, _Limitador] = {}
+        self._lock = threading.Lock()
+        self._ssl = ssl.create_default_context()
+
+    # ---------------- pool ----------------
+
+    @staticmethod
+    def _chave(url: str) -> Tuple[Tuple[str, str, int], str]:
+        p = urlsplit(url)
+        if p.scheme not in ("http", "https"):
+            raise ValueError(f"URL não suportada: {url}")
+        porta = p.port or (443 if p.scheme == "https" else 80)
+        alvo = (p.path or "/") + (f"?{p.query}" if p.query else "")
+        return (p.scheme, p.hostname, porta), alvo
+
+    def _pegar(self, chave) -> http.client.HTTPConnection:
+        with self._lock:
+            livres = self._ociosas.get(chave)
+            if livres:
+                return livres.pop()
+        esquema, host, porta = chave
+        if esquema == "https":
+            return http.client.HTTPSConnection(host, porta, timeout=self.timeout, context=self._ssl)
+        return http.client.HTTPConnection(host, porta, timeout=self.timeout)
+
+    def _devolver(self, chave, conn: http.client.HTTPConnection):
+        with self._lock:
+            livres = self._ociosas.setdefault(chave, [])
+            if len(livres) < self.max_por_host:
+                livres.append(conn)
+                return
+        conn.close()
+
+    def _limitador(self, host: str) -> _Limitador:
+        with self._lock:
+            if host not in self._limitadores:
+                self._limitadores[host] = _Limitador(self.taxa_por_host)
+            return self._limitadores[host]
+
+    def fechar(self):
+        with self._lock:
+            conns = [c for livres in self._ociosas.values() for c in livres]
+            self._ociosas.clear()
+        for c in conns:
+            c.close()
+
+    # ---------------- requisição ----------------
+
+    def _espera(self, tentativa: int, retry_after: Optional[str]) -> float:
+        if retry_after:
+            try:
+                return min(float(retry_after), 60.0)
+            except ValueError:
+                try:
+                    return max(0.0, min(parsedate_to_datetime(retry_after).timestamp() - time.time(), 60.0))
+                except (TypeError, ValueError):
+                    pass
+        return self.backoff * (2 ** tentativa) * (0.5 + random.random() / 2)
+
+    def _enviar(self, url: str, headers: Dict[str, str], metodo: str = "GET", corpo: Optional[bytes] = None,
+                tentativas: Optional[int] = None):
+        """Uma requisição (com novas tentativas). Devolve (chave, conexão, HTTPResponse)."""
+        chave, alvo = self._chave(url)
+        cab = {"User-Agent": USER_AGENT, "Accept-Encoding": "identity", **headers}
+        ultimo_erro: Optional[Exception] = None
+        tentativas = max(1, tentativas or self.tentativas)
+        for tentativa in range(tentativas):
+            self._limitador(chave[1]).aguardar()
+            conn = self._pegar(chave)
+            try:
+                conn.request(metodo, alvo, body=corpo, headers=cab)
+                resp = conn.getresponse()
+            except (http.client.HTTPException, OSError) as e:
+                # conexão keep-alive fechada pelo servidor, reset, timeout...
+                conn.close()
+                ultimo_erro = e
+                if tentativa + 1 < tentativas:
+                    time.sleep(self._espera(tentativa, None))
+                continue
+            if resp.status in REPETIR_STATUS and tentativa + 1 < tentativas:
+                retry_after = resp.getheader("Retry-After")
+                resp.read()
+                self._devolver(chave, conn) if not resp.will_close else conn.close()
+                print(f"[HTTP] {resp.status} em {url}; nova tentativa ({tentativa + 2}/{tentativas})")
+                time.sleep(self._espera(tentativa, retry_after))
+                continue
+            return chave, conn, resp
+        raise ConnectionError(f"Falha ao acessar {url}: {ultimo_erro}")
+
+    @contextmanager
+    def abrir(self, url: str, headers: Optional[Dict[str, str]] = None, metodo: str = "GET",
+              corpo: Optional[bytes] = None, tentativas: Optional[int] = None) -> Iterator[Resposta]:
+        """
+        Requisição em streaming: `resposta.corpo` é o HTTPResponse (use .read(n)). 304 vem
+        como status; demais >= 400 levantam ErroHTTP. A conexão volta ao pool se o corpo foi
+        lido até o fim, senão é fechada. Fora do GET só 307/308 são seguidos (mantêm o corpo).
+        """
+        headers = dict(headers or {})
+        redirecionar = (301, 302, 303, 307, 308) if metodo == "GET" else (307, 308)
+        for _ in range(MAX_REDIRECTS + 1):
+            chave, conn, resp = self._enviar(url, headers, metodo, corpo, tentativas)
+            if resp.status in redirecionar and resp.getheader("Location"):
+                resp.read()
+                self._devolver(chave, conn) if not resp.will_close else conn.close()
+                url = urljoin(url, resp.getheader("Location"))
+                continue
+            break
+        else:
+            raise ErroHTTP(310, url, "(redirecionamentos demais)")
+
+        cab = {k.lower(): v for k, v in resp.getheaders()}
+        try:
+            if resp.status >= 400:
+                resp.read()
+                raise ErroHTTP(resp.status, url, resp.reason)
+            yield Resposta(resp.status, cab, url, resp)
+        finally:
+            if resp.isclosed() and not resp.will_close:
+                self._devolver(chave, conn)
+            else:
+                conn.close()
+
+    def get(self, url: str, headers: Optional[Dict[str, str]] = None) -> Resposta:
+        """GET com corpo inteiro em memória (bytes; b"" em 304)."""
+        with self.abrir(url, headers) as r:
+            corpo = r.corpo.read()
+        return Resposta(r.status, r.headers, r.url, corpo)
+
+    def get_json(self, url: str, headers: Optional[Dict[str, str]] = None) -> Resposta:
+        r = self.get(url, {"Accept": "application/json", **(headers or {})})
+        r.corpo = json.loads(r.corpo.decode("utf-8")) if r.status == 200 and r.corpo else None
+        return r
+
+    def post(self, url: str, corpo: bytes, headers: Optional[Dict[str, str]] = None,
+             tentativas: Optional[int] = None) -> Resposta:
+        """POST com corpo inteiro em memória (ida e volta)."""
+        with self.abrir(url, {"Content-Length": str(len(corpo)), **(headers or {})}, "POST", corpo,
+                        tentativas) as r:
+            dados = r.corpo.read()
+        return Resposta(r.status, r.headers, r.url, dados)
+
+    def post_json(self, url: str, dados: Any, headers: Optional[Dict[str, str]] = None,
+                  tentativas: Optional[int] = None) -> Resposta:
+        corpo = json.dumps(dados, separators=(",", ":")).encode("utf-8")
+        r = self.post(url, corpo, {"Content-Type": "application/json", "Accept": "application/json",
+                                   **(headers or {})}, tentativas)
+        r.corpo = json.loads(r.corpo.decode("utf-8")) if r.corpo else None
+        return r
+
+
+_cliente: Optional[ClienteHTTP] = None
+_cliente_lock = threading.Lock()
+
+
+def cliente() -> ClienteHTTP:
+    """Cliente do processo (criado na 1ª chamada a partir das variáveis de ambiente)."""
+    global _cliente
+    if _cliente is None:
+        with _cliente_lock:
+            if _cliente is None:
+                _cliente = ClienteHTTP(
+                    max_por_host=int(os.getenv("EIAH_HTTP_POR_HOST", "8")),
+                    tentativas=int(os.getenv("EIAH_HTTP_TENTATIVAS", "3")),
+                    taxa_por_host=float(os.getenv("EIAH_HTTP_TAXA", "0")),
+                    timeout=float(os.getenv("EIAH_HTTP_TIMEOUT", "30")),
+                )
+    return _cliente
+
+
+def encerrar():
+    global _cliente
+    with _cliente_lock:
+        if _cliente is not None:
+            _cliente.fechar()
+            _cliente = None
@@ -1,6 +1,387 @@
+# apps/backend_ia/orquestrador/utils/ipfs.py
+"""
+Camada IPFS endereçada por conteúdo.
+
+O CID é calculado aqui mesmo (CIDv1, codec raw, sha2-256, base32 "b..."), igual ao que
+um nó IPFS devolve para o mesmo bloco em `block/put --cid-codec=raw`: metadata ou imagem
+idêntica gera o mesmo CID e é gravada uma vez só. A metadata é serializada em JSON
+canônico (chaves ordenadas), então NFTs com a mesma descrição/regras/imagem compartilham
+o bloco.
+
+Blocos ficam em DATA_DIR/ipfs/blocos/<2 últimos chars>/<cid>, com índice LRU em memória
+limitado a EIAH_IPFS_MAX_MB: só blocos já pinados no nó remoto são despejados (e voltam
+pelo gateway quando pedidos). A fila de pinagem é uma tabela SQLite: uma thread em
+segundo plano envia os pendentes em lotes (um POST multipart com vários blocos) e
+reagenda os que falham com backoff exponencial.
+
+Variáveis de ambiente:
+  EIAH_IPFS_API       RPC do nó de pinagem (ex.: http://127.0.0.1:5001); sem ela, só local
+  EIAH_IPFS_GATEWAY   gateway para ler blocos despejados (ex.: https://ipfs.io)
+  EIAH_IPFS_MAX_MB    tamanho máximo do blockstore local (padrão 512)
+  EIAH_IPFS_LOTE      blocos por envio (padrão 64)
+"""
+import base64
+import hashlib
+import json
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from . import http
+from .paths import DATA_DIR
+from .sqlite import PorArquivo, StoreSQLite
+
+DIR = DATA_DIR / "ipfs"
+MAX_BYTES = int(float(os.getenv("EIAH_IPFS_MAX_MB", "512")) * (1 << 20))
+MAX_BLOCO = 1 << 20  # limite de bloco dos nós IPFS (bitswap)
+LOTE_MAX = int(os.getenv("EIAH_IPFS_LOTE", "64"))
+BACKOFF_SEC = 5.0
+BACKOFF_MAX_SEC = 3600.0
+
+CODEC_RAW = 0x55
+SHA2_256 = 0x12
+
+
+def _varint(n: int) -> bytes:
+    saida = bytearray()
+    while True:
+        byte, n = n & 0x7F, n >> 7
+        saida.append(byte | (0x80 if n else 0))
+        if not n:
+            return bytes(saida)
+
+
+def calcular_cid(dados: bytes) -> str:
+    """CIDv1 (raw, sha2-256) em multibase base32 minúsculo."""
+    digest = hashlib.sha256(dados).digest()
+    binario = _varint(1) + _varint(CODEC_RAW) + _varint(SHA2_256) + _varint(len(digest)) + digest
+    return "b" + base64.b32encode(binario).decode("ascii").lower().rstrip("=")
+
+
+def json_canonico(obj: Any) -> bytes:
+    return json.dumps(obj, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str).encode("utf-8")
+
+
+class BlockStore(StoreSQLite):
+    def __init__(self, pasta: Path, max_bytes: int = MAX_BYTES):
+        self.pasta = Path(pasta)
+        self.max_bytes = max_bytes
+        (self.pasta / "blocos").mkdir(parents=True, exist_ok=True)
+        super().__init__(self.pasta / "pins.sqlite3", threading.RLock())
+        self._lru: "OrderedDict[str, int]" = OrderedDict()  # cid -> tamanho (mais antigo primeiro)
+        self._total = 0
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS pins ("
+            " cid TEXT PRIMARY KEY, tamanho INTEGER NOT NULL, status TEXT NOT NULL,"
+            " tentativas INTEGER NOT NULL DEFAULT 0, proximo_em REAL NOT NULL DEFAULT 0, erro TEXT,"
+            " criado_em REAL NOT NULL, pinado_em REAL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS pins_fila ON pins (status, proximo_em)")
+        self._carregar()
+
+    def _caminho(self, cid: str) -> Path:
+        return self.pasta / "blocos" / cid[-2:] / cid
+
+    def _carregar(self):
+        """Reconstrói o LRU a partir do disco (recência = mtime, renovado a cada leitura)."""
+        blocos = []
+        for p in (self.pasta / "blocos").glob("*/*"):
+            if p.name.startswith("."):
+                continue
+            st = p.stat()
+            blocos.append((st.st_mtime, p.name, st.st_size))
+        for _, cid, tamanho in sorted(blocos):
+            self._lru[cid] = tamanho
+            self._total += tamanho
+
+    def _tocar(self, cid: str):
+        self._lru.move_to_end(cid)
+        try:
+            os.utime(self._caminho(cid))
+        except FileNotFoundError:
+            pass
+
+    def _despejar(self):
+        """Remove os blocos menos usados até caber em max_bytes (só os já pinados)."""
+        if self._total <= self.max_bytes:
+            return
+        pinados = {r[0] for r in self._conn.execute("SELECT cid FROM pins WHERE status = 'pinado'")}
+        for cid in list(self._lru):
+            if self._total <= self.max_bytes:
+                break
+            if cid not in pinados:
+                continue
+            self._caminho(cid).unlink(missing_ok=True)
+            self._total -= self._lru.pop(cid)
+
+    # ---- API ----
+    def _gravar(self, dados: bytes, pinar: bool) -> Tuple[str, bool]:
+        """Grava o bloco (chamado com o lock). Devolve (cid, novo)."""
+        cid = calcular_cid(dados)
+        if cid in self._lru:  # deduplicado: mesmo conteúdo já está no blockstore
+            self._tocar(cid)
+            return cid, False
+        path = self._caminho(cid)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f".{cid}.{uuid.uuid4().hex}.tmp")
+        tmp.write_bytes(dados)
+        os.replace(tmp, path)
+        # linha da fila antes do LRU: sem ela o bloco nunca seria pinado (nem despejado)
+        try:
+            self._conn.execute(
+                "INSERT OR IGNORE INTO pins (cid, tamanho, status, criado_em) VALUES (?, ?, ?, ?)",
+                (cid, len(dados), "pendente" if pinar else "local", time.time()))
+        except BaseException:
+            path.unlink(missing_ok=True)
+            raise
+        self._lru[cid] = len(dados)
+        self._total += len(dados)
+        return cid, True
+
+    def _descartar(self, cid: str):
+        self._caminho(cid).unlink(missing_ok=True)
+        self._total -= self._lru.pop(cid, 0)
+
+    def adicionar(self, dados: bytes, pinar: bool = True) -> str:
+        if len(dados) > MAX_BLOCO:
+            raise ValueError(f"Bloco de {len(dados)} bytes excede {MAX_BLOCO} (limite de bloco IPFS).")
+        with self._lock:
+            cid, _ = self._gravar(dados, pinar)
+            self._despejar()
+        return cid
+
+    def adicionar_lote(self, blocos: List[bytes], pinar: bool = True) -> List[str]:
+        """
+        adicionar() de vários blocos com os INSERTs da fila numa única transação. No
+        ROLLBACK os blocos novos do lote saem do disco e do LRU junto com as linhas da fila.
+        """
+        for dados in blocos:  # valida antes de gravar qualquer bloco
+            if len(dados) > MAX_BLOCO:
+                raise ValueError(f"Bloco de {len(dados)} bytes excede {MAX_BLOCO} (limite de bloco IPFS).")
+        with self._lock:
+            cids: List[str] = []
+            novos: List[str] = []
+            self._conn.execute("BEGIN")
+            try:
+                for dados in blocos:
+                    cid, novo = self._gravar(dados, pinar)
+                    cids.append(cid)
+                    if novo:
+                        novos.append(cid)
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                for cid in novos:
+                    self._descartar(cid)
+                raise
+            self._despejar()
+        return cids
+
+    def obter(self, cid: str, tocar: bool = True) -> Optional[bytes]:
+        with self._lock:
+            if cid not in self._lru:
+                return None
+            if tocar:  # leitura para pinagem não conta como uso
+                self._tocar(cid)
+            try:
+                return self._caminho(cid).read_bytes()
+            except FileNotFoundError:
+                self._total -= self._lru.pop(cid)
+                return None
+
+    def contem(self, cid: str) -> bool:
+        with self._lock:
+            return cid in self._lru
+
+    def pendentes(self, limite: int = LOTE_MAX) -> List[str]:
+        with self._lock:
+            return [r[0] for r in self._conn.execute(
+                "SELECT cid FROM pins WHERE status = 'pendente' AND proximo_em <= ? ORDER BY criado_em LIMIT ?",
+                (time.time(), limite))]
+
+    def marcar_pinados(self, cids: List[str]):
+        with self._lock:
+            self._conn.executemany("UPDATE pins SET status = 'pinado', erro = NULL, pinado_em = ? WHERE cid = ?",
+                                   [(time.time(), c) for c in cids])
+            self._despejar()
+
+    def reagendar(self, cids: List[str], erro: str):
+        with self._lock:
+            for cid in cids:
+                row = self._conn.execute("SELECT tentativas FROM pins WHERE cid = ?", (cid,)).fetchone()
+                tentativas = (row[0] if row else 0) + 1
+                espera = min(BACKOFF_SEC * 2 ** (tentativas - 1), BACKOFF_MAX_SEC)
+                self._conn.execute("UPDATE pins SET tentativas = ?, proximo_em = ?, erro = ? WHERE cid = ?",
+                                   (tentativas, time.time() + espera, erro, cid))
+
+    def status(self, cid: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            cur = self._conn.execute("SELECT * FROM pins WHERE cid = ?", (cid,))
+            row = cur.fetchone()
+            if row is None:
+                return None
+            st = dict(zip([c[0] for c in cur.description], row))
+            st["local"] = cid in self._lru
+            return st
+
+    def estatisticas(self) -> Dict[str, Any]:
+        with self._lock:
+            contagem = dict(self._conn.execute("SELECT status, COUNT(*) FROM pins GROUP BY status").fetchall())
+            return {"blocos": len(self._lru), "bytes": self._total, "max_bytes": self.max_bytes, "pins": contagem}
+
+
+_stores: "PorArquivo[BlockStore]" = PorArquivo()
+
+
+def store() -> BlockStore:
+    pasta = DIR
+    return _stores.obter(pasta, lambda: BlockStore(pasta, MAX_BYTES))
+
+
+# ---------------- nó remoto (pinagem em lote) ----------------
+
+def _api() -> Optional[str]:
+    return (os.getenv("EIAH_IPFS_API") or "").rstrip("/") or None
+
+
+def _multipart(blocos: List[tuple]) -> tuple:
+    fronteira = uuid.uuid4().hex
+    partes = []
+    for nome, dados in blocos:
+        partes.append(
+            f'--{fronteira}\r\nContent-Disposition: form-data; name="file"; filename="{nome}"\r\n'
+            f"Content-Type: application/octet-stream\r\n\r\n".encode("ascii") + dados + b"\r\n")
+    corpo = b"".join(partes) + f"--{fronteira}--\r\n".encode("ascii")
+    return corpo, f"multipart/form-data; boundary={fronteira}"
+
+
+def enviar_pendentes(limite: int = LOTE_MAX) -> Dict[str, Any]:
+    """Um lote de pinagem: um POST block/put com até `limite` blocos pendentes."""
+    api = _api()
+    if not api:
+        return {"status": "sem_api", "enviados": 0}
+    bs = store()
+    cids = bs.pendentes(limite)
+    if not cids:
+        return {"status": "ok", "enviados": 0}
+    blocos = [(c, bs.obter(c, tocar=False)) for c in cids]
+    perdidos = [c for c, d in blocos if d is None]
+    if perdidos:  # não deveria acontecer (pendentes não são despejados)
+        bs.reagendar(perdidos, "bloco ausente no blockstore local")
+    blocos = [(c, d) for c, d in blocos if d is not None]
+    if not blocos:
+        return {"status": "erro", "enviados": 0, "reagendados": len(perdidos)}
+    corpo, tipo = _multipart(blocos)
+    url = f"{api}/api/v0/block/put?cid-codec=raw&mhtype=sha2-256&pin=true"
+    try:
+        r = http.cliente().post(url, corpo, {"Content-Type": tipo})
+        confirmados = {json.loads(l)["Key"] for l in r.corpo.decode("utf-8").splitlines() if l.strip()}
+    except Exception as e:
+        print(f"[IPFS] pinagem de {len(blocos)} bloco(s) falhou: {e}")
+        bs.reagendar([c for c, _ in blocos], str(e))
+        return {"status": "erro", "enviados": 0, "erro": str(e)}
+    ok = [c for c, _ in blocos if c in confirmados]
+    divergentes = [c for c, _ in blocos if c not in confirmados]
+    bs.marcar_pinados(ok)
+    if divergentes:
+        bs.reagendar(divergentes, "CID não confirmado pelo nó")
+    print(f"[IPFS] {len(ok)} bloco(s) pinado(s), {len(divergentes)} reagendado(s)")
+    return {"status": "ok" if not divergentes else "parcial", "enviados": len(ok), "reagendados": len(divergentes)}
+
+
+_thread: Optional[threading.Thread] = None
+_parar = threading.Event()
+_acordar = threading.Event()
+_thread_lock = threading.Lock()
+
+
+def _laco(intervalo: float):
+    while not _parar.is_set():
+        try:
+            while enviar_pendentes().get("enviados", 0) >= LOTE_MAX:
+                pass  # fila cheia: esvazia antes de dormir
+        except Exception as e:  # nunca derruba a thread
+            print(f"[IPFS] rodada de pinagem falhou: {e}")
+        _acordar.wait(intervalo)
+        _acordar.clear()
+
+
+def iniciar(intervalo: float = 5.0):
+    """Thread de pinagem em segundo plano (só com EIAH_IPFS_API)."""
+    global _thread
+    if not _api():
+        return
+    with _thread_lock:
+        if _thread is not None and _thread.is_alive():
+            return
+        _parar.clear()
+        _thread = threading.Thread(target=_laco, args=(intervalo,), name="ipfs-pin", daemon=True)
+        _thread.start()
+    print(f"[IPFS] pinagem em lote a cada {intervalo:.0f}s em {_api()}")
+
+
+def parar(timeout: float = 5.0):
+    global _thread
+    with _thread_lock:
+        t, _thread = _thread, None
+        _parar.set()
+        _acordar.set()
+    if t is not None:
+        t.join(timeout)
+
+
+# ---------------- API usada pelos agentes ----------------
+
+def adicionar(dados: bytes) -> str:
+    cid = store().adicionar(dados)
+    if len(store().pendentes(LOTE_MAX)) >= LOTE_MAX:
+        _acordar.set()
+    return cid
+
+
+def adicionar_lote(blocos: List[bytes]) -> List[str]:
+    """Vários blocos de uma vez (CIDs na mesma ordem); a fila de pinagem é conferida uma vez só."""
+    cids = store().adicionar_lote(blocos)
+    if cids and len(store().pendentes(LOTE_MAX)) >= LOTE_MAX:
+        _acordar.set()
+    return cids
+
+
+def obter(cid: str) -> Optional[bytes]:
+    """Bloco local; despejado, volta pelo gateway (e é conferido pelo CID)."""
+    dados = store().obter(cid)
+    gateway = (os.getenv("EIAH_IPFS_GATEWAY") or "").rstrip("/")
+    if dados is not None or not gateway:
+        return dados
+    r = http.cliente().get(f"{gateway}/ipfs/{cid}?format=raw", {"Accept": "application/vnd.ipld.raw"})
+    if calcular_cid(r.corpo) != cid:
+        raise ValueError(f"Gateway devolveu conteúdo que não confere com {cid}")
+    store().adicionar(r.corpo, pinar=False)
+    return r.corpo
+
+
+def adicionar_imagem(url: str) -> str:
+    """data: URI vira bloco (ipfs://cid, deduplicado); outras URLs ficam como estão."""
+    if not url or not url.startswith("data:") or "," not in url:
+        return url or ""
+    cabecalho, conteudo = url.split(",", 1)
+    dados = base64.b64decode(conteudo) if cabecalho.endswith(";base64") else conteudo.encode("utf-8")
+    return f"ipfs://{adicionar(dados)}"
+
+
 def upload_to_ipfs(metadata: dict) -> dict:
-    # Código de upload real (usando ipfs-http-client ou infura)
+    cid = adicionar(json_canonico(metadata))
     return {
-        "tokenURI": "ipfs://abc123...",
-        "ipfsHash": "abc123..."
+        "tokenURI": f"ipfs://{cid}",
+        "ipfsHash": cid
     }
+
+
+def upload_lote_ipfs(metadatas: List[dict]) -> List[dict]:
+    # blocos gravados localmente; a pinagem sai em lote pela thread de fundo
+    cids = adicionar_lote([json_canonico(m) for m in metadatas])
+    return [{"tokenURI": f"ipfs://{cid}", "ipfsHash": cid} for cid in cids]
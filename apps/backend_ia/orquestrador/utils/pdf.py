@@ -1,3 +1,178 @@
-def gerar_pdf_prova(dados: dict) -> str:
+# apps/backend_ia/orquestrador/utils/pdf.py
+"""
+Prova de verificação do NFT em PDF (uma página A4), sem dependência externa.
+
+O modelo é montado uma única vez por processo: cabeçalho, catálogo, página, fontes
+padrão (Helvetica, Helvetica-Bold, Courier – WinAnsi, sem embutir arquivo de fonte),
+títulos/rótulos do conteúdo e as posições de cada linha de valor já vêm prontos em
+bytes, com os offsets do xref calculados. Por prova só o stream de conteúdo
+(nftId, nome, wallet, tokenURI, txHash, descrição) é gerado e anexado ao fim.
+
+A saída é determinística (sem data de geração): a mesma emissão gera o mesmo PDF e,
+no blockstore IPFS, o mesmo CID. Destinos (EIAH_PROVAS_DESTINO):
+  ipfs   (padrão) bloco no store endereçado por conteúdo -> "ipfs://<cid>"
+  disco  EXPORTS_DIR/provas/prova_<nftId>.pdf escrito em streaming -> "file://..."
+"""
+import os
+import re
+import threading
+from pathlib import Path
+from typing import IO, Dict, Iterable, List, Optional, Tuple
+
+from . import ipfs
+from .paths import EXPORTS_DIR
+
+PROVAS_DIR = EXPORTS_DIR / "provas"
+LARGURA, ALTURA = 595, 842  # A4 em pontos
+MARGEM = 50
+COURIER_9 = 5.4  # largura (pt) de um caractere Courier em corpo 9
+COLUNAS = int((LARGURA - 2 * MARGEM) // COURIER_9)
+
+# (campo, rótulo, linhas máximas do valor)
+CAMPOS: Tuple[Tuple[str, str, int], ...] = (
+    ("nftId", "ID do NFT", 1),
+    ("nome", "Proprietário", 1),
+    ("wallet", "Carteira do titular", 1),
+    ("tokenURI", "Token URI (metadata)", 2),
+    ("txHash", "Transação do mint", 1),
+    ("descricao", "Descrição", 8),
+)
+
+
+def _texto(valor) -> bytes:
+    """String literal PDF (WinAnsi): escapa \\ ( ) e troca quebras/controle por espaço."""
+    s = re.sub(r"[\x00-\x1f]", " ", "" if valor is None else str(valor))
+    b = s.encode("cp1252", errors="replace")
+    return b.replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)")
+
+
+def _linhas(valor, maximo: int) -> List[str]:
+    s = re.sub(r"\s+", " ", "" if valor is None else str(valor)).strip()
+    linhas = [s[i:i + COLUNAS] for i in range(0, len(s), COLUNAS)] or [""]
+    if len(linhas) > maximo:
+        linhas = linhas[:maximo]
+        linhas[-1] = linhas[-1][:COLUNAS - 3] + "..."
+    return linhas
+
+
+def _texto_em(fonte: str, corpo: int, x: float, y: float, texto) -> bytes:
+    return b"BT /%s %d Tf %.1f %.1f Td (%s) Tj ET\n" % (fonte.encode(), corpo, x, y, _texto(texto))
+
+
+class _Modelo:
+    """Partes fixas do PDF, pré-montadas. Só o objeto 8 (conteúdo) muda por prova."""
+
+    def __init__(self):
+        fontes = {"F1": "Helvetica-Bold", "F2": "Helvetica", "F3": "Courier"}
+        objetos = [
+            b"<< /Type /Catalog /Pages 2 0 R >>",
+            b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %d %d] /Resources << /Font << %s >> >>"
+            b" /Contents 8 0 R >>" % (LARGURA, ALTURA, b" ".join(
+                b"/%s %d 0 R" % (nome.encode(), 4 + i) for i, nome in enumerate(fontes))),
+            *[b"<< /Type /Font /Subtype /Type1 /BaseFont /%s /Encoding /WinAnsiEncoding >>" % f.encode()
+              for f in fontes.values()],
+            b"<< /Producer (EIAH Orquestrador) /Title (Prova de verificacao NFT) >>",
+        ]
+        partes = [b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n"]
+        self.offsets: List[int] = []
+        tam = len(partes[0])
+        for n, corpo in enumerate(objetos, start=1):
+            obj = b"%d 0 obj\n%s\nendobj\n" % (n, corpo)
+            self.offsets.append(tam)
+            partes.append(obj)
+            tam += len(obj)
+        self.cabecalho = b"".join(partes)
+
+        # conteúdo fixo (títulos, rótulos, fios) e prefixo de cada linha de valor
+        y = ALTURA - 62
+        fixo = [
+            _texto_em("F1", 16, MARGEM, y, "Prova de Verificação de NFT – NFTDiárias"),
+            _texto_em("F2", 9, MARGEM, y - 16, "Emissão registrada on-chain pelo Orquestrador EIAH. "
+                                                "Confira o txHash no explorador da rede e o tokenURI no IPFS."),
+            b"0.6 w %d %.1f m %d %.1f l S\n" % (MARGEM, y - 28, LARGURA - MARGEM, y - 28),
+        ]
+        y -= 56
+        self.linhas: Dict[str, List[bytes]] = {}
+        for campo, rotulo, maximo in CAMPOS:
+            fixo.append(_texto_em("F1", 10, MARGEM, y, rotulo))
+            self.linhas[campo] = []
+            for _ in range(maximo):
+                y -= 13
+                self.linhas[campo].append(b"BT /F3 9 Tf %d %.1f Td (" % (MARGEM, y))
+            y -= 20
+        fixo.append(b"0.6 w %d %.1f m %d %.1f l S\n" % (MARGEM, y, LARGURA - MARGEM, y))
+        self.conteudo_fixo = b"".join(fixo)
+        self.maximos = {campo: maximo for campo, _, maximo in CAMPOS}
+
+    def partes(self, dados: dict) -> List[bytes]:
+        """PDF completo em pedaços (para escrever em streaming sem juntar)."""
+        conteudo = [self.conteudo_fixo]
+        for campo, prefixos in self.linhas.items():
+            for prefixo, linha in zip(prefixos, _linhas(dados.get(campo), self.maximos[campo])):
+                conteudo += [prefixo, _texto(linha), b") Tj ET\n"]
+        stream = b"".join(conteudo)
+        obj8 = b"8 0 obj\n<< /Length %d >>\nstream\n%s\nendstream\nendobj\n" % (len(stream), stream)
+        xref_em = len(self.cabecalho) + len(obj8)
+        xref = b"xref\n0 9\n0000000000 65535 f \n" + b"".join(
+            b"%010d 00000 n \n" % o for o in (*self.offsets, len(self.cabecalho)))
+        trailer = b"trailer\n<< /Size 9 /Root 1 0 R /Info 7 0 R >>\nstartxref\n%d\n%%%%EOF\n" % xref_em
+        return [self.cabecalho, obj8, xref, trailer]
+
+
+_modelo: Optional[_Modelo] = None
+_modelo_lock = threading.Lock()
+
+
+def modelo() -> _Modelo:
+    global _modelo
+    if _modelo is None:
+        with _modelo_lock:
+            if _modelo is None:
+                _modelo = _Modelo()
+    return _modelo
+
+
+def renderizar(dados: dict) -> bytes:
+    return b"".join(modelo().partes(dados))
+
+
+def escrever(dados: dict, arquivo: IO[bytes]):
+    """Escreve a prova num arquivo/socket já aberto, pedaço a pedaço."""
+    arquivo.writelines(modelo().partes(dados))
+
+
+def _caminho(dados: dict, pasta: Path) -> Path:
+    nome = re.sub(r"[^A-Za-z0-9_.-]", "_", str(dados.get("nftId") or "sem_id"))
+    return pasta / f"prova_{nome}.pdf"
+
+
+def _gravar(dados: dict, pasta: Path) -> str:
+    # sem fsync: a prova é determinística e pode ser regerada a partir da emissão
+    path = _caminho(dados, pasta)
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    with open(tmp, "wb") as f:
+        escrever(dados, f)
+    os.replace(tmp, path)
+    return path.resolve().as_uri()
+
+
+def _destino(destino: Optional[str]) -> str:
+    destino = destino or os.getenv("EIAH_PROVAS_DESTINO", "ipfs")
+    if destino not in ("ipfs", "disco"):
+        raise ValueError(f"Destino de prova desconhecido: {destino}")
+    return destino
+
+
+def gerar_pdf_prova(dados: dict, destino: Optional[str] = None) -> str:
     # Gera PDF, salva local ou em IPFS
-    return "https://ipfs.io/ipfs/Qm.../prova.pdf"
+    return gerar_pdfs_prova([dados], destino)[0]
+
+
+def gerar_pdfs_prova(lista: Iterable[dict], destino: Optional[str] = None) -> List[str]:
+    """Provas de um lote numa passada (mesmo modelo), na mesma ordem."""
+    destino = _destino(destino)
+    if destino == "disco":
+        PROVAS_DIR.mkdir(parents=True, exist_ok=True)
+        return [_gravar(d, PROVAS_DIR) for d in lista]
+    return [f"ipfs://{cid}" for cid in ipfs.adicionar_lote([renderizar(d) for d in lista])]
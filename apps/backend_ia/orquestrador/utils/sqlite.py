@@ -0,0 +1,80 @@
+# apps/backend_ia/orquestrador/utils/sqlite.py
+"""
+Conexão SQLite comum aos stores (idempotência, jobs, pins do IPFS, campanha).
+
+- `conectar`: autocommit (transações explícitas com BEGIN IMMEDIATE), WAL (leitores não
+  bloqueiam o escritor), synchronous=NORMAL e busy_timeout – workers do uvicorn esperam a
+  trava de escrita em vez de falhar com "database is locked";
+- `DONO` (host:pid): dono dos leases gravados nas tabelas;
+- `StoreSQLite`: uma conexão por store, compartilhada entre threads e serializada por `_lock`.
+  Código async chama o store por `fora_do_loop`/`agendar`: a espera pela trava (até
+  busy_timeout) acontece na thread do store, não no event loop;
+- `PorArquivo`: um store por arquivo no processo (get_store() de cada módulo).
+"""
+import asyncio
+import os
+import socket
+import sqlite3
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import partial
+from pathlib import Path
+from typing import Any, Callable, Dict, Generic, Optional, Tuple, TypeVar
+
+BUSY_TIMEOUT_MS = 5000
+DONO = f"{socket.gethostname()}:{os.getpid()}"
+
+T = TypeVar("T")
+
+
+def conectar(arquivo: Path) -> sqlite3.Connection:
+    arquivo = Path(arquivo)
+    arquivo.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(arquivo, check_same_thread=False, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+    return conn
+
+
+class StoreSQLite:
+    def __init__(self, arquivo: Path, lock: Optional[threading.Lock] = None):
+        self.arquivo = Path(arquivo)
+        self._lock = lock or threading.Lock()
+        self._conn = conectar(self.arquivo)
+        # uma thread por store (criada no primeiro uso): as chamadas async rodam na ordem em que foram feitas
+        self._thread = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"sqlite-{self.arquivo.stem}")
+
+    def _exec(self, sql: str, params=()) -> sqlite3.Cursor:
+        with self._lock:
+            return self._conn.execute(sql, params)
+
+    async def fora_do_loop(self, funcao: Callable[..., T], *args: Any, **kw: Any) -> T:
+        """`funcao(*args, **kw)` (um método do store) na thread do store, sem bloquear o event loop."""
+        return await asyncio.get_running_loop().run_in_executor(self._thread, partial(funcao, *args, **kw))
+
+    def agendar(self, funcao: Callable[..., Any], *args: Any, **kw: Any) -> Future:
+        """Como `fora_do_loop`, sem esperar o resultado (ex.: progresso); falha só é registrada."""
+        futuro = self._thread.submit(funcao, *args, **kw)
+        futuro.add_done_callback(_registrar_falha)
+        return futuro
+
+
+def _registrar_falha(futuro: Future):
+    if not futuro.cancelled() and futuro.exception() is not None:
+        print(f"[SQLITE] Escrita em segundo plano falhou: {futuro.exception()}")
+
+
+class PorArquivo(Generic[T]):
+    """Stores já abertos, por (tipo, caminho resolvido)."""
+
+    def __init__(self):
+        self._stores: Dict[Tuple[str, str], T] = {}
+        self._lock = threading.Lock()
+
+    def obter(self, arquivo: Path, criar: Callable[[], T], tipo: str = "") -> T:
+        chave = (tipo, str(Path(arquivo).resolve()))
+        with self._lock:
+            if chave not in self._stores:
+                self._stores[chave] = criar()
+            return self._stores[chave]